@@ -10,18 +10,29 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from src.configs.constants import API_PORT
 from src.controllers.MonitorController import MonitorController
-from src.database.db import get_db
-from src.routers import (auth, devices, monitor, networks, organizations,
-                         profiles, users)
+from src.database.db import close_db, get_db
+from src.database.indexes import bootstrap_indexes
+from src.routers import (auth, devices, jobs, monitor, networks,
+                         organizations, profiles, users)
+from src.services.arp_discovery import arp_discovery
+from src.services.executor import blocking_executor
+from src.services.job_engine import job_engine
+from src.services.snmp_client import snmp_client
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
   app.state.db = get_db()
+  await bootstrap_indexes(app.state.db)
+  await job_engine.start(app)
   asyncio.create_task(MonitorController.device_monitor_loop(app=app))
   asyncio.create_task(MonitorController.topology_loop(app=app))
+  asyncio.create_task(arp_discovery.run(app=app))
   yield
+  snmp_client.close()
+  blocking_executor.shutdown()
+  close_db()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -32,6 +43,7 @@ app.include_router(profiles.router)
 app.include_router(organizations.router)
 app.include_router(networks.router)
 app.include_router(monitor.router)
+app.include_router(jobs.router)
 
 origins = [
     f'https://{constants.UI_HOST}'
@@ -57,4 +69,5 @@ async def root():
   return {'message': 'This API holds the operation of RFSight'}
 
 if __name__ == "__main__":
-  uvicorn.run("app:app", host="0.0.0.0", port=API_PORT, reload=True)
+  uvicorn.run("app:app", host="0.0.0.0", port=API_PORT, reload=True,
+              ws_per_message_deflate=constants.WEBSOCKET_PER_MESSAGE_DEFLATE)
@@ -0,0 +1,108 @@
+"""
+DB read decoding benchmark.
+
+Compares building models from stored documents with full pydantic validation
+(the previous read path: MAC regex, ipaddress parsing, ObjectId checks on every
+field) with the trusted from_db path (model_construct) used by the repositories,
+and the wire size / BSON decode cost of whole devices against the projected views.
+
+Usage (from backend/): python -m benchmarks.model_decoding [documents] [rounds]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import bson
+from bson import ObjectId
+from src.models.Device import (Device, DeviceCollection, DeviceMonitorView,
+                               DeviceSummary)
+from src.models.Network import NetworkCollection
+from src.shared.utils import model_projection
+
+
+def build_device_documents(count: int):
+  # Documents as Motor returns them: ObjectId _id, ids stored as strings, aware datetimes
+  random.seed(42)
+  now = datetime.now(tz=timezone.utc)
+  network_ids = [str(ObjectId()) for _ in range(50)]
+  profile_ids = [str(ObjectId()) for _ in range(5)]
+  documents = []
+  for i in range(count):
+    documents.append({
+      '_id': ObjectId(),
+      'is_active': True,
+      'name': f'AP-{i:05d}',
+      'mac_address': f'{random.getrandbits(48):012X}',
+      'ip_address': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+      'model': 'AP-X',
+      'user': 'admin',
+      'password': 'secret',
+      'fw_version': '6.3.11',
+      'location': 'Torre 1',
+      'networkId': random.choice(network_ids),
+      'profileId': random.choice(profile_ids),
+      'createdAt': now,
+      'updatedAt': now,
+    })
+  return documents
+
+def build_network_documents(count: int, devices_per_network: int):
+  now = datetime.now(tz=timezone.utc)
+  return [{
+    '_id': ObjectId(),
+    'name': f'Rede {i}',
+    'network_type': 'Bridge',
+    'network_cidr': f'10.{i % 256}.0.0/16',
+    'location': 'Torre 1',
+    'devices': [ObjectId() for _ in range(devices_per_network)],
+    'organizationId': str(ObjectId()),
+    'createdAt': now,
+    'updatedAt': now,
+  } for i in range(count)]
+
+def measure(label, func, rounds, count):
+  func()
+  start = time.perf_counter()
+  for _ in range(rounds):
+    func()
+  elapsed = (time.perf_counter() - start) / rounds
+  print(f'{label:<34}{elapsed * 1000:>12.2f}{elapsed / count * 1e6:>14.2f}')
+  return elapsed
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+  rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+  devices = build_device_documents(count)
+
+  # Both paths must agree on what they build
+  assert DeviceCollection.from_db(devices[:100]).model_dump() == DeviceCollection(devices=devices[:100]).model_dump()
+
+  print(f'{count} device documents, {rounds} rounds')
+  print(f'{"path":<34}{"total ms":>12}{"us/document":>14}')
+  validated = measure('DeviceCollection(devices=...)', lambda: DeviceCollection(devices=devices), rounds, count)
+  trusted = measure('DeviceCollection.from_db', lambda: DeviceCollection.from_db(devices), rounds, count)
+  print(f'{"":<34}{validated / trusted:>11.1f}x')
+
+  single = measure('Device(**document) each', lambda: [Device(**d) for d in devices], rounds, count)
+  single_trusted = measure('Device.from_db each', lambda: [Device.from_db(d) for d in devices], rounds, count)
+  print(f'{"":<34}{single / single_trusted:>11.1f}x')
+
+  print(f'\n{"projection":<34}{"bytes/device":>12}{"decode us":>14}')
+  for label, model in (('whole document', None), ('DeviceSummary', DeviceSummary), ('DeviceMonitorView', DeviceMonitorView)):
+    projection = model_projection(model) if model else None
+    payload = b''.join(bson.encode({k: v for k, v in d.items() if projection is None or k in projection}) for d in devices)
+    start = time.perf_counter()
+    for _ in range(rounds):
+      bson.decode_all(payload)
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f'{label:<34}{len(payload) / count:>12.0f}{elapsed / count * 1e6:>14.2f}')
+
+  networks = build_network_documents(200, count // 200)
+  print(f'\n{len(networks)} network documents with {count // 200} device ids each')
+  validated = measure('NetworkCollection(networks=...)', lambda: NetworkCollection(networks=networks), rounds, len(networks))
+  trusted = measure('NetworkCollection.from_db', lambda: NetworkCollection.from_db(networks), rounds, len(networks))
+  print(f'{"":<34}{validated / trusted:>11.1f}x')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,113 @@
+"""
+Websocket monitor message encoding benchmark.
+
+Compares the previous broadcast path (pydantic model_dump + stdlib json.dumps)
+with the encode-once layer (orjson, MessagePack), in encode time and bytes on
+the wire, with and without permessage-deflate.
+
+Usage (from backend/): python -m benchmarks.websocket_encoding [devices] [rounds]
+"""
+import json
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
+from src.models.Monitor import ActionStatus, DeviceMonitorUpdate
+from src.models.WebsocketMessage import WebsocketMessage
+from src.services.message_encoding import (ENCODING_JSON, ENCODING_MSGPACK,
+                                           EncodedMessage, available_encodings)
+
+
+def build_updates(devices: int):
+  random.seed(42)
+  updates = []
+  for i in range(devices):
+    updates.append(DeviceMonitorUpdate(
+      deviceId=f'{i:024x}',
+      online=True,
+      latency=round(random.uniform(0.5, 40), 3),
+      actionsStatuses={'getStatus': ActionStatus(status='success'), 'getWireless': ActionStatus(status='success')},
+      stats={
+        'name': f'AP-{i}',
+        'model': 'AP-X',
+        'fw_version': '6.3.11',
+        'cpu': random.randint(0, 100),
+        'memory': random.randint(0, 100),
+        'uptime': random.randint(0, 10 ** 7),
+        'signal': random.randint(-90, -40),
+        'stations': random.randint(0, 60),
+        'unmappedData': {'interfaces': [{'name': f'ath{n}', 'rx': random.random(), 'tx': random.random()} for n in range(4)]},
+      },
+      timestamp=datetime.now(tz=timezone.utc)
+    ))
+  return updates
+
+def aggregate(updates):
+  organizations = {}
+  for n, update in enumerate(updates):
+    org = organizations.setdefault(f'org{n % 10}', {'networks': {}})
+    net = org['networks'].setdefault(f'net{n % 50}', {'devices': {}})
+    net['devices'][update['deviceId']] = update
+  return organizations
+
+# Per-device model_dump(mode='json') is shared by both paths (the monitor loop
+# still does it once per update), only the message encoding is measured.
+
+def previous_path(organizations):
+  message = WebsocketMessage(messageType='deviceMonitor', data={'organizations': organizations}).model_dump()
+  return json.dumps(message)
+
+def encode_once_path(organizations, encoding):
+  message = {'messageType': 'deviceMonitor', 'data': {'organizations': organizations}}
+  return EncodedMessage(message).encode(encoding)
+
+def deflated_size(payload):
+  if isinstance(payload, str):
+    payload = payload.encode()
+  # permessage-deflate uses raw deflate streams
+  compressor = zlib.compressobj(wbits=-15)
+  return len(compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH))
+
+def measure(label, func, rounds):
+  func()
+  start = time.perf_counter()
+  for _ in range(rounds):
+    payload = func()
+  elapsed_ms = (time.perf_counter() - start) / rounds * 1000
+  raw = len(payload.encode() if isinstance(payload, str) else payload)
+  print(f'{label:<26}{elapsed_ms:>12.2f}{raw:>14}{deflated_size(payload):>16}')
+  return elapsed_ms
+
+def main():
+  devices = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+  rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+  organizations = aggregate([update.model_dump(mode='json') for update in build_updates(devices)])
+
+  print(f'{devices} devices, {rounds} rounds')
+  print(f'{"path":<26}{"encode ms":>12}{"bytes":>14}{"deflated bytes":>16}')
+  baseline = measure('model_dump + json.dumps', lambda: previous_path(organizations), rounds)
+  for encoding in available_encodings():
+    elapsed = measure(f'encode once ({encoding})', lambda: encode_once_path(organizations, encoding), rounds)
+    print(f'{"":<26}{baseline / elapsed:>11.1f}x')
+
+  if ENCODING_MSGPACK not in available_encodings():
+    print('msgpack is not installed, only JSON was measured.')
+
+  # Serialize-once: clients sharing a subscription reuse the same encoding
+  clients = 100
+  start = time.perf_counter()
+  for _ in range(clients):
+    previous_path(organizations)
+  previous_ms = (time.perf_counter() - start) * 1000
+
+  message = EncodedMessage({'messageType': 'deviceMonitor', 'data': {'organizations': organizations}})
+  start = time.perf_counter()
+  for _ in range(clients):
+    message.encode(ENCODING_JSON)
+  once_ms = (time.perf_counter() - start) * 1000
+  print(f'{clients} clients in one subscription group: {previous_ms:.2f} ms re-encoding vs {once_ms:.2f} ms encode once')
+
+if __name__ == '__main__':
+  main()
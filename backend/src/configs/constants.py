@@ -4,7 +4,6 @@ import os
 import pytz
 from dotenv import load_dotenv
 from fastapi_mail import ConnectionConfig
-from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 
 load_dotenv()
@@ -44,6 +43,13 @@ MONGODB_PASSWD = os.getenv('MONGODB_PASSWD')
 MONGODB_PORT = os.getenv('MONGODB_PORT')
 MONGODB_DATABASE = os.getenv('MONGODB_DATABASE')
 MONGODB_URI = f'mongodb://{MONGODB_LOGIN}:{MONGODB_PASSWD}@{MONGODB_HOST}:{MONGODB_PORT}/{MONGODB_DATABASE}?directConnection=true&?authSource={MONGODB_DATABASE}'
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)) # One client (and pool) shared by the whole API
+MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 10)) # Kept open so requests don't pay connection setup
+MONGODB_MAX_IDLE_TIME_MS = 300000
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = 5000 # Max wait for a free pooled connection
+MONGODB_CONNECT_TIMEOUT_MS = 5000
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = 10000
+MONGODB_COMPRESSORS = [c.strip() for c in os.getenv('MONGODB_COMPRESSORS', 'zlib').split(',') if c.strip()] # zstd/snappy need their python packages
 
 VALIDATE_MAC_REGEX = '^([0-9A-Fa-f]{2}[:-]?){5}([0-9A-Fa-f]{2})|([0-9a-fA-F]{4}.[0-9a-fA-F]{4}.[0-9a-fA-F]{4})$'
 
@@ -58,11 +64,47 @@ BASE_PLACEHOLDERS = {
 }
 
 # SNMP AND DISCOVERY RELATED
-WEBSOCKET_DEVICE_MONITOR_POLL_RATE = 10
-WEBSOCKET_TOPOLOGY_POLL_RATE = 30
+WEBSOCKET_DEVICE_MONITOR_POLL_RATE = 10 # Default per-device poll interval (profiles may override with pollInterval)
+WEBSOCKET_TOPOLOGY_POLL_RATE = 30 # Volatile tables (stations, LLDP) are walked every cycle
+MONITOR_SCHEDULER_TICK = 1
+MONITOR_DEVICE_LIST_REFRESH_RATE = 10
+MONITOR_MIN_POLL_INTERVAL = 2
+MONITOR_FLAPPING_POLL_INTERVAL = 5
+MONITOR_OFFLINE_MAX_POLL_INTERVAL = 120
+MONITOR_FLAP_WINDOW = 120
+MONITOR_FLAP_THRESHOLD = 3
 DOCKER_CONTAINER_API_INTERFACE = os.getenv('API_CONTAINER_INTERFACE')
-FIND_DEVICES_COMMAND = f"""arp-scan -I {DOCKER_CONTAINER_API_INTERFACE} --localnet -q"""
+# Interfaces swept by ARP discovery (comma separated), defaults to the container interface
+ARP_DISCOVERY_INTERFACES = [i.strip() for i in os.getenv('ARP_DISCOVERY_INTERFACES', DOCKER_CONTAINER_API_INTERFACE or '').split(',') if i.strip()]
+ARP_DISCOVERY_INTERVAL = 15
+ARP_DISCOVERY_MAX_LOCALNET_HOSTS = 4096 # Larger attached networks are not swept automatically
+ARP_NEIGHBOR_EXPIRY = 600 # Discovered devices not seen for this long are dropped
+ARP_NEIGHBOR_FEED_SIZE = 10000 # Changes kept for incremental readers of the discovered devices feed
+DISCOVERED_DEVICES_PAGE_SIZE = 100
+DISCOVERED_DEVICES_MAX_PAGE_SIZE = 1000
 DEVICE_CONN_TIMEOUT = 20
+TCP_PROBE_CONNECT_TIMEOUT = 3
+TCP_PROBE_INTERVAL = 1
+TCP_PROBE_REQUIRED_SUCCESSES = 5 # Consecutive connects before a device is considered reachable
+TCP_PROBE_CACHE_TTL = 10
+TCP_PROBE_CACHE_SIZE = 4096
+TCP_PROBE_MAX_IN_FLIGHT = 512
+BULK_ADOPTION_MAX_DEVICES = 2048
+BULK_ADOPTION_CONCURRENCY = 32 # Devices probed at the same time by a bulk adoption
+BULK_ADOPTION_INSERT_BATCH = 200
+FINGERPRINT_MAX_CONCURRENT = 64 # Devices probed at the same time
+FINGERPRINT_CACHE_TTL = 3600 # Observations of a MAC are re-probed after this (or when its IP changes)
+FINGERPRINT_CACHE_SIZE = 4096
+FINGERPRINT_HTTP_TIMEOUT = 3
+FINGERPRINT_HTTP_MAX_BODY = 16384 # Bytes of the page kept for body signatures
+LIST_PAGE_MAX_SIZE = 1000 # Max limit of a paginated list request (without limit lists return everything)
+LIST_CURSOR_BATCH_SIZE = 500 # Documents per Mongo cursor batch when listing/streaming
+JOBS_MAX_RUNNING = 4 # Background jobs running at once, the rest wait queued
+JOBS_RESULTS_FLUSH_INTERVAL = 1 # Job results are written to the DB at most this often
+JOBS_LIST_LIMIT = 50
+JOBS_SSE_PING = 15
+ICMP_PING_TIMEOUT = 1
+ICMP_MAX_IN_FLIGHT = 1024
 MAC_FIELD_NAMES = {"mac", "mac_address", "mac_addr"}
 
 DEVICE_UPDATE_LOCK = asyncio.Lock()
@@ -74,12 +116,37 @@ RETRY_STRATEGY = Retry(
   backoff_factor = 1
 )
 
-HTTP_ADAPTER = HTTPAdapter(max_retries=RETRY_STRATEGY)
+# DEVICE DRIVER POOL
+DEVICE_HTTP_TIMEOUT = 10
+DEVICE_HTTP_POOL_MAXSIZE = 2
+DEVICE_AUTH_MAX_AGE = 600 # Re-login on devices after this many seconds even without a 401/403
+DEVICE_DRIVER_IDLE_TIMEOUT = 300
+DEVICE_DRIVER_POOL_SWEEP_RATE = 60
+
+# WEBSOCKET FAN-OUT
+WEBSOCKET_CLIENT_QUEUE_SIZE = 64 # Messages queued per client before coalescing to a resync
+WEBSOCKET_CLIENT_MAX_OVERFLOWS = 5 # Consecutive overflows (without draining) before evicting a client
+WEBSOCKET_SEND_TIMEOUT = 10
+WEBSOCKET_PER_MESSAGE_DEFLATE = os.getenv('WEBSOCKET_PER_MESSAGE_DEFLATE', 'true').lower() == 'true' # Negotiated with each browser
+
+# BLOCKING WORK EXECUTOR (worker threads per lane)
+EXECUTOR_MANAGE_WORKERS = int(os.getenv('EXECUTOR_MANAGE_WORKERS', 8))
+EXECUTOR_MONITOR_WORKERS = int(os.getenv('EXECUTOR_MONITOR_WORKERS', 16))
+EXECUTOR_DISCOVERY_WORKERS = int(os.getenv('EXECUTOR_DISCOVERY_WORKERS', 4))
 
 SNMP_COMMUNITY = "public"
 SNMP_PORT = 161
+SNMP_TIMEOUT = 1
+SNMP_RETRIES = 5
+SNMP_BULK_MAX_REPETITIONS = 25 # Varbinds per GETBULK response on table walks (profiles may override for station tables)
+SNMP_MAX_IN_FLIGHT = 256 # PDUs in flight on the shared SNMP engine
+SNMP_TARGET_CACHE_SIZE = 4096
+SNMP_DEVICE_MAX_CONCURRENT_WALKS = 3 # Table walks run at the same time against a single device
+SNMP_STATIC_FACTS_TTL = 3600 # sysName/sysDescr/interface MACs are re-read after this (or when sysUpTime resets)
 OID_SYSNAME  = "1.3.6.1.2.1.1.5.0"
 OID_SYSDESCR = "1.3.6.1.2.1.1.1.0"
+OID_SYSOBJECTID = "1.3.6.1.2.1.1.2.0"
+OID_SYSUPTIME = "1.3.6.1.2.1.1.3.0"
 OID_IF_PHYS_ADDRESS = "1.3.6.1.2.1.2.2.1.6"
 OID_LLDP_REM_TABLE = "1.0.8802.1.1.2.1.4"
 OID_REM_SYS = "1.0.8802.1.1.2.1.4.1.1.9"
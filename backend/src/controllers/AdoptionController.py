@@ -1,72 +1,136 @@
 import asyncio
-import ipaddress
-import subprocess as sp
-from queue import Queue
-from threading import Lock, Thread
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from src.database.db import DB
-from src.models.Device import Device, DeviceToAdopt, DiscoveredDevice
+from src.models.Device import (BulkAdoptionRequest, Device, DeviceToAdopt,
+                               DiscoveredDevice)
+from src.models.Profile import Profile
+from src.repositories.device import DeviceRepository
+from src.repositories.network import NetworkRepository
 from src.repositories.profile import ProfileRepository
-from src.services.device_driver import DeviceDriver
-from src.shared.utils import wait_device_connectivity
+from src.services.arp_discovery import arp_discovery
+from src.services.driver_pool import driver_pool
+from src.services.executor import LANE_MANAGE
+from src.services.fingerprint import fingerprint_engine
+from src.services.job_engine import UNTRACKED, JobContext, error_message
+from src.services.neighbor_table import Neighbor
+from src.services.tcp_prober import tcp_prober
+
+
+def progress_event(index: int, device: DeviceToAdopt, status: str, message: str | None = None, device_id=None) -> Dict[str, Any]:
+  return {
+    'event': 'device',
+    'index': index,
+    'mac_address': device.mac_address,
+    'ip_address': device.ip_address,
+    'status': status,
+    'message': message,
+    'deviceId': str(device_id) if device_id else None,
+  }
 
 
 class AdoptionController:
-  def __init__(self, queue: Queue, available_devices_lock: Lock = Lock()) -> None:
-    self.queue = queue
-    self.lock = available_devices_lock
-    self.thread = self._create_thread()
-    self.available_devices: List[DiscoveredDevice] = []
-
-  async def find_device(self, device: DeviceToAdopt, db: DB):
-    # VALIDATE MAC AND IP NOT ALL NONE
-    if all([x is None for x in [device.mac_address, device.ip_address]]):
-      raise http_exceptions.INVALID_FIELD(field='Endereco IP ou MAC')
-
-    found_device = None
-    with self.lock:
-      for available_device in self.available_devices:
-        if device.ip_address and device.mac_address:
-          if available_device.ip_address == device.ip_address and available_device.mac_address == device.mac_address:
-            found_device = True
-            break
-          elif available_device.mac_address == device.mac_address:
-            device.ip_address = available_device.ip_address
-            found_device = True
-            break
-          elif available_device.ip_address == device.ip_address:
-            device.mac_address = available_device.mac_address
-            found_device = True
-            break
-          continue
-        elif device.mac_address:
-          if available_device.mac_address == device.mac_address:
-            if available_device.ip_address != device.ip_address:
-              device.ip_address = available_device.ip_address
-            found_device = True
-            break
-        else:
-          if available_device.ip_address == device.ip_address:
-            if available_device.mac_address != device.mac_address:
-              device.mac_address = available_device.mac_address
-            found_device = True
-            break
-        continue
+  async def adopt(self, device_adopt_data: DeviceToAdopt, db: DB, job: JobContext = UNTRACKED):
+    """
+    Validates, discovers, probes and stores a device, returns the new device id.
+    """
+    async with job.step('validation'):
+      if device_adopt_data.networkId:
+        # Check if network exists
+        device_network = await NetworkRepository.get_network_by(db, field='_id', value=device_adopt_data.networkId)
+        if not device_network:
+          raise http_exceptions.DOCUMENT_INEXISTENT(document='rede do dispositivo')
 
-    if not found_device:
-      raise http_exceptions.DEVICE_TO_ADOPT_NOT_FOUND
+      # Check if device is not already adopted
+      if all([x is None for x in [device_adopt_data.mac_address, device_adopt_data.ip_address]]):
+        raise http_exceptions.INVALID_FIELD(field='Endereco IP ou MAC')
+      field = 'mac_address' if device_adopt_data.mac_address else 'ip_address'
+      value = device_adopt_data.mac_address if field == 'mac_address' else device_adopt_data.ip_address
 
-    if not wait_device_connectivity(host=device.ip_address):
-      raise http_exceptions.DEVICE_INACCESSIBLE
+      device_already_adopted = await DeviceRepository.get_device_by(db, field=field, value=value)
+      if device_already_adopted:
+        raise http_exceptions.DEVICE_ALREADY_ADOPTED
+
+    # Search for device and get initial info
+    discovered_device_to_adopt = await self.find_device(device=device_adopt_data, db=db, job=job)
+
+    print(f'Discovery: {discovered_device_to_adopt}')
+
+    async with job.step('store'):
+      # Create the new device record
+      new_device_id = await DeviceRepository.create_device(db, new_device_data=discovered_device_to_adopt)
+
+      # Move device into network
+      device_moved_to_net = await NetworkRepository.move_device_to_network(db,
+                                                                           device_id=new_device_id,
+                                                                           initial_network_id=None,
+                                                                           target_network_id=discovered_device_to_adopt.networkId)
+      if not device_moved_to_net:
+        await DeviceRepository.delete_device(db, device_id=new_device_id)
+        raise http_exceptions.MOVE_DEVICE_TO_NET_FAILED
+
+    return new_device_id
 
-    profile = await ProfileRepository.get_profile_by(db=db, field='_id', value=device.profileId)
-    if not profile:
-      raise http_exceptions.DOCUMENT_INEXISTENT("Profile")
+  async def adoption_job(self, job: JobContext, payload: Dict[str, Any]):
+    device: DeviceToAdopt = payload['device']
+    await job.set_total(1)
+    new_device_id = await self.adopt(device, job.engine.db, job=job)
+    await job.add_result({'deviceId': str(new_device_id), 'mac_address': device.mac_address,
+                          'ip_address': device.ip_address, 'status': 'adopted'}, outcome='adopted')
 
-    device_driver = DeviceDriver(device=device, profile=profile)
+  async def bulk_adoption_job(self, job: JobContext, payload: Dict[str, Any]):
+    async for event in self.bulk_adopt(payload['request'], job.engine.db, job=job):
+      if event['event'] == 'start':
+        await job.set_total(event['total'])
+      elif event['event'] == 'device' and event['status'] in ('adopted', 'failed'):
+        await job.add_result(event, outcome=event['status'])
+      else:
+        job.emit(event)
+
+  async def find_device(self, device: DeviceToAdopt, db: DB, job: JobContext = UNTRACKED):
+    async with job.step('discovery'):
+      # VALIDATE MAC AND IP NOT ALL NONE
+      if all([x is None for x in [device.mac_address, device.ip_address]]):
+        raise http_exceptions.INVALID_FIELD(field='Endereco IP ou MAC')
+
+      found_device = await self.find_neighbor(mac=device.mac_address, ip=device.ip_address)
+      if not found_device:
+        raise http_exceptions.DEVICE_TO_ADOPT_NOT_FOUND
+
+      # Fill in (or correct) the address that wasn't given from the neighbor table
+      device.mac_address = found_device.mac_address
+      device.ip_address = found_device.ip_address
+
+    async with job.step('probe'):
+      if device.profileId:
+        profile = await ProfileRepository.get_profile_by(db=db, field='_id', value=device.profileId)
+      else:
+        profile = await self.identify_profile(device, (await ProfileRepository.list_profiles(db)).profiles)
+      if not profile:
+        raise http_exceptions.DOCUMENT_INEXISTENT("Profile")
+
+      return await self.probe_device(device, profile)
+
+  async def identify_profile(self, device: DeviceToAdopt, profiles: List[Profile]) -> Profile:
+    """
+    Profile whose fingerprint the device matches (its profileId is set to it).
+    """
+    fingerprint = await fingerprint_engine.identify(device.mac_address, device.ip_address, profiles)
+    if not fingerprint.profileId:
+      raise http_exceptions.PROFILE_NOT_IDENTIFIED
+    device.profileId = fingerprint.profileId
+    return next(p for p in profiles if p.id == fingerprint.profileId)
+
+  async def probe_device(self, device: DeviceToAdopt, profile: Profile) -> Device:
+    """
+    Waits for the device to be reachable and builds its record from the profile monitor actions.
+    """
+    if not await tcp_prober.wait_reachable(device.ip_address):
+      raise http_exceptions.DEVICE_INACCESSIBLE
+
+    device_driver = driver_pool.get(device=device, profile=profile)
 
     # Execute monitor actions (get inital device information)
     actions_to_run = []
@@ -77,8 +141,8 @@ class AdoptionController:
     if not actions_to_run:
       print(f"Profile {profile.name} sem actions de monitoramento com responseMapping. Usando defaults.")
 
-    # Run all found actions concurrently in threads
-    tasks = [asyncio.to_thread(device_driver.execute_action, action_name) for action_name in actions_to_run]
+    # Run all found actions concurrently
+    tasks = [device_driver.execute_action_async(action_name, lane=LANE_MANAGE) for action_name in actions_to_run]
     results = await asyncio.gather(*tasks, return_exceptions=True)
 
     # Extract mapped data
@@ -111,63 +175,154 @@ class AdoptionController:
 
     return device_to_adopt
 
-  def match_discovered_device(self, mac, ip):
-    with self.lock:
-      for d in self.available_devices:
-        if mac and ip:
-          if (d.mac_address == mac and d.ip_address == ip) or \
-            (d.mac_address == mac) or \
-            (d.ip_address == ip):
-              return d
-        elif mac:
-          if d.mac_address == mac:
-            return d
-        else:  # ip only
-          if d.ip_address == ip:
-            return d
+  async def bulk_adopt(self, request: BulkAdoptionRequest, db: DB, job: JobContext = UNTRACKED) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Adopts many devices, yielding progress events: 'start' (total), one 'device'
+    event per device and stage (status probed, adopted or failed) and 'done'.
+    Devices are probed BULK_ADOPTION_CONCURRENCY at a time (those without a
+    profileId are fingerprinted first), uniqueness is checked for the whole
+    batch at once and records are written with insert_many.
+    """
+    candidates = self.__bulk_candidates(request)
+    yield {'event': 'start', 'total': len(candidates)}
 
-      return None
+    async with job.step('discovery'):
+      # Resolve addresses against the neighbor table, sweeping once if anything is missing
+      if any(arp_discovery.lookup(d.mac_address, d.ip_address) is None for d in candidates):
+        await arp_discovery.sweep()
 
-  def _run_task(self):
-    while True:
-      try:
-        devices_list = self.__device_arp_scan()
-        with self.lock:
-          current_macs = {dev.mac_address for dev in self.available_devices}
-          new_devices = [dev for dev in devices_list if dev.mac_address not in current_macs]
-          self.available_devices.extend(new_devices)
-      except Exception as e:
-        print(f"Erro ao executar task de discovery de adoção: {e}")
-
-  def __device_arp_scan(self):
-    try:
-      command_return = sp.getoutput(constants.FIND_DEVICES_COMMAND)
-
-      splitted_lines = [line.split() for line in command_return.splitlines() if line != '']
-
-      devices_objects = []
-      for line in splitted_lines:
-        if len(line) > 2:
+      network_ids = {d.networkId for d in candidates if d.networkId}
+      existent_networks = set()
+      if network_ids:
+        networks = await NetworkRepository.list_networks_by_ids(db, list(network_ids))
+        existent_networks = {str(n.id) for n in networks.networks}
+
+      resolved: List[Tuple[int, DeviceToAdopt]] = []
+      seen_macs = set()
+      for index, device in enumerate(candidates):
+        neighbor = arp_discovery.lookup(device.mac_address, device.ip_address)
+        if neighbor is None:
+          yield progress_event(index, device, 'failed', error_message(http_exceptions.DEVICE_TO_ADOPT_NOT_FOUND))
+          continue
+        device.mac_address = neighbor.mac_address
+        device.ip_address = neighbor.ip_address
+        if device.mac_address in seen_macs:
+          yield progress_event(index, device, 'failed', 'Dispositivo repetido na requisição.')
           continue
+        if device.networkId and device.networkId not in existent_networks:
+          yield progress_event(index, device, 'failed', error_message(http_exceptions.DOCUMENT_INEXISTENT(document='rede do dispositivo')))
+          continue
+        seen_macs.add(device.mac_address)
+        resolved.append((index, device))
+
+      # Devices already adopted aren't probed
+      taken = await DeviceRepository.find_taken_fields(db,
+                                                       mac_addresses=[d.mac_address for _, d in resolved],
+                                                       ip_addresses=[d.ip_address for _, d in resolved])
+      to_probe: List[Tuple[int, DeviceToAdopt]] = []
+      for index, device in resolved:
+        if device.mac_address in taken['mac_address'] or device.ip_address in taken['ip_address']:
+          yield progress_event(index, device, 'failed', error_message(http_exceptions.DEVICE_ALREADY_ADOPTED))
         else:
+          to_probe.append((index, device))
+
+    async with job.step('probe'):
+      profiles = await ProfileRepository.get_all_profiles_as_map(db)
+      profile_list = list(profiles.values())
+      semaphore = asyncio.Semaphore(constants.BULK_ADOPTION_CONCURRENCY)
+
+      async def probe(index: int, device: DeviceToAdopt):
+        async with semaphore:
           try:
-            valid_ip = ipaddress.ip_address(line[0])
-            formatted_mac_address = line[1].upper().replace(':', '').replace('-', '')
-            devices_objects.append(DiscoveredDevice(ip_address=valid_ip.compressed, mac_address=formatted_mac_address))
-          except ValueError as v:
-            print(f'Erro ao mapead dispositivo na descoberta: {v}')
+            if device.profileId:
+              profile = profiles.get(device.profileId)
+            else:
+              profile = await self.identify_profile(device, profile_list)
+            if not profile:
+              raise http_exceptions.DOCUMENT_INEXISTENT("Profile")
+            return index, device, await self.probe_device(device, profile), None
+          except Exception as e:
+            return index, device, None, error_message(e)
+
+      probed: List[Tuple[int, DeviceToAdopt, Device]] = []
+      tasks = [asyncio.create_task(probe(index, device)) for index, device in to_probe]
+      try:
+        for next_done in asyncio.as_completed(tasks):
+          index, device, new_device, error = await next_done
+          if error:
+            yield progress_event(index, device, 'failed', error)
             continue
+          probed.append((index, device, new_device))
+          yield progress_event(index, device, 'probed')
+      finally:
+        # The client may have gone away mid stream
+        for task in tasks:
+          task.cancel()
+
+    async with job.step('store'):
+      # Names come from the devices themselves: the unique indexes reject the taken ones
+      # (repeats in the batch included) per device, the rest of the batch is still inserted
+      probed.sort(key=lambda entry: entry[0])
 
-      return devices_objects
-    except Exception as e:
-      print(f'Erro ao executar arp scan para adoção: {e}')
-      return []
+      adopted = 0
+      for start in range(0, len(probed), constants.BULK_ADOPTION_INSERT_BATCH):
+        batch = probed[start:start + constants.BULK_ADOPTION_INSERT_BATCH]
+        try:
+          inserted = await DeviceRepository.create_devices(db, [new_device for _, _, new_device in batch])
+        except Exception as e:
+          for index, device, _ in batch:
+            yield progress_event(index, device, 'failed', error_message(e))
+          continue
+
+        # One network update per network in the batch
+        by_network: Dict[str | None, List[Tuple[int, DeviceToAdopt, Any]]] = {}
+        for (index, device, new_device), result in zip(batch, inserted):
+          if isinstance(result, Exception):
+            yield progress_event(index, device, 'failed', error_message(result))
+            continue
+          by_network.setdefault(new_device.networkId, []).append((index, device, result))
 
-  def _create_thread(self):
-    return Thread(target=self._run_task)
+        for network_id, entries in by_network.items():
+          device_ids = [device_id for _, _, device_id in entries]
+          if network_id is None or await NetworkRepository.add_devices_to_network(db, network_id, device_ids):
+            adopted += len(entries)
+            for index, device, device_id in entries:
+              yield progress_event(index, device, 'adopted', device_id=device_id)
+          else:
+            await DeviceRepository.delete_devices(db, device_ids)
+            for index, device, _ in entries:
+              yield progress_event(index, device, 'failed', error_message(http_exceptions.MOVE_DEVICE_TO_NET_FAILED))
 
-  def start(self):
-    self.thread.start()
+    yield {'event': 'done', 'total': len(candidates), 'adopted': adopted, 'failed': len(candidates) - adopted}
 
-  def wait_end(self):
-    self.thread.join()
+  def __bulk_candidates(self, request: BulkAdoptionRequest) -> List[DeviceToAdopt]:
+    if request.devices:
+      candidates = []
+      for device in request.devices:
+        # Per-device profile/network fall back to the request ones
+        candidates.append(device.model_copy(update={
+          'profileId': device.profileId or request.profileId,
+          'networkId': device.networkId or request.networkId,
+        }))
+      return candidates
+
+    return [DeviceToAdopt(mac_address=mac, ip_address=ip, user=request.user, password=request.password,
+                          profileId=request.profileId, networkId=request.networkId)
+            for mac, ip in arp_discovery.neighbors_in(request.network_cidr).items()]
+
+  async def find_neighbor(self, mac: str | None, ip: str | None) -> Neighbor | None:
+    """
+    Looks mac/ip up in the ARP neighbor table, sweeping once more if it isn't there yet
+    (e.g. a device plugged in since the last scheduled sweep).
+    """
+    neighbor = arp_discovery.lookup(mac, ip)
+    if neighbor is None:
+      await arp_discovery.sweep()
+      neighbor = arp_discovery.lookup(mac, ip)
+    return neighbor
+
+  def match_discovered_device(self, mac, ip) -> DiscoveredDevice | None:
+    neighbor = arp_discovery.lookup(mac, ip)
+    if neighbor is None:
+      return None
+    return DiscoveredDevice(mac_address=neighbor.mac_address, ip_address=neighbor.ip_address)
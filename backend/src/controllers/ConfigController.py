@@ -1,11 +1,10 @@
-import asyncio
 from typing import List
 
 from fastapi import HTTPException
 from src.models.Actions import ActionSequencePayload, ActionSequenceResponse
 from src.models.Device import Device
 from src.models.Profile import Profile
-from src.services.device_driver import DeviceDriver
+from src.services.driver_pool import driver_pool
 
 
 class ConfigController:
@@ -17,7 +16,7 @@ class ConfigController:
       sequence: ActionSequencePayload
     ) -> List[ActionSequenceResponse]:
 
-      driver = DeviceDriver(device=device, profile=profile)
+      driver = driver_pool.get(device=device, profile=profile)
       results: List[ActionSequenceResponse] = []
 
       for action_payload in sequence.actions:
@@ -46,12 +45,7 @@ class ConfigController:
         try:
           print(f"Executing action '{action_name}' for device {device.ip_address}...")
 
-          # Execute action thread-safe
-          result = await asyncio.to_thread(
-            driver.execute_action,
-            action_name,
-            payload
-          )
+          result = await driver.execute_action_async(action_name, payload)
 
           results.append(ActionSequenceResponse(
             action=action_name,
@@ -1,26 +1,32 @@
 import asyncio
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Set, Tuple
 
 import src.configs.constants as constants
 from bson import ObjectId
 from fastapi import FastAPI, HTTPException
-from src.models.Device import Device
+from src.models.Device import DeviceMonitorView
 from src.models.Monitor import ActionStatus, DeviceMonitorUpdate
 from src.models.Profile import Profile
 from src.models.TopologyMapping import MappingTable
-from src.models.WebsocketMessage import WebsocketMessage
 from src.repositories.device import DeviceRepository
 from src.repositories.network import NetworkRepository
 from src.repositories.profile import ProfileRepository
+from src.services.arp_discovery import arp_discovery
 from src.services.device_driver import DeviceDriver
+from src.services.device_registry import device_registry
 from src.services.discovery import *
+from src.services.driver_pool import driver_pool
+from src.services.icmp_prober import icmp_prober
+from src.services.monitor_state import monitor_state
+from src.services.poll_scheduler import PollScheduler
+from src.services.snmp_facts import snmp_facts
 from src.services.websocket_conn_manager import websocket_connection_manager
-from src.shared.utils import async_ping
+from src.shared.utils import model_projection
 
 
 class MonitorController:
-  topology_lock = asyncio.Lock()
 
   @staticmethod
   async def device_monitor_loop(app: FastAPI):
@@ -29,146 +35,176 @@ class MonitorController:
     print("Starting monitor loop...")
 
     db = app.state.db
+    scheduler = PollScheduler()
+    last_refresh = None
+
+    in_flight: Set[str] = set()
+    poll_tasks: Set[asyncio.Task] = set()
+    pending_updates: Dict[str, DeviceMonitorUpdate] = {}
 
     while True:
       try:
-        async with MonitorController.topology_lock:
-          # Get latest devices and profiles list
-          updated_device_list = await DeviceRepository.list_devices(db)
-          updated_profiles_map = await ProfileRepository.get_all_profiles_as_map(db)
-
-          if not updated_device_list.devices or not updated_profiles_map:
+        now = time.monotonic()
+
+        # Refresh the device registry and align the scheduler with it
+        if last_refresh is None or now - last_refresh >= constants.MONITOR_DEVICE_LIST_REFRESH_RATE:
+          last_refresh = now
+          snapshot = await device_registry.refresh(db)
+          monitor_state.prune(snapshot.devices.keys())
+          scheduler.sync({
+            dev_id: MonitorController.__device_poll_interval(dev, snapshot.profiles)
+            for dev_id, dev in snapshot.devices.items()
+          }, now=now)
+
+          if not snapshot.devices or not snapshot.profiles:
             print("Monitor loop: No devices or profiles found. Skipping.")
-            continue
 
-          # Ping all devices and get latency
-          ping_tasks = [async_ping(dev.ip_address) for dev in updated_device_list.devices]
-          ping_results = await asyncio.gather(*ping_tasks, return_exceptions=True)
-
-          monitor_updates: Dict[str, DeviceMonitorUpdate] = {}
-          online_devices: List[Device] = []
-
-          # Process ping results
-          for i, res in enumerate(ping_results):
-            dev = updated_device_list.devices[i]
-            dev_id_str = str(dev.id)
-            if isinstance(res, tuple) and res[0] is True:
-              # Device is Online
-              online_devices.append(dev)
-              monitor_updates[dev_id_str] = DeviceMonitorUpdate(
-                deviceId=dev_id_str,
-                online=True,
-                latency=res[1]
-              )
-            else:
-              # Device is Offline
-              monitor_updates[dev_id_str] = DeviceMonitorUpdate(
-                  deviceId=dev_id_str,
-                  online=False,
-              )
-
-          # Run all monitor actions for online devices
-          device_tasks = []
-
-          for dev in online_devices:
-            profile = updated_profiles_map.get(dev.profileId)
-            if not profile:
-              continue
-
-            # Create driver instance for this device
-            driver = DeviceDriver(
-              device=dev,
-              profile=profile
-            )
-
-            # Create a single task to run all monitor actions for this device
-            task = asyncio.to_thread(MonitorController.__run_device_monitor_sync, driver, profile)
-            device_tasks.append((dev_id_str, task))
-
-          # Gather results from all device threads
-          all_device_results = await asyncio.gather(
-            *[task for _, task in device_tasks],
-            return_exceptions=True
-          )
-
-          # Aggregate results
-          for (dev_id_str, _), res in zip(device_tasks, all_device_results):
-            if isinstance(res, Exception):
-              # The whole device task failed (e.g., driver init)
-              monitor_updates[dev_id_str].actionsStatuses['driver'] = ActionStatus(status='error', message=str(res))
-            else:
-              stats, actions_statuses = res
-              monitor_updates[dev_id_str].stats = stats
-              monitor_updates[dev_id_str].actionsStatuses = actions_statuses
-
-              device_obj = next((d for d in updated_device_list.devices if str(d.id) == dev_id_str), None)
-
-              if device_obj and stats:
-                updates = {}
-
-                if 'fw_version' in stats and stats['fw_version'] and stats['fw_version'] != device_obj.fw_version:
-                  updates['fw_version'] = stats['fw_version']
-
-                if 'model' in stats and stats['model'] and stats['model'] != device_obj.model:
-                  updates['model'] = stats['model']
-
-                if 'name' in stats and stats['name'] and stats['name'] != device_obj.name:
-                  updates['name'] = stats['name']
-
-                if 'location' in stats and stats['location'] and stats['location'] != device_obj.location:
-                  updates['location'] = stats['location']
-
-                if updates:
-                  try:
-                    print(f"Syncing device {dev_id_str} data with DB: {updates}")
-                    device_to_update = device_obj.model_copy(update=updates)
-
-                    async with constants.DEVICE_UPDATE_LOCK:
-                      await DeviceRepository.edit_device_by_id(
-                        db=db,
-                        device_id=ObjectId(dev_id_str),
-                        new_device_data=device_to_update
-                      )
-                  except Exception as e:
-                    print(f"Failed to sync device {dev_id_str} to DB: {e}")
-
-
-          # Broadcast through ws the final list of updates from monitoring
-          final_update_list = [update.model_dump() for update in monitor_updates.values()]
-          for monitor_update in final_update_list:
-            monitor_update['timestamp'] = datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat()
-          if final_update_list:
-            # Fetch devices and networks to build hierarchy
-            all_devices = updated_device_list.devices
-            networks = await NetworkRepository.list_networks(db)
-
-            # Build lookup maps
-            device_to_network = {str(d.id): str(d.networkId) for d in all_devices}
-            network_to_org = {str(n.id): str(n.organizationId) for n in networks.networks}
-
-            # Final aggregation structure
-            aggregated = {}
-
-            for d in final_update_list:
-              dev_id = d["deviceId"]
-              network_id = device_to_network.get(dev_id, "unassigned")
-              organization_id = network_to_org.get(network_id, "unassigned")
-
-              org_entry = aggregated.setdefault(organization_id, {"networks": {}})
-              net_entry = org_entry["networks"].setdefault(network_id, {"devices": {}})
-
-              net_entry["devices"][dev_id] = d
-
-            await websocket_connection_manager.broadcast(WebsocketMessage(
-              messageType='deviceMonitor',
-              data={"organizations": aggregated}
-            ).model_dump())
+        # Start polling every due device from the latest snapshot, so changes
+        # published by topology discovery (e.g. new IPs) are picked up here
+        snapshot = device_registry.snapshot
+        due_devices = []
+        for dev_id in scheduler.pop_due(now):
+          if dev_id in snapshot.devices and dev_id not in in_flight:
+            in_flight.add(dev_id)
+            due_devices.append(snapshot.devices[dev_id])
+
+        if due_devices:
+          poll_task = asyncio.create_task(MonitorController.__poll_devices(
+            db, due_devices, snapshot.profiles, scheduler, in_flight, pending_updates
+          ))
+          poll_tasks.add(poll_task)
+          poll_task.add_done_callback(poll_tasks.discard)
+
+        # Broadcast through ws what changed on devices polled since the last tick
+        if pending_updates:
+          final_update_list = [update.model_dump(mode='json') for update in pending_updates.values()]
+          pending_updates.clear()
+
+          delta_message = monitor_state.apply(final_update_list, device_registry.snapshot)
+          if delta_message:
+            websocket_connection_manager.broadcast(delta_message)
       except Exception as e:
         print(f"Error in monitor_loop: {e}")
       finally:
-        await asyncio.sleep(constants.WEBSOCKET_DEVICE_MONITOR_POLL_RATE)
+        await asyncio.sleep(constants.MONITOR_SCHEDULER_TICK)
+
+  @staticmethod
+  def __device_poll_interval(device: DeviceMonitorView, profiles_map: Dict[str, Profile]) -> float:
+    profile = profiles_map.get(device.profileId)
+    if profile and profile.pollInterval:
+      return profile.pollInterval
+    return constants.WEBSOCKET_DEVICE_MONITOR_POLL_RATE
+
+  @staticmethod
+  async def __poll_devices(db, devices: List[DeviceMonitorView], profiles_map: Dict[str, Profile], scheduler: PollScheduler,
+                           in_flight: Set[str], pending_updates: Dict[str, DeviceMonitorUpdate]):
+    """
+    Pings a batch of due devices and runs the monitor actions of the online ones.
+    Each device is rescheduled as soon as its own poll finishes.
+    """
+    try:
+      ping_results = await icmp_prober.ping_many([dev.ip_address for dev in devices])
+    except Exception as e:
+      print(f"Monitor loop: ping batch failed: {e}")
+      ping_results = [(False, None)] * len(devices)
+
+    device_tasks = []
+    for dev, res in zip(devices, ping_results):
+      dev_id_str = str(dev.id)
+      if res[0] is True:
+        # Device is Online
+        monitor_update = DeviceMonitorUpdate(deviceId=dev_id_str, online=True, latency=res[1])
+        device_tasks.append(MonitorController.__poll_online_device(db, dev, profiles_map.get(dev.profileId), monitor_update))
+      else:
+        # Device is Offline
+        pending_updates[dev_id_str] = DeviceMonitorUpdate(
+          deviceId=dev_id_str,
+          online=False,
+          timestamp=datetime.now(tz=constants.LOCAL_TIMEZONE)
+        )
+        scheduler.reschedule(dev_id_str, online=False)
+        in_flight.discard(dev_id_str)
+
+    async def run(task):
+      monitor_update = await task
+      pending_updates[monitor_update.deviceId] = monitor_update
+      scheduler.reschedule(monitor_update.deviceId, online=True)
+      in_flight.discard(monitor_update.deviceId)
+
+    try:
+      await asyncio.gather(*[run(task) for task in device_tasks])
+    finally:
+      # Never leave a device stuck out of the scheduler
+      for dev in devices:
+        if str(dev.id) in in_flight:
+          scheduler.reschedule(str(dev.id), online=False)
+          in_flight.discard(str(dev.id))
+
+  @staticmethod
+  async def __poll_online_device(db, dev: DeviceMonitorView, profile: Profile | None, monitor_update: DeviceMonitorUpdate) -> DeviceMonitorUpdate:
+    """
+    Runs all monitor actions for an online device and syncs changed device info with DB.
+    """
+    dev_id_str = monitor_update.deviceId
+    try:
+      if not profile:
+        return monitor_update
+
+      # Reuse the pooled (already authenticated) driver of this device
+      driver = driver_pool.lookup(dev.id, dev.ip_address, profile)
+      if driver is None:
+        # The monitor view has no credentials, the full device is only read to build its driver
+        device = await DeviceRepository.get_device_by(db, field='_id', value=dev.id)
+        if not device:
+          return monitor_update
+        driver = driver_pool.get(device=device, profile=profile)
+
+      # HTTP monitor actions run on the event loop, no worker thread per device
+      stats, actions_statuses = await MonitorController.__run_device_monitor(driver, profile)
+      monitor_update.stats = stats
+      monitor_update.actionsStatuses = actions_statuses
+
+      if stats:
+        await MonitorController.__sync_device_info(db, dev, stats)
+    except Exception as e:
+      # The whole device task failed (e.g., driver init)
+      monitor_update.actionsStatuses['driver'] = ActionStatus(status='error', message=str(e))
+    finally:
+      monitor_update.timestamp = datetime.now(tz=constants.LOCAL_TIMEZONE)
 
-  def __run_device_monitor_sync(driver: DeviceDriver, profile: Profile) -> Tuple[Dict[str, Any], Dict[str, ActionStatus]]:
+    return monitor_update
+
+  @staticmethod
+  async def __sync_device_info(db, device_obj: DeviceMonitorView, stats: Dict[str, Any]):
+    updates = {}
+
+    if 'fw_version' in stats and stats['fw_version'] and stats['fw_version'] != device_obj.fw_version:
+      updates['fw_version'] = stats['fw_version']
+
+    if 'model' in stats and stats['model'] and stats['model'] != device_obj.model:
+      updates['model'] = stats['model']
+
+    if 'name' in stats and stats['name'] and stats['name'] != device_obj.name:
+      updates['name'] = stats['name']
+
+    if 'location' in stats and stats['location'] and stats['location'] != device_obj.location:
+      updates['location'] = stats['location']
+
+    if updates:
+      try:
+        print(f"Syncing device {device_obj.id} data with DB: {updates}")
+        # Only the monitored fields are written, so an IP rewritten meanwhile by discovery is kept
+        await DeviceRepository.update_device_fields(
+          db=db,
+          device_id=ObjectId(device_obj.id),
+          fields=updates
+        )
+        device_registry.update_device(device_obj.id, **updates)
+      except Exception as e:
+        print(f"Failed to sync device {device_obj.id} to DB: {e}")
+
+  @staticmethod
+  async def __run_device_monitor(driver: DeviceDriver, profile: Profile) -> Tuple[Dict[str, Any], Dict[str, ActionStatus]]:
 
     stats = {}
     actions_statuses = {}
@@ -177,7 +213,7 @@ class MonitorController:
     for action_name, action in profile.actions.items():
       if action.actionType == 'monitor':
         try:
-          result = driver.execute_action(action_name)
+          result = await driver.execute_action_async(action_name)
 
           if isinstance(result, dict) and result:
               if result['mapped']:
@@ -203,9 +239,9 @@ class MonitorController:
     print('Running topology discovery')
     await asyncio.sleep(5)
     while True:
+      snmp_facts.prune(dev.ip_address for dev in device_registry.snapshot.devices.values())
       graphs = await MonitorController.discover_networks_topology(app)
-      websocket_msg = WebsocketMessage(messageType='topology', data={'organizations': graphs})
-      await websocket_connection_manager.broadcast(websocket_msg.model_dump())
+      websocket_connection_manager.broadcast({'messageType': 'topology', 'data': {'organizations': graphs}})
       await asyncio.sleep(constants.WEBSOCKET_TOPOLOGY_POLL_RATE)
 
   @staticmethod
@@ -257,48 +293,47 @@ class MonitorController:
     mapping = MappingTable()
     try:
 
-      network_devices = await DeviceRepository.list_devices_by_compound_filter(
+      network_devices = await DeviceRepository.list_device_views(
         db=db,
+        view=DeviceMonitorView,
         compound_filter={'networkId': {'$in': [network.id]}}
       )
-      if not network_devices or not network_devices.devices:
+      if not network_devices:
         return {"nodes": [], "links": [], "network": str(network.id)}
 
-      profiles_map = await ProfileRepository.get_all_profiles_as_map(db=db)
+      # Discovery only walks the station table of each profile
+      profiles_map = await ProfileRepository.get_all_profiles_as_map(db=db, projection=model_projection(Profile, 'name,stationTable'))
 
       seeds: Dict[str, str | Profile] = []
-      for dev in network_devices.devices:
+      for dev in network_devices:
         if profiles_map:
           dev_profile = profiles_map[dev.profileId] if dev.profileId in profiles_map else None
         seeds.append({'ip': dev.ip_address, 'profile': dev_profile, 'deviceId': str(dev.id)})
 
       print(f"\n=== Starting Topology Discovery for network {network.id} ({network.network_cidr}) ===")
 
-      # run scan task for getting stations IPs
-      scan_task = asyncio.create_task(arp_sweep_async(network.network_cidr, iface=constants.DOCKER_CONTAINER_API_INTERFACE))
-
       # discover seeds in parallel
       discover_tasks = [MonitorController.__discover_device(seed['ip'], mapping, seed['profile'], seed['deviceId']) for seed in seeds]
       discovered = await asyncio.gather(*discover_tasks, return_exceptions=False)
 
       graph = MonitorController.__build_graph(discovered, mapping)
 
-      # wait scan results and then enrich (add IP for stations)
-      print(f"[Network {network.id}] Waiting for ARP results...")
-      arp_results = await scan_task
+      # enrich with the ARP neighbor table (add IP for stations)
+      arp_results = arp_discovery.neighbors_in(network.network_cidr)
 
       updated_graph = MonitorController.__enrich_graph_with_nmap(graph, arp_results, mapping)
 
-      async with MonitorController.topology_lock:
-        for dev in network_devices.devices:
-          name = dev.name or None
-          mapped_ip = mapping.resolve_name(name) if name else None
-          if mapped_ip and mapped_ip != dev.ip_address:
-            try:
-              async with constants.DEVICE_UPDATE_LOCK:
-                await DeviceRepository.update_device_ip(db, dev.id, mapped_ip)
-            except (Exception, HTTPException) as e:
-              print(f'Ocorreu um erro ao atualizar o IP do dispositivo {dev.name}: {e}')
+      for dev in network_devices:
+        name = dev.name or None
+        mapped_ip = mapping.resolve_name(name) if name else None
+        if mapped_ip and mapped_ip != dev.ip_address:
+          try:
+            async with constants.DEVICE_UPDATE_LOCK:
+              updated_device = await DeviceRepository.update_device_ip(db, dev.id, mapped_ip)
+            # Monitoring picks the new IP up on the next poll of this device
+            device_registry.update_device(dev.id, ip_address=updated_device.ip_address)
+          except (Exception, HTTPException) as e:
+            print(f'Ocorreu um erro ao atualizar o IP do dispositivo {dev.name}: {e}')
 
       return {"nodes": updated_graph["nodes"], "links": updated_graph["links"], "network": str(network.id)}
 
@@ -313,23 +348,37 @@ class MonitorController:
     if deviceId:
       device.update({'id': deviceId})
 
+    # Static facts come from cache (one sysUpTime GET), volatile tables are walked
+    # every cycle, concurrently (capped per device)
+    walk_slots = asyncio.Semaphore(constants.SNMP_DEVICE_MAX_CONCURRENT_WALKS)
+
+    async def walk(oid: str, max_repetitions: int | None = None):
+      async with walk_slots:
+        return await snmp_walk(ip, oid, max_repetitions=max_repetitions)
+
+    async def no_rows():
+      return []
+
+    facts, lldp_pairs, station_rows = await asyncio.gather(
+      snmp_facts.get(ip),
+      walk(constants.OID_LLDP_REM_TABLE),
+      walk(profile.stationTable.root_oid, profile.stationTable.max_repetitions) if profile else no_rows()
+    )
+
     # sysName/sysDescr
-    name = await snmp_get(ip, constants.OID_SYSNAME)
+    name = facts.name
     if name:
         device["name"] = name
         mapping.learn_name(name, ip)
         print("sysName:", name)
 
-    descr = await snmp_get(ip, constants.OID_SYSDESCR)
+    descr = facts.descr
     device["descr"] = descr
     print("sysDescr:", descr)
 
     # Interfaces physical addresses
-    if_mac_rows = await snmp_walk(ip, constants.OID_IF_PHYS_ADDRESS)
-
-    if_mac_list = []
-    if if_mac_rows:
-      if_mac_list = parse_if_phys_address(if_mac_rows)
+    if_mac_list = facts.interface_macs
+    if if_mac_list:
       print(f"Interface MACs found: {len(if_mac_list)}")
 
       for if_mac in if_mac_list:
@@ -338,7 +387,6 @@ class MonitorController:
     device["interface_macs"] = if_mac_list
 
     # LLDP neighbors
-    lldp_pairs = await snmp_walk(ip, constants.OID_LLDP_REM_TABLE)
     if lldp_pairs:
         lldp_neighbors = parse_lldp(lldp_pairs)
         if lldp_neighbors:
@@ -349,12 +397,9 @@ class MonitorController:
 
     if profile:
       # STA mapping
-      station_rows = await snmp_walk(ip, profile.stationTable.root_oid)
-
       stations = []
       if station_rows:
           stations = parse_station_table(station_rows, profile.stationTable)
-          device["stations"] = stations
           print("STAs found:", len(stations))
 
       device["stations"] = stations
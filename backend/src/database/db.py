@@ -1,11 +1,26 @@
 import motor.motor_asyncio as motor_asyncio
 import src.configs.constants as constants
 from bson import CodecOptions
+from src.database.pool_metrics import pool_metrics
+
+
+def create_client() -> motor_asyncio.AsyncIOMotorClient:
+  return motor_asyncio.AsyncIOMotorClient(
+    constants.MONGODB_URI,
+    maxPoolSize=constants.MONGODB_MAX_POOL_SIZE,
+    minPoolSize=constants.MONGODB_MIN_POOL_SIZE,
+    maxIdleTimeMS=constants.MONGODB_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=constants.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    connectTimeoutMS=constants.MONGODB_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=constants.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+    compressors=constants.MONGODB_COMPRESSORS,
+    event_listeners=[pool_metrics]
+  )
 
 
 class DB:
-  def __init__(self) -> None:
-    self.__client = motor_asyncio.AsyncIOMotorClient(constants.MONGODB_URI)
+  def __init__(self, client: motor_asyncio.AsyncIOMotorClient | None = None) -> None:
+    self.__client = client or create_client()
     self.__database = self.__client.rfsight
     self.__codec_options = CodecOptions(tz_aware=True, tzinfo=constants.LOCAL_TIMEZONE)
 
@@ -14,6 +29,7 @@ class DB:
     self.profiles_collection: motor_asyncio.AsyncIOMotorCollection = self.__get_collection('profiles')
     self.networks_collection: motor_asyncio.AsyncIOMotorCollection = self.__get_collection('networks')
     self.organizations_collection: motor_asyncio.AsyncIOMotorCollection = self.__get_collection('organizations')
+    self.jobs_collection: motor_asyncio.AsyncIOMotorCollection = self.__get_collection('jobs')
 
   def __get_collection(self, collection_name: str):
     return self.__database.get_collection(collection_name, codec_options=self.__codec_options)
@@ -33,5 +49,23 @@ class DB:
   def organizations_collection(self):
     return self.organizations_collection
 
-def get_db():
-  return DB()
+  def jobs_collection(self):
+    return self.jobs_collection
+
+  def close(self):
+    self.__client.close()
+
+# One client (and connection pool) for the whole process
+_shared_db: DB | None = None
+
+def get_db() -> DB:
+  global _shared_db
+  if _shared_db is None:
+    _shared_db = DB()
+  return _shared_db
+
+def close_db():
+  global _shared_db
+  if _shared_db is not None:
+    _shared_db.close()
+    _shared_db = None
@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import src.shared.http_exceptions as http_exceptions
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from src.database.db import DB
+
+def unique_index(field: str, name: str) -> IndexModel:
+  return IndexModel([(field, ASCENDING)], name=name, unique=True)
+
+# Indexes of each collection, by DB attribute
+INDEXES: Dict[str, List[IndexModel]] = {
+  'devices_collection': [
+    unique_index('mac_address', 'devices_mac_address_unique'),
+    unique_index('ip_address', 'devices_ip_address_unique'),
+    unique_index('name', 'devices_name_unique'),
+    IndexModel([('networkId', ASCENDING)], name='devices_networkId'),
+    IndexModel([('profileId', ASCENDING)], name='devices_profileId'),
+    IndexModel([('updatedAt', ASCENDING), ('_id', ASCENDING)], name='devices_updatedAt'),
+  ],
+  'profiles_collection': [
+    unique_index('name', 'profiles_name_unique'),
+    IndexModel([('updatedAt', ASCENDING), ('_id', ASCENDING)], name='profiles_updatedAt'),
+  ],
+  'networks_collection': [
+    unique_index('name', 'networks_name_unique'),
+    IndexModel([('organizationId', ASCENDING)], name='networks_organizationId'),
+    IndexModel([('updatedAt', ASCENDING), ('_id', ASCENDING)], name='networks_updatedAt'),
+  ],
+  'organizations_collection': [
+    unique_index('name', 'organizations_name_unique'),
+  ],
+  'user_collection': [
+    unique_index('username', 'users_username_unique'),
+    unique_index('email', 'users_email_unique'),
+    IndexModel([('organizationId', ASCENDING)], name='users_organizationId'),
+    IndexModel([('updatedAt', ASCENDING), ('_id', ASCENDING)], name='users_updatedAt'),
+  ],
+  'jobs_collection': [
+    IndexModel([('createdBy', ASCENDING), ('createdAt', DESCENDING)], name='jobs_createdBy_createdAt'),
+    IndexModel([('createdAt', DESCENDING)], name='jobs_createdAt'),
+    IndexModel([('status', ASCENDING)], name='jobs_status'),
+  ],
+}
+
+# Messages of the unique indexes, raised when an insert/update violates them
+UNIQUE_FIELDS = {
+  'devices_mac_address_unique': 'Endereço MAC',
+  'devices_ip_address_unique': 'Endereço IP',
+  'devices_name_unique': 'Nome do dispositivo',
+  'profiles_name_unique': 'Nome de profile',
+  'networks_name_unique': 'Nome de rede',
+  'organizations_name_unique': 'Nome de organização',
+  'users_username_unique': 'Nome de usuário',
+  'users_email_unique': 'E-mail',
+}
+
+# Hot queries and the index each one must use: (collection, filter, sort, index)
+HOT_QUERIES: List[Tuple[str, Dict[str, Any], List[Tuple[str, int]] | None, str]] = [
+  ('devices_collection', {'mac_address': '000000000000'}, None, 'devices_mac_address_unique'),
+  ('devices_collection', {'ip_address': '0.0.0.0'}, None, 'devices_ip_address_unique'),
+  ('devices_collection', {'name': ''}, None, 'devices_name_unique'),
+  ('devices_collection', {'networkId': {'$in': ['']}}, None, 'devices_networkId'),
+  ('devices_collection', {'profileId': ''}, None, 'devices_profileId'),
+  ('profiles_collection', {'name': ''}, None, 'profiles_name_unique'),
+  ('networks_collection', {'name': ''}, None, 'networks_name_unique'),
+  ('networks_collection', {'organizationId': ''}, None, 'networks_organizationId'),
+  ('organizations_collection', {'name': ''}, None, 'organizations_name_unique'),
+  ('user_collection', {'username': ''}, None, 'users_username_unique'),
+  ('user_collection', {'email': ''}, None, 'users_email_unique'),
+  ('devices_collection', {'updatedAt': {'$gt': datetime.min}}, [('updatedAt', ASCENDING), ('_id', ASCENDING)], 'devices_updatedAt'),
+  ('jobs_collection', {'createdBy': ''}, [('createdAt', DESCENDING)], 'jobs_createdBy_createdAt'),
+]
+
+
+def unique_field_violation(error: DuplicateKeyError) -> HTTPException:
+  """
+  UNIQUE_FIELD_DATA_ALREADY_EXISTS for the unique index error violated.
+  """
+  message = str(error)
+  for index_name, field in UNIQUE_FIELDS.items():
+    if f'index: {index_name} ' in message:
+      return http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field=field)
+  return http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Registro')
+
+async def duplicate_keys(collection, field: str, limit: int = 10) -> List[Any]:
+  """
+  Values of field held by more than one document (at most limit of them).
+  """
+  pipeline = [
+    {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}},
+    {'$match': {'count': {'$gt': 1}}},
+    {'$limit': limit},
+  ]
+  return [group['_id'] async for group in collection.aggregate(pipeline)]
+
+async def ensure_indexes(db: DB):
+  """
+  Creates the missing indexes of every collection (existing ones are left as they are).
+  Uniqueness is only enforced by the unique indexes, so if any of them can't be built
+  (e.g. existing duplicates) this raises, listing the duplicate keys to clean up.
+  """
+  failed_unique = []
+  for collection_name, indexes in INDEXES.items():
+    collection = getattr(db, collection_name)
+    for index in indexes:
+      try:
+        await collection.create_indexes([index])
+      except OperationFailure as e:
+        name = index.document['name']
+        print(f"Indexes: failed to create {name} on {collection.name}: {e}")
+        if index.document.get('unique'):
+          field = next(iter(index.document['key']))
+          failed_unique.append(f"{collection.name}.{field} ({name}) duplicates: {await duplicate_keys(collection, field)}")
+
+  if failed_unique:
+    raise RuntimeError('Indexes: unique indexes not created, remove the duplicate documents and restart: ' + '; '.join(failed_unique))
+
+def used_indexes(plan: Dict[str, Any]) -> List[str]:
+  """
+  Index names used by an explain winning plan (COLLSCAN uses none).
+  """
+  names = [plan['indexName']] if plan.get('stage') == 'IXSCAN' else []
+  for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+    if child:
+      names += used_indexes(child)
+  return names
+
+async def verify_indexes(db: DB) -> Dict[str, bool]:
+  """
+  Explains each hot query and checks it's served by its index.
+  Returns {index: used}, printing the queries that fall back to another plan.
+  """
+  results = {}
+  for collection_name, query_filter, sort, index_name in HOT_QUERIES:
+    cursor = getattr(db, collection_name).find(query_filter)
+    if sort:
+      cursor = cursor.sort(sort)
+    explain = await cursor.explain()
+    plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    # Sharded / newer servers nest the plan one level further
+    plan = plan.get('queryPlan', plan)
+    used = index_name in used_indexes(plan)
+    if not used:
+      print(f"Indexes: {collection_name} query {query_filter} doesn't use {index_name} (plan: {plan.get('stage')})")
+    results[index_name] = used
+  return results
+
+async def bootstrap_indexes(db: DB):
+  # A unique index that can't be built stops the startup (ensure_indexes raises)
+  await ensure_indexes(db)
+  try:
+    results = await verify_indexes(db)
+    print(f"Indexes: {sum(results.values())}/{len(results)} hot queries use their index")
+  except OperationFailure as e:
+    print(f"Indexes: failed to verify the hot queries: {e}")
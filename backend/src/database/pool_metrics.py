@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+  """
+  Connection pool counters of the shared Mongo client: open and checked out
+  connections, checkouts, failures and how long checkouts waited for a connection.
+  Events come from the driver's threads, hence the lock.
+  """
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.created = 0
+    self.closed = 0
+    self.checked_out = 0
+    self.checkouts = 0
+    self.checkout_failures = 0
+    self.checkout_timeouts = 0
+    self.pool_clears = 0
+    self.total_wait = 0.0
+    self.max_wait = 0.0
+    self.started_at = time.time()
+
+  def _record_wait(self, duration: float):
+    self.total_wait += duration
+    self.max_wait = max(self.max_wait, duration)
+
+  def pool_created(self, event):
+    pass
+
+  def pool_ready(self, event):
+    pass
+
+  def pool_cleared(self, event):
+    with self.lock:
+      self.pool_clears += 1
+
+  def pool_closed(self, event):
+    pass
+
+  def connection_created(self, event):
+    with self.lock:
+      self.created += 1
+
+  def connection_ready(self, event):
+    pass
+
+  def connection_closed(self, event):
+    with self.lock:
+      self.closed += 1
+
+  def connection_check_out_started(self, event):
+    pass
+
+  def connection_check_out_failed(self, event):
+    with self.lock:
+      self.checkout_failures += 1
+      if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+        self.checkout_timeouts += 1
+      self._record_wait(event.duration)
+
+  def connection_checked_out(self, event):
+    with self.lock:
+      self.checked_out += 1
+      self.checkouts += 1
+      self._record_wait(event.duration)
+
+  def connection_checked_in(self, event):
+    with self.lock:
+      self.checked_out -= 1
+
+  def stats(self) -> Dict[str, Any]:
+    with self.lock:
+      waits = self.checkouts + self.checkout_failures
+      return {
+        'open': self.created - self.closed,
+        'checkedOut': self.checked_out,
+        'created': self.created,
+        'closed': self.closed,
+        'checkouts': self.checkouts,
+        'checkoutFailures': self.checkout_failures,
+        'checkoutTimeouts': self.checkout_timeouts,
+        'poolClears': self.pool_clears,
+        'avgWaitMs': round(self.total_wait / waits * 1000, 3) if waits else 0.0,
+        'maxWaitMs': round(self.max_wait * 1000, 3),
+        'since': self.started_at,
+      }
+
+pool_metrics = PoolMetrics()
@@ -1,21 +1,99 @@
 import ipaddress
 import re
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 import pytz
 import src.configs.constants as constants
 from bson import ObjectId
-from pydantic import BaseModel, BeforeValidator, Field, field_validator
+from pydantic import (AfterValidator, BaseModel, BeforeValidator, Field,
+                      field_validator, model_validator)
 from pydantic_core import PydanticCustomError
 from typing_extensions import Annotated
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
+def validate_network_cidr(value: str) -> str:
+  try:
+    return ipaddress.ip_network(value, strict=False).compressed
+  except ValueError:
+    raise PydanticCustomError(
+      'invalid_network_cidr_error',
+      'O CIDR da rede é inválido.',
+      {'network_cidr': value},
+    )
+
+NetworkCidr = Annotated[str, AfterValidator(validate_network_cidr)]
+
 class DiscoveredDevice(BaseModel):
   mac_address: str = Field(min_length=12, default=None)
   ip_address: str = Field(...)
 
+class DiscoveredDeviceEntry(DiscoveredDevice):
+  iface: Optional[str] = None
+  firstSeen: datetime
+  lastSeen: datetime
+
+class DiscoveredDeviceCollection(BaseModel):
+  devices: List[DiscoveredDeviceEntry]
+  total: int
+  seq: int # Change feed position this page was read at
+  nextCursor: Optional[str] = None
+
+class DiscoveredDeviceChange(DiscoveredDeviceEntry):
+  seq: int
+  change: Literal['added', 'updated', 'expired']
+
+class DiscoveredDeviceChanges(BaseModel):
+  seq: int
+  resync: bool # Changes were lost, list the devices again
+  changes: List[DiscoveredDeviceChange]
+
+class DeviceFingerprint(BaseModel):
+  mac_address: Optional[str] = None
+  ip_address: str
+  profileId: Optional[str] = None # Best matching profile, None when no (or more than one) profile matches best
+  profileName: Optional[str] = None
+  score: int = 0
+  candidates: List[str] = [] # Profiles tied on the best score
+  sysObjectId: Optional[str] = None
+  sysDescr: Optional[str] = None
+  httpServer: Optional[str] = None
+
+class DeviceFingerprintCollection(BaseModel):
+  devices: List[DeviceFingerprint]
+
+class FingerprintTarget(DiscoveredDevice):
+  @field_validator('ip_address')
+  def validate_ip_address(cls, value):
+    value = str(value)
+    try:
+      return ipaddress.ip_address(value).compressed
+    except ValueError:
+      raise PydanticCustomError(
+        'invalid_ip_address_error',
+        'O endereço IP do dispositivo é inválido.',
+        {'ip_address': value},
+      )
+
+class FingerprintRequest(BaseModel):
+  """
+  Discovered devices to fingerprint, given by address or by network CIDR.
+  """
+  devices: Optional[List[FingerprintTarget]] = Field(default=None, max_length=constants.BULK_ADOPTION_MAX_DEVICES)
+  network_cidr: Optional[NetworkCidr] = Field(default=None)
+  refresh: bool = Field(default=False) # Probe again even if cached
+
+  @model_validator(mode='after')
+  def check_target(self):
+    if not self.devices and not self.network_cidr:
+      raise PydanticCustomError(
+        'fingerprint_target_error',
+        'Informe a lista de dispositivos ou o CIDR da rede.',
+        {},
+      )
+    return self
+
 class DeviceToAdopt(BaseModel):
   id: Optional[PyObjectId] = Field(alias="_id", default=None)
   is_active: Optional[bool] = Field(default=None)
@@ -95,6 +173,14 @@ class DeviceToAdopt(BaseModel):
         {'profileId': value},
       )
 
+def stored_device_fields(document: dict) -> dict:
+  # Ids are stored as ObjectId (or str), the models hold them as str
+  fields = dict(document)
+  for key in ('_id', 'networkId', 'profileId'):
+    if fields.get(key) is not None:
+      fields[key] = str(fields[key])
+  return fields
+
 class Device(BaseModel):
   id: Optional[PyObjectId] = Field(alias="_id", default=None)
   is_active: bool = Field(default=None)
@@ -111,6 +197,14 @@ class Device(BaseModel):
   createdAt: datetime | None = Optional[Field(...)]
   updatedAt: datetime | None = Optional[Field(...)]
 
+  @classmethod
+  def from_db(cls, document: dict) -> 'Device':
+    """
+    Trusted read path: builds a Device from a stored document without running the
+    validators, which already ran when it was written. Only ids need converting.
+    """
+    return cls.model_construct(**stored_device_fields(document))
+
   @field_validator('createdAt', 'updatedAt')
   def string_to_date(cls, v: object) -> object:
     if isinstance(v, str):
@@ -187,9 +281,98 @@ class Device(BaseModel):
         {'profileId': value},
       )
 
+class BulkAdoptionRequest(BaseModel):
+  """
+  Either an explicit list of devices, or every discovered device in network_cidr
+  adopted with profileId and the given credentials. Devices without a profileId
+  get the profile their fingerprint matches.
+  """
+  devices: Optional[List[DeviceToAdopt]] = Field(default=None, max_length=constants.BULK_ADOPTION_MAX_DEVICES)
+  network_cidr: Optional[NetworkCidr] = Field(default=None)
+  profileId: PyObjectId | None = Field(default=None)
+  networkId: PyObjectId | None = Field(default=None)
+  user: Optional[str] = Field(default=None)
+  password: Optional[str] = Field(default=None)
+
+  @field_validator('profileId', 'networkId')
+  def validate_ids(cls, value):
+    if value is not None and not ObjectId.is_valid(value):
+      raise PydanticCustomError(
+        'invalid_id_error',
+        'O id informado é inválido.',
+        {'id': value},
+      )
+    return value
+
+  @model_validator(mode='after')
+  def check_adoption_target(self):
+    if self.devices:
+      return self
+    if not self.network_cidr:
+      raise PydanticCustomError(
+        'bulk_adoption_target_error',
+        'Informe a lista de dispositivos ou o CIDR da rede a adotar.',
+        {},
+      )
+    if not (self.user and self.password):
+      raise PydanticCustomError(
+        'bulk_adoption_cidr_error',
+        'A adoção por CIDR requer usuário e senha.',
+        {'network_cidr': self.network_cidr},
+      )
+    return self
+
 class DeviceCollection(BaseModel):
   devices: List[Device]
 
+  @classmethod
+  def from_db(cls, documents: List[dict]) -> 'DeviceCollection':
+    return cls.model_construct(devices=[Device.from_db(document) for document in documents])
+
+class DeviceView(BaseModel):
+  """
+  Read only subset of a Device, fetched with a projection of its own fields and
+  built like Device.from_db. Fields left out of the projection stay unset.
+  """
+  id: Optional[PyObjectId] = Field(alias="_id", default=None)
+
+  @classmethod
+  def from_db(cls, document: dict):
+    return cls.model_construct(**stored_device_fields(document))
+
+class DeviceSummary(DeviceView):
+  """
+  Device as listed on the dashboard: everything but the login credentials.
+  """
+  is_active: Optional[bool] = None
+  name: Optional[str] = None
+  mac_address: Optional[str] = None
+  ip_address: Optional[str] = None
+  model: Optional[str] = None
+  fw_version: Optional[str] = None
+  location: Optional[str] = None
+  networkId: PyObjectId | None = None
+  profileId: PyObjectId | None = None
+  createdAt: Optional[datetime] = None
+  updatedAt: Optional[datetime] = None
+
+class DeviceSummaryCollection(BaseModel):
+  devices: List[DeviceSummary]
+
+class DeviceMonitorView(DeviceView):
+  """
+  What monitoring and topology discovery read of each device: how to reach it,
+  its profile and network, and the info synced back from its stats. Credentials
+  are left out, the driver pool loads the full device when it builds a driver.
+  """
+  name: Optional[str] = None
+  ip_address: Optional[str] = None
+  model: Optional[str] = None
+  fw_version: Optional[str] = None
+  location: Optional[str] = None
+  networkId: PyObjectId | None = None
+  profileId: PyObjectId | None = None
+
 class DeviceUpdate(BaseModel):
   mac_address: Optional[str] = None
   ip_address: Optional[str] = Field(default=None)
@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+
+import pytz
+from pydantic import BaseModel, BeforeValidator, Field, field_validator
+from typing_extensions import Annotated
+
+PyObjectId = Annotated[str, BeforeValidator(str)]
+
+JobStatus = Literal['queued', 'running', 'success', 'failed']
+
+class JobStep(BaseModel):
+  name: str
+  status: Literal['running', 'success', 'failed']
+  startedAt: datetime
+  finishedAt: Optional[datetime] = None
+  durationMs: Optional[float] = None
+  message: Optional[str] = None
+
+class Job(BaseModel):
+  id: Optional[PyObjectId] = Field(alias="_id", default=None)
+  jobType: str
+  status: JobStatus = 'queued'
+  createdBy: Optional[PyObjectId] = None
+  request: Dict[str, Any] = {} # Summary of what was asked, without credentials
+  steps: List[JobStep] = []
+  progress: Dict[str, int] = {}
+  results: List[Dict[str, Any]] = []
+  error: Optional[str] = None
+  createdAt: datetime | None = None
+  startedAt: datetime | None = None
+  finishedAt: datetime | None = None
+
+  @field_validator('createdAt', 'startedAt', 'finishedAt')
+  @classmethod
+  def string_to_date(cls, v: object) -> object:
+    if isinstance(v, str):
+      return datetime.fromisoformat(v).astimezone(tzinfo=pytz.timezone('America/Sao_Paulo'))
+    return v
+
+class JobCollection(BaseModel):
+  jobs: List[Job]
+
+class JobCreated(BaseModel):
+  success: bool = True
+  message: str
+  jobId: PyObjectId
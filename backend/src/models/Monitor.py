@@ -20,3 +20,40 @@ class DeviceMonitorUpdate(BaseModel):
   latency: Optional[float] = None
   stats: Dict[str, Any] = {}
   timestamp: datetime = None
+
+
+class ExecutorLaneStats(BaseModel):
+  """
+  Queue depth and saturation of one blocking executor lane.
+  """
+  lane: str
+  maxWorkers: int
+  running: int
+  queued: int
+  saturation: float
+  saturated: bool
+  maxQueueDepth: int
+  submitted: int
+  completed: int
+  failed: int
+  cancelled: int # queued jobs cancelled before they started
+  avgWaitMs: float
+  maxWaitMs: float
+
+
+class DatabasePoolStats(BaseModel):
+  """
+  Connection pool usage of the shared Mongo client.
+  """
+  maxPoolSize: int
+  open: int
+  checkedOut: int
+  created: int
+  closed: int
+  checkouts: int
+  checkoutFailures: int
+  checkoutTimeouts: int
+  poolClears: int
+  avgWaitMs: float
+  maxWaitMs: float
+  since: datetime
@@ -21,6 +21,18 @@ class Network(BaseModel):
   createdAt: datetime | None = Optional[Field(...)]
   updatedAt: datetime | None = Optional[Field(...)]
 
+  @classmethod
+  def from_db(cls, document: dict) -> 'Network':
+    """
+    Trusted read path, see Device.from_db.
+    """
+    return cls.model_construct(**{
+      **document,
+      '_id': None if document.get('_id') is None else str(document['_id']),
+      'devices': [str(device_id) for device_id in document.get('devices') or []],
+      'organizationId': None if document.get('organizationId') is None else str(document['organizationId']),
+    })
+
   @field_validator('createdAt', 'updatedAt')
   @classmethod
   def string_to_date(cls, v: object) -> object:
@@ -63,6 +75,10 @@ class Network(BaseModel):
 class NetworkCollection(BaseModel):
   networks: List[Network]
 
+  @classmethod
+  def from_db(cls, documents: List[dict]) -> 'NetworkCollection':
+    return cls.model_construct(networks=[Network.from_db(document) for document in documents])
+
 class NetworkUpdate(BaseModel):
   name: Optional[str] = None
   network_type: Optional[str] = None
@@ -17,6 +17,18 @@ class Organization(BaseModel):
   createdAt: datetime | None = Optional[Field(...)]
   updatedAt: datetime | None = Optional[Field(...)]
 
+  @classmethod
+  def from_db(cls, document: dict) -> 'Organization':
+    """
+    Trusted read path, see Device.from_db.
+    """
+    return cls.model_construct(**{
+      **document,
+      '_id': None if document.get('_id') is None else str(document['_id']),
+      'users': [str(user_id) for user_id in document.get('users') or []],
+      'networks': [str(network_id) for network_id in document.get('networks') or []],
+    })
+
   @field_validator('createdAt', 'updatedAt')
   @classmethod
   def string_to_date(cls, v: object) -> object:
@@ -30,6 +42,10 @@ class DetailedOrganization(Organization):
 class OrganizationCollection(BaseModel):
   organizations: List[Organization]
 
+  @classmethod
+  def from_db(cls, documents: List[dict]) -> 'OrganizationCollection':
+    return cls.model_construct(organizations=[Organization.from_db(document) for document in documents])
+
 class OrganizationUpdate(BaseModel):
   name: Optional[str]
 
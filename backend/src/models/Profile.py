@@ -1,5 +1,6 @@
+import re
 from datetime import datetime
-from typing import Annotated, Any, Dict, List, Literal, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple
 
 import pytz
 from pydantic import BaseModel, BeforeValidator, Field, field_validator
@@ -42,12 +43,60 @@ class Action(BaseModel):
   sshDetails: Optional[SshDetails] = Field(default=None)
   httpDetails: Optional[HttpDetails] = Field(default=None)
 
+class Fingerprint(BaseModel):
+  """
+  Signatures identifying the devices of a profile. A device matches when every
+  declared signature that could be observed on it matches: sysObjectId prefixes,
+  and regexes (case insensitive) over sysDescr, the HTTP Server/WWW-Authenticate
+  headers and the body of the page at httpPath (e.g. the login page).
+  Without httpScheme, the page is fetched over HTTPS on port 443 and HTTP otherwise.
+  """
+  sysObjectId: Optional[List[str]] = Field(default=None)
+  sysDescr: Optional[List[str]] = Field(default=None)
+  httpScheme: Optional[Literal['http', 'https']] = Field(default=None)
+  httpPort: int = Field(default=80, ge=1, le=65535)
+  httpPath: str = Field(default='/')
+  httpServer: Optional[List[str]] = Field(default=None)
+  httpBody: Optional[List[str]] = Field(default=None)
+
+  @field_validator('sysObjectId')
+  @classmethod
+  def validate_sys_object_id(cls, value):
+    if value is None:
+      return value
+    return [str(oid).strip('.') for oid in value]
+
+  @field_validator('sysDescr', 'httpServer', 'httpBody')
+  @classmethod
+  def validate_patterns(cls, value):
+    if value is None:
+      return value
+    for pattern in value:
+      try:
+        re.compile(pattern)
+      except re.error:
+        raise PydanticCustomError(
+          'invalid_fingerprint_pattern_error',
+          'O padrão de fingerprint é inválido.',
+          {'pattern': pattern},
+        )
+    return value
+
+  def probes_http(self) -> bool:
+    return bool(self.httpServer or self.httpBody)
+
+  def http_target(self) -> Tuple[str, int, str]:
+    scheme = self.httpScheme or ('https' if self.httpPort == 443 else 'http')
+    return (scheme, self.httpPort, self.httpPath)
+
 class Profile(BaseModel):
   id: Optional[PyObjectId] = Field(alias="_id", default=None)
   name: str = Field(default=None)
   stationTable: StationTableModel = Field(default=None)
   apiBaseUrl: str = Field(default=None)
   actions: Dict[str, Action] = Field(default=None)
+  pollInterval: Optional[int] = Field(default=None, ge=2) # seconds between monitor polls of each device
+  fingerprint: Optional[Fingerprint] = Field(default=None)
   createdAt: datetime | None = Optional[Field(...)]
   updatedAt: datetime | None = Optional[Field(...)]
 
@@ -75,6 +124,8 @@ class ProfileUpdate(BaseModel):
   stationTable: Optional[StationTableModel] = Field(default=None)
   apiBaseUrl: Optional[str] = Field(default=None)
   actions: Optional[Dict[str, Action]] = Field(default=None)
+  pollInterval: Optional[int] = Field(default=None, ge=2)
+  fingerprint: Optional[Fingerprint] = Field(default=None)
 
   @field_validator('name')
   @classmethod
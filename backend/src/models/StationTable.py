@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from pydantic import BaseModel, Field
 
@@ -7,3 +7,4 @@ class StationTableModel(BaseModel):
   root_oid: str = Field(...)
   field_map: Dict[str, str]
   index_from: None | str | int = Field(default=None)
+  max_repetitions: Optional[int] = Field(default=None, ge=1, le=200) # GETBULK max-repetitions for this table
@@ -4,5 +4,5 @@ from pydantic import BaseModel
 
 
 class WebsocketMessage(BaseModel):
-  messageType: Literal['topology', 'deviceMonitor']
+  messageType: Literal['topology', 'deviceMonitor', 'deviceMonitorDelta']
   data: dict = {}
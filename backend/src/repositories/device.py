@@ -1,43 +1,70 @@
 import ipaddress
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, Dict, List
 
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
+from fastapi import HTTPException
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from src.database.db import DB
-from src.models.Device import Device, DeviceCollection, DeviceUpdate
-from src.shared.utils import validate_id
+from src.database.indexes import unique_field_violation
+from src.models.Device import (Device, DeviceCollection, DeviceUpdate,
+                               DeviceView)
+from src.shared.pagination import OrderBy, find_keyset
+from src.shared.utils import model_projection, validate_id
 
 
 class DeviceRepository:
 
   @classmethod
   async def list_devices(cls, db: DB):
-    devices = await db.devices_collection.find().to_list(1000)
-    return DeviceCollection(devices=devices)
+    devices = await db.devices_collection.find().to_list(None)
+    return DeviceCollection.from_db(devices)
 
   @classmethod
   async def list_devices_by_networks(cls, db: DB, networks: List[str]):
-    devices = await db.devices_collection.find({'networkId': {'$in': networks}}).to_list(1000)
-    return DeviceCollection(devices=devices)
+    devices = await db.devices_collection.find({'networkId': {'$in': networks}}).to_list(None)
+    return DeviceCollection.from_db(devices)
 
   @classmethod
   async def list_devices_by_compound_filter(cls, db: DB, compound_filter: dict):
-    devices = await db.devices_collection.find(compound_filter).to_list(1000)
-    return DeviceCollection(devices=devices)
+    devices = await db.devices_collection.find(compound_filter).to_list(None)
+    return DeviceCollection.from_db(devices)
+
+  @classmethod
+  async def list_device_views(cls, db: DB, view: type[DeviceView], compound_filter: dict | None = None) -> List[DeviceView]:
+    """
+    Devices matching compound_filter as view, fetching only the fields of view.
+    """
+    devices = await db.devices_collection.find(compound_filter or {}, model_projection(view)).to_list(None)
+    return [view.from_db(device) for device in devices]
+
+  @classmethod
+  async def iter_devices_by_compound_filter(cls, db: DB, compound_filter: dict, order_by: OrderBy = '_id', after: str | None = None,
+                                            limit: int | None = None, view: type[DeviceView] | None = None,
+                                            projection: Dict[str, int] | None = None) -> AsyncIterator[Device | DeviceView]:
+    """
+    Devices matching compound_filter in keyset order, built one by one as the cursor yields them.
+    With a view, only its fields are fetched (or those of projection, which should be a subset of them).
+    """
+    if view and projection is None:
+      projection = model_projection(view)
+    model = view or Device
+    async for device in find_keyset(db.devices_collection, compound_filter, projection=projection, order_by=order_by, after=after, limit=limit):
+      yield model.from_db(device)
 
   @classmethod
   async def list_devices_by_filter(cls, db: DB, **filters):
     if all(x in filters.keys() for x in ['model', 'fw_version', 'location', 'networkId', 'profileId', 'createdAt', 'updatedAt']):
       raise http_exceptions.INVALID_FIELD(field=f'campo de filtro de dispositivo')
-    devices = await db.devices_collection.find(filters).to_list(1000)
-    return DeviceCollection(devices=devices)
+    devices = await db.devices_collection.find(filters).to_list(None)
+    return DeviceCollection.from_db(devices)
 
   @classmethod
   async def get_all_devices_from_list(cls, db: DB, list_of_devices: List[ObjectId]):
-    devices = await db.devices_collection.find({'_id': {'$in': list_of_devices}}).to_list(1000)
-    return DeviceCollection(devices=devices)
+    devices = await db.devices_collection.find({'_id': {'$in': list_of_devices}}).to_list(None)
+    return DeviceCollection.from_db(devices)
 
   @classmethod
   async def get_device_by(cls, db: DB, field: str, value):
@@ -48,28 +75,77 @@ class DeviceRepository:
     device = await db.devices_collection.find_one({field: value})
     if not device:
       return None
-    return Device(**device)
+    return Device.from_db(device)
 
   @classmethod
   async def create_device(cls, db: DB, new_device_data: Device):
-    name_already_taken = await db.devices_collection.find_one({'name': new_device_data.name})
-    mac_address_already_taken = await db.devices_collection.find_one({'mac_address': new_device_data.mac_address})
-    ip_address_already_taken = await db.devices_collection.find_one({'ip_address': new_device_data.ip_address})
-
-    if name_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome do dispositivo')
-    if mac_address_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Endereço MAC')
-    if ip_address_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Endereço IP')
-
     new_device_data.createdAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
     new_device_data.updatedAt = new_device_data.createdAt
 
-    device_to_db = await db.devices_collection.insert_one(new_device_data.model_dump(by_alias=True, exclude=['id']))
+    # Name, MAC and IP uniqueness is enforced by the unique indexes
+    try:
+      device_to_db = await db.devices_collection.insert_one(new_device_data.model_dump(by_alias=True, exclude=['id']))
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return device_to_db.inserted_id
 
+  @classmethod
+  async def find_taken_fields(cls, db: DB, mac_addresses: List[str] = (), ip_addresses: List[str] = (), names: List[str] = ()):
+    """
+    Which of the given MACs, IPs and names already belong to a device, in a single query.
+    """
+    conditions = []
+    if mac_addresses:
+      conditions.append({'mac_address': {'$in': list(mac_addresses)}})
+    if ip_addresses:
+      conditions.append({'ip_address': {'$in': list(ip_addresses)}})
+    if names:
+      conditions.append({'name': {'$in': list(names)}})
+
+    taken = {'mac_address': set(), 'ip_address': set(), 'name': set()}
+    if not conditions:
+      return taken
+
+    async for device in db.devices_collection.find({'$or': conditions}, {'mac_address': 1, 'ip_address': 1, 'name': 1}):
+      for field in taken:
+        if device.get(field) is not None:
+          taken[field].add(device[field])
+    return taken
+
+  @classmethod
+  async def create_devices(cls, db: DB, new_devices: List[Device]) -> List[ObjectId | HTTPException]:
+    """
+    Inserts devices in one unordered insert_many. Returns, in order, each new
+    device id or the unique field error that kept that device out.
+    """
+    if not new_devices:
+      return []
+
+    created_at = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
+    documents = []
+    for device in new_devices:
+      device.createdAt = created_at
+      device.updatedAt = created_at
+      documents.append(device.model_dump(by_alias=True, exclude=['id']))
+
+    try:
+      inserted = await db.devices_collection.insert_many(documents, ordered=False)
+      return inserted.inserted_ids
+    except BulkWriteError as e:
+      # Every document got its _id client side, the failed ones are reported by index
+      results: List[ObjectId | HTTPException] = [document['_id'] for document in documents]
+      for write_error in e.details['writeErrors']:
+        if write_error['code'] != 11000:
+          raise
+        results[write_error['index']] = unique_field_violation(DuplicateKeyError(write_error['errmsg'], write_error['code']))
+      return results
+
+  @classmethod
+  async def delete_devices(cls, db: DB, device_ids: List[ObjectId]):
+    deleted = await db.devices_collection.delete_many({'_id': {'$in': device_ids}})
+    return deleted.deleted_count
+
   @classmethod
   async def validate_new_device_info(cls, db: DB, existent_device: Device, new_device_data: DeviceUpdate,
                                      profile_update_needed: bool, network_update_needed: bool):
@@ -113,11 +189,30 @@ class DeviceRepository:
 
     new_device_data.updatedAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
 
-    stored_new_device_data = await db.devices_collection.find_one_and_update({'_id': device_id},
-                                                                             {'$set': new_device_data.model_dump(by_alias=True, exclude=['id'])},
-                                                                             return_document=True)
+    try:
+      stored_new_device_data = await db.devices_collection.find_one_and_update({'_id': device_id},
+                                                                               {'$set': new_device_data.model_dump(by_alias=True, exclude=['id'])},
+                                                                               return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
+
+    return Device.from_db(stored_new_device_data)
+
+  @classmethod
+  async def update_device_fields(cls, db: DB, device_id: ObjectId, fields: dict) -> Device:
+    # Partial update, leaves fields not in `fields` untouched (e.g. IP rewritten by discovery)
+    fields = {**fields, 'updatedAt': datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())}
+
+    try:
+      stored_new_device_data = await db.devices_collection.find_one_and_update({'_id': validate_id(device_id, 'device_id')},
+                                                                               {'$set': fields},
+                                                                               return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
+    if not stored_new_device_data:
+      raise http_exceptions.DOCUMENT_INEXISTENT(document='dispositivo')
 
-    return Device(**stored_new_device_data)
+    return Device.from_db(stored_new_device_data)
 
   @classmethod
   async def update_device_ip(cls, db: DB, device_id: ObjectId, new_ip_address: str) -> Device:
@@ -131,15 +226,10 @@ class DeviceRepository:
       return device
 
     try:
-      valid_new_ip_address = ipaddress.ip_address(new_ip_address)
+      valid_new_ip_address = str(ipaddress.ip_address(new_ip_address))
     except ValueError:
       raise http_exceptions.INVALID_FIELD(field='new ip_address')
 
-    # Check if new IP address already exists in another device
-    ip_conflict = await cls.get_device_by(db, field="ip_address", value=valid_new_ip_address)
-    if ip_conflict:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Endereço IP')
-
     # Apply update
     updated_at = datetime.fromisoformat(
       datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat()
@@ -150,13 +240,17 @@ class DeviceRepository:
       "updatedAt": updated_at
     }
 
-    stored_new_device_data = await db.devices_collection.find_one_and_update(
-      {"_id": validate_id(device_id, "device_id")},
-      {"$set": update_data},
-      return_document=True
-    )
+    # An IP already in use by another device is rejected by its unique index
+    try:
+      stored_new_device_data = await db.devices_collection.find_one_and_update(
+        {"_id": validate_id(device_id, "device_id")},
+        {"$set": update_data},
+        return_document=True
+      )
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
-    return Device(**stored_new_device_data)
+    return Device.from_db(stored_new_device_data)
 
   @classmethod
   async def remove_devices_network(cls, db: DB, network_id: ObjectId, devices: List[ObjectId] = None):
@@ -182,7 +276,7 @@ class DeviceRepository:
 
   @classmethod
   async def remove_all_network_devices(cls, db: DB, network_id: ObjectId):
-    devices_from_network = await db.devices_collection.find({'networkId': str(network_id)}).to_list(1000)
+    devices_from_network = await db.devices_collection.find({'networkId': str(network_id)}).to_list(None)
     if not devices_from_network:
       return True, []
     removed_network_devices = await db.devices_collection.delete_many({'networkId': str(network_id)})
@@ -194,4 +288,4 @@ class DeviceRepository:
     deleted_device = await db.devices_collection.find_one_and_delete({"_id": device_id})
     if not deleted_device:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='dispositivo')
-    return Device(**deleted_device)
+    return Device.from_db(deleted_device)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+import src.configs.constants as constants
+from bson import ObjectId
+from src.database.db import DB
+from src.models.Job import Job, JobCollection, JobStep
+from src.shared.utils import validate_id
+
+
+def now() -> datetime:
+  return datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
+
+
+class JobRepository:
+
+  @classmethod
+  async def create_job(cls, db: DB, new_job_data: Job) -> ObjectId:
+    new_job_data.createdAt = now()
+    new_job = await db.jobs_collection.insert_one(new_job_data.model_dump(by_alias=True, exclude=['id']))
+    return new_job.inserted_id
+
+  @classmethod
+  async def get_job_by_id(cls, db: DB, job_id) -> Job | None:
+    job_id = validate_id(target_id=job_id, id_field_name='jobId')
+    job = await db.jobs_collection.find_one({'_id': job_id})
+    if not job:
+      return None
+    return Job(**job)
+
+  @classmethod
+  async def list_jobs(cls, db: DB, created_by: str | None = None, limit: int = constants.JOBS_LIST_LIMIT) -> JobCollection:
+    job_filter = {'createdBy': created_by} if created_by else {}
+    # Results can be large (bulk adoptions), the list only carries the summary
+    jobs = await db.jobs_collection.find(job_filter, {'results': 0}).sort('createdAt', -1).to_list(limit)
+    return JobCollection(jobs=jobs)
+
+  @classmethod
+  async def update_job(cls, db: DB, job_id: ObjectId, fields: Dict[str, Any]):
+    await db.jobs_collection.update_one({'_id': job_id}, {'$set': fields})
+
+  @classmethod
+  async def push_step(cls, db: DB, job_id: ObjectId, step: JobStep):
+    await db.jobs_collection.update_one({'_id': job_id}, {'$push': {'steps': step.model_dump()}})
+
+  @classmethod
+  async def set_last_step(cls, db: DB, job_id: ObjectId, step: JobStep):
+    await db.jobs_collection.update_one({'_id': job_id}, {'$set': {'steps.$[last]': step.model_dump()}},
+                                        array_filters=[{'last.name': step.name, 'last.status': 'running'}])
+
+  @classmethod
+  async def push_results(cls, db: DB, job_id: ObjectId, results: List[Dict[str, Any]], progress: Dict[str, int]):
+    await db.jobs_collection.update_one({'_id': job_id}, {'$push': {'results': {'$each': results}}, '$set': {'progress': progress}})
+
+  @classmethod
+  async def fail_interrupted_jobs(cls, db: DB) -> int:
+    """
+    Jobs left queued/running by a previous process can't be resumed, they're marked failed.
+    """
+    interrupted = await db.jobs_collection.update_many({'status': {'$in': ['queued', 'running']}},
+                                                       {'$set': {'status': 'failed', 'finishedAt': now(),
+                                                                 'error': 'Job interrompido pelo reinício da API.'}})
+    return interrupted.modified_count
@@ -1,13 +1,16 @@
 from datetime import datetime
-from typing import List
+from typing import AsyncIterator, List
 
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from pymongo import UpdateOne
 from src.database.db import DB
+from src.database.indexes import unique_field_violation
 from src.models.Network import (Network, NetworkCollection, NetworkUpdate,
                                 PyObjectId)
+from src.shared.pagination import OrderBy, find_keyset
 from src.shared.utils import validate_id
 
 
@@ -15,23 +18,28 @@ class NetworkRepository:
 
   @classmethod
   async def list_networks(cls, db: DB):
-    networks = await db.networks_collection.find().to_list(1000)
-    return NetworkCollection(networks=networks)
+    networks = await db.networks_collection.find().to_list(None)
+    return NetworkCollection.from_db(networks)
+
+  @classmethod
+  async def iter_networks(cls, db: DB, order_by: OrderBy = '_id', after: str | None = None, limit: int | None = None) -> AsyncIterator[Network]:
+    async for network in find_keyset(db.networks_collection, order_by=order_by, after=after, limit=limit):
+      yield Network.from_db(network)
 
   @classmethod
   async def list_networks_by_filter(cls, db: DB, **filters):
     if all(x in filters.keys() for x in ['network_type', 'location', 'organizationId', 'createdAt', 'updatedAt']):
       raise http_exceptions.INVALID_FIELD(field=f'campo de filtro de redes')
-    networks = await db.networks_collection.find(filters).to_list(1000)
-    return NetworkCollection(networks=networks)
+    networks = await db.networks_collection.find(filters).to_list(None)
+    return NetworkCollection.from_db(networks)
 
   @classmethod
   async def list_networks_by_ids(cls, db: DB, ids: List[PyObjectId]):
     ids = [ObjectId(i) for i in ids]
     if not ids:
       raise http_exceptions.INVALID_FIELD(field=f'lista de ids')
-    networks = await db.networks_collection.find({'_id': {'$in': ids}}).to_list(1000)
-    return NetworkCollection(networks=networks)
+    networks = await db.networks_collection.find({'_id': {'$in': ids}}).to_list(None)
+    return NetworkCollection.from_db(networks)
 
   @classmethod
   async def get_network_by(cls, db: DB, field: str, value):
@@ -42,19 +50,17 @@ class NetworkRepository:
     network = await db.networks_collection.find_one({field: value})
     if not network:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='rede')
-    return Network(**network)
+    return Network.from_db(network)
 
   @classmethod
   async def create_network(cls, db: DB, new_network_data: Network):
-    name_already_taken = await db.networks_collection.find_one({"name": new_network_data.name})
-
-    if name_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de rede')
-
     new_network_data.createdAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
     new_network_data.updatedAt = new_network_data.createdAt
 
-    new_network = await db.networks_collection.insert_one(new_network_data.model_dump(by_alias=True, exclude=['id']))
+    try:
+      new_network = await db.networks_collection.insert_one(new_network_data.model_dump(by_alias=True, exclude=['id']))
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return new_network.inserted_id
 
@@ -66,12 +72,6 @@ class NetworkRepository:
     if not existent_network:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='rede')
 
-    # Check if new name is not already registered
-    if new_network_data.name is not None and new_network_data.name != existent_network['name']:
-      new_name_not_available = await db.networks_collection.find_one({"name": new_network_data.name})
-      if new_name_not_available:
-        raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de rede')
-
     new_network_data_dict = new_network_data.model_dump()
     network_to_be_edited = existent_network.copy()
 
@@ -84,11 +84,14 @@ class NetworkRepository:
     new_network = Network(**network_to_be_edited)
     new_network.updatedAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
 
-    updated_network = await db.networks_collection.find_one_and_update({"_id": network_id},
-                                                                       {"$set": new_network.model_dump(by_alias=True, exclude=['id'])},
-                                                                       return_document=True)
+    try:
+      updated_network = await db.networks_collection.find_one_and_update({"_id": network_id},
+                                                                         {"$set": new_network.model_dump(by_alias=True, exclude=['id'])},
+                                                                         return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
-    return Network(**updated_network)
+    return Network.from_db(updated_network)
 
   @classmethod
   async def move_device_to_network(cls, db: DB, device_id: ObjectId, initial_network_id: str | None, target_network_id: str | None):
@@ -141,6 +144,19 @@ class NetworkRepository:
 
     return change_user_net_result.acknowledged
 
+  @classmethod
+  async def add_devices_to_network(cls, db: DB, network_id: str, device_ids: List[ObjectId]):
+    """
+    Appends newly created devices to a network in a single update.
+    """
+    network_id = validate_id(target_id=network_id, id_field_name='networkId da rede')
+    update_at_time = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
+
+    added_devices = await db.networks_collection.update_one({'_id': network_id},
+                                                            {'$push': {'devices': {'$each': device_ids}},
+                                                             '$set': {'updatedAt': update_at_time}})
+    return added_devices.matched_count == 1
+
   @classmethod
   async def remove_device_from_network(cls, db: DB, device_id: ObjectId, network_id: ObjectId):
     network_id = validate_id(target_id=network_id, id_field_name='networkId')
@@ -175,4 +191,4 @@ class NetworkRepository:
     deleted_network = await db.networks_collection.find_one_and_delete({"_id": network_id})
     if not deleted_network:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='rede')
-    return Network(**deleted_network)
+    return Network.from_db(deleted_network)
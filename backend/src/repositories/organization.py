@@ -3,8 +3,10 @@ from datetime import datetime
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from pymongo import UpdateOne
 from src.database.db import DB
+from src.database.indexes import unique_field_violation
 from src.models.Organization import (Organization, OrganizationCollection,
                                      OrganizationUpdate)
 from src.shared.utils import validate_id
@@ -14,15 +16,15 @@ class OrganizationRepository:
 
   @classmethod
   async def list_organizations(cls, db: DB):
-    organizations = await db.organizations_collection.find().to_list(1000)
-    return OrganizationCollection(organizations=organizations)
+    organizations = await db.organizations_collection.find().to_list(None)
+    return OrganizationCollection.from_db(organizations)
 
   @classmethod
   async def get_organizations_by_ids(cls, db: DB, ids: list[str]):
     object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
     orgs = await db.organizations_collection.find(
         { "_id": { "$in": object_ids } }
-    ).to_list(1000)
+    ).to_list(None)
 
     return { str(o["_id"]): o for o in orgs }
 
@@ -35,19 +37,17 @@ class OrganizationRepository:
     organization = await db.organizations_collection.find_one({field: value})
     if not organization:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='organização')
-    return Organization(**organization)
+    return Organization.from_db(organization)
 
   @classmethod
   async def create_organization(cls, db: DB, new_organization_data: Organization):
-    name_already_taken = await db.organizations_collection.find_one({"name": new_organization_data.name})
-
-    if name_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de organização')
-
     new_organization_data.createdAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
     new_organization_data.updatedAt = new_organization_data.createdAt
 
-    new_organization = await db.organizations_collection.insert_one(new_organization_data.model_dump(by_alias=True, exclude=['id']))
+    try:
+      new_organization = await db.organizations_collection.insert_one(new_organization_data.model_dump(by_alias=True, exclude=['id']))
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return new_organization.inserted_id
 
@@ -59,12 +59,6 @@ class OrganizationRepository:
     if not existent_organization:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='organização')
 
-    # Check if new name is not already registered
-    if new_organization_data.name is not None and new_organization_data.name != existent_organization['name']:
-      new_name_not_available = await db.organizations_collection.find_one({"name": new_organization_data.name})
-      if new_name_not_available:
-        raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de organização')
-
     new_organization_data_dict = new_organization_data.model_dump()
     organization_to_be_edited = existent_organization.copy()
 
@@ -74,11 +68,14 @@ class OrganizationRepository:
     new_organization = Organization(**organization_to_be_edited)
     new_organization.updatedAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
 
-    updated_organization = await db.organizations_collection.find_one_and_update({"_id": organization_id},
-                                                                                 {"$set": new_organization.model_dump(by_alias=True, exclude=['id'])},
-                                                                                 return_document=True)
+    try:
+      updated_organization = await db.organizations_collection.find_one_and_update({"_id": organization_id},
+                                                                                   {"$set": new_organization.model_dump(by_alias=True, exclude=['id'])},
+                                                                                   return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
-    return Organization(**updated_organization)
+    return Organization.from_db(updated_organization)
 
   @classmethod
   async def move_item_to_organization(cls, db: DB, item_id: ObjectId, item_list: str, initial_organization_id: str | None, target_organization_id: str | None):
@@ -155,4 +152,4 @@ class OrganizationRepository:
     deleted_organization = await db.organizations_collection.find_one_and_delete({"_id": organization_id})
     if not deleted_organization:
       raise http_exceptions.DOCUMENT_INEXISTENT(document='organização')
-    return Organization(**deleted_organization)
+    return Organization.from_db(deleted_organization)
@@ -1,10 +1,14 @@
 from datetime import datetime
+from typing import AsyncIterator, Dict
 
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from src.configs import constants
 from src.database.db import DB
+from src.database.indexes import unique_field_violation
 from src.models.Profile import Profile, ProfileCollection, ProfileUpdate
 from src.shared import http_exceptions
+from src.shared.pagination import OrderBy, find_keyset
 from src.shared.utils import validate_id
 
 
@@ -12,21 +16,29 @@ class ProfileRepository:
 
   @classmethod
   async def list_profiles(cls, db: DB):
-    profiles = await db.profiles_collection.find({}).to_list(1000)
+    profiles = await db.profiles_collection.find({}).to_list(None)
     return ProfileCollection(profiles=profiles)
 
+  @classmethod
+  async def iter_profiles(cls, db: DB, order_by: OrderBy = '_id', after: str | None = None, limit: int | None = None) -> AsyncIterator[Profile]:
+    async for profile in find_keyset(db.profiles_collection, order_by=order_by, after=after, limit=limit):
+      yield Profile(**profile)
+
   @classmethod
   async def list_profiles_by_filter(cls, db: DB, **filters):
     if all(x in filters.keys() for x in ['_id', 'name']):
       raise http_exceptions.INVALID_FIELD(field=f'campo de filtro de profile')
-    profiles = await db.profiles_collection.find(filters).to_list(1000)
+    profiles = await db.profiles_collection.find(filters).to_list(None)
     for profile in profiles:
       profile['_id'] = str(profile['_id'])
     return profiles
 
   @classmethod
-  async def get_all_profiles_as_map(cls, db: DB):
-    profiles = await db.profiles_collection.find({}).to_list(1000)
+  async def get_all_profiles_as_map(cls, db: DB, projection: Dict[str, int] | None = None):
+    """
+    Profiles by id. With a projection, the profiles only hold its fields (the rest stays None).
+    """
+    profiles = await db.profiles_collection.find({}, projection).to_list(None)
     collection = ProfileCollection(profiles=profiles)
     mapping = {x.id: x for x in collection.profiles}
     return mapping
@@ -44,26 +56,18 @@ class ProfileRepository:
 
   @classmethod
   async def create_profile(cls, db: DB, profile_data: Profile):
-    name_already_taken = await db.profiles_collection.find_one({'name': profile_data.name})
-
-    if name_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de profile')
-
     profile_data.createdAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
     profile_data.updatedAt = profile_data.createdAt
 
-    inserted_profile = await db.profiles_collection.insert_one(profile_data.model_dump(by_alias=True, exclude=['id']))
+    try:
+      inserted_profile = await db.profiles_collection.insert_one(profile_data.model_dump(by_alias=True, exclude=['id']))
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return inserted_profile.inserted_id
 
   @classmethod
   async def update_profile_by_id(cls, db: DB, profile_id: ObjectId, existent_profile: dict, profile_update_data: ProfileUpdate):
-    # Check if new name is not already taken
-    if profile_update_data.name is not None and profile_update_data.name != existent_profile['name']:
-      new_name_already_taken = await db.profiles_collection.find_one({"name": profile_update_data.name})
-      if new_name_already_taken:
-        raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de profile')
-
     updated_profile = Profile(**existent_profile)
     need_update = False
 
@@ -83,14 +87,27 @@ class ProfileRepository:
       updated_profile.actions = profile_update_data.actions
       need_update = True
 
+    # An explicit null clears the interval back to the default
+    if 'pollInterval' in profile_update_data.model_fields_set:
+      updated_profile.pollInterval = profile_update_data.pollInterval
+      need_update = True
+
+    # An explicit null removes the fingerprint
+    if 'fingerprint' in profile_update_data.model_fields_set:
+      updated_profile.fingerprint = profile_update_data.fingerprint
+      need_update = True
+
     if not need_update:
       return Profile(**existent_profile)
 
     updated_profile.updatedAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
 
-    updated_profile_to_db = await db.profiles_collection.find_one_and_update({'_id': profile_id},
-                                                                             {'$set': updated_profile.model_dump(by_alias=True, exclude=['id'])},
-                                                                             return_document=True)
+    try:
+      updated_profile_to_db = await db.profiles_collection.find_one_and_update({'_id': profile_id},
+                                                                               {'$set': updated_profile.model_dump(by_alias=True, exclude=['id'])},
+                                                                               return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return Profile(**updated_profile_to_db)
 
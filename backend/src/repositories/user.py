@@ -1,11 +1,14 @@
 from datetime import datetime
-from typing import List
+from typing import Any, AsyncIterator, Dict, List
 
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from src.database.db import DB
+from src.database.indexes import unique_field_violation
 from src.models.User import User, UserInDB, UserUpdate
+from src.shared.pagination import OrderBy, find_keyset
 from src.shared.utils import hash_passwd, validate_id
 
 
@@ -15,16 +18,22 @@ class UserRepository:
 
   @classmethod
   async def list_users(cls, db: DB):
-    users = await db.user_collection.find({}, cls.password_exclude_filter).to_list(1000)
+    users = await db.user_collection.find({}, cls.password_exclude_filter).to_list(None)
     for user in users:
       user['_id'] = str(user['_id'])
     return {"users": users}
 
+  @classmethod
+  async def iter_users(cls, db: DB, order_by: OrderBy = '_id', after: str | None = None, limit: int | None = None) -> AsyncIterator[Dict[str, Any]]:
+    async for user in find_keyset(db.user_collection, projection=cls.password_exclude_filter, order_by=order_by, after=after, limit=limit):
+      user['_id'] = str(user['_id'])
+      yield user
+
   @classmethod
   async def list_users_by_filter(cls, db: DB, **filters):
     if all(x in filters.keys() for x in ['permission', 'organizationId', 'createdAt', 'updatedAt']):
       raise http_exceptions.INVALID_FIELD(field=f'campo de filtro de usuário')
-    users = await db.user_collection.find(filters, cls.password_exclude_filter).to_list(1000)
+    users = await db.user_collection.find(filters, cls.password_exclude_filter).to_list(None)
     for user in users:
       user['_id'] = str(user['_id'])
     return users
@@ -42,14 +51,6 @@ class UserRepository:
 
   @classmethod
   async def create_user(cls, db: DB, user_data: User):
-    username_already_taken = await db.user_collection.find_one({'username': user_data.username})
-    email_already_taken = await db.user_collection.find_one({'email': user_data.email})
-
-    if username_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de usuário')
-    if email_already_taken:
-      raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='E-mail')
-
     hashed_password = hash_passwd(user_data.password)
 
     user_data.createdAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
@@ -58,23 +59,15 @@ class UserRepository:
     new_user = UserInDB(**user_data.model_dump())
     new_user.password = str(hashed_password)
 
-    user_to_db = await db.user_collection.insert_one(new_user.model_dump(by_alias=True, exclude=['id']))
+    try:
+      user_to_db = await db.user_collection.insert_one(new_user.model_dump(by_alias=True, exclude=['id']))
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return user_to_db.inserted_id
 
   @classmethod
   async def edit_user_by_id(cls, db: DB, user_id: ObjectId, existent_user: dict, user_update_data: UserUpdate):
-    # Check if new username is not already taken
-    if user_update_data.username is not None and user_update_data.username != existent_user['username']:
-      new_username_already_taken = await db.user_collection.find_one({"username": user_update_data.username})
-      if new_username_already_taken:
-        raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='Nome de usuário')
-    # Check if new email is not already taken
-    if user_update_data.email is not None and user_update_data.email != existent_user['email']:
-      new_email_already_taken = await db.user_collection.find_one({"email": user_update_data.email})
-      if new_email_already_taken:
-        raise http_exceptions.UNIQUE_FIELD_DATA_ALREADY_EXISTS(field='E-mail')
-
     user_update_data_dict = user_update_data.model_dump()
     user_to_be_edited = existent_user.copy()
 
@@ -88,9 +81,12 @@ class UserRepository:
 
     updated_user.updatedAt = datetime.fromisoformat(datetime.now(tz=constants.LOCAL_TIMEZONE).isoformat())
 
-    updated_user_to_db = await db.user_collection.find_one_and_update({'_id': user_id},
-                                                                      {'$set': updated_user.model_dump(by_alias=True, exclude=['id'])},
-                                                                      return_document=True)
+    try:
+      updated_user_to_db = await db.user_collection.find_one_and_update({'_id': user_id},
+                                                                        {'$set': updated_user.model_dump(by_alias=True, exclude=['id'])},
+                                                                        return_document=True)
+    except DuplicateKeyError as e:
+      raise unique_field_violation(e)
 
     return User(**updated_user_to_db)
 
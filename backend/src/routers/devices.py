@@ -1,36 +1,54 @@
 import asyncio
-import threading
-from queue import Queue
 from typing import List
 
+import orjson
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from src.controllers.AdoptionController import AdoptionController
 from src.controllers.ConfigController import ConfigController
 from src.database.db import DB, get_db
 from src.models.Actions import ActionSequencePayload, ActionSequenceResponse
-from src.models.Device import (Device, DeviceCollection, DeviceToAdopt,
-                               DeviceUpdate)
+from src.models.Device import (BulkAdoptionRequest, Device,
+                               DeviceFingerprintCollection, DeviceSummary,
+                               DeviceSummaryCollection, DeviceToAdopt,
+                               DeviceUpdate, DiscoveredDeviceChanges,
+                               DiscoveredDeviceCollection, FingerprintRequest)
 from src.models.User import User
 from src.repositories.device import DeviceRepository
 from src.repositories.network import NetworkRepository
 from src.repositories.organization import OrganizationRepository
 from src.repositories.profile import ProfileRepository
+from src.services.arp_discovery import arp_discovery, normalize_mac
+from src.services.driver_pool import driver_pool
+from src.services.fingerprint import fingerprint_engine
+from src.services.job_engine import job_engine
 from src.services.oauth import get_current_user
-from src.shared.utils import validate_id
+from src.shared.pagination import (OrderBy, keyset_sort_fields,
+                                   ndjson_response, read_page)
+from src.shared.utils import model_projection, validate_id
 
 router = APIRouter(prefix='/devices', tags=['devices'])
 
-queue = Queue()
-lock = threading.Lock()
-adoption_controller = AdoptionController(queue=queue, available_devices_lock=lock)
-adoption_controller.start()
+adoption_controller = AdoptionController()
+job_engine.register('adoption', adoption_controller.adoption_job)
+job_engine.register('bulkAdoption', adoption_controller.bulk_adoption_job)
 
 
-@router.get('/list', status_code=status.HTTP_200_OK, response_model=DeviceCollection, response_model_by_alias=False)
-async def devices(organizationId: str, networkId: str = None, profileId: str = None, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+@router.get('/list', status_code=status.HTTP_200_OK, response_model=DeviceSummaryCollection, response_model_by_alias=False, response_model_exclude_unset=True)
+async def devices(response: Response, organizationId: str, networkId: str = None, profileId: str = None, order_by: OrderBy = '_id', after: str = None, limit: int = Query(default=None, ge=1, le=constants.LIST_PAGE_MAX_SIZE), stream: bool = False,
+                  fields: str = None, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  Devices of an organization, without credentials (GET /devices/{id} has them). With limit,
+  one keyset page ordered by order_by (next page cursor in the X-Next-Cursor header, passed
+  back as after); with stream=true, NDJSON. fields (comma separated, e.g. name,ip_address)
+  limits what is read and returned of each device.
+  """
   try:
+    # The cursor is built from the order_by fields, so they're always read
+    projection = model_projection(DeviceSummary, fields, required=keyset_sort_fields(order_by)) if fields else None
+
     organizationId = validate_id(target_id=organizationId, id_field_name='organizationId')
 
     existent_organization = await OrganizationRepository.get_organization_by(db, field='_id', value=organizationId)
@@ -52,9 +70,13 @@ async def devices(organizationId: str, networkId: str = None, profileId: str = N
       profileId = validate_id(target_id=profileId, id_field_name='profileId')
       device_filter.update({'profileId': profileId})
 
-    # Returns the entire collection of devices
-    device_collection = await DeviceRepository.list_devices_by_compound_filter(db, compound_filter=device_filter)
-    return device_collection
+    if stream:
+      return await ndjson_response(DeviceRepository.iter_devices_by_compound_filter(db, device_filter, order_by=order_by, after=after, limit=limit,
+                                                                                    view=DeviceSummary, projection=projection), exclude_unset=True)
+
+    devices = DeviceRepository.iter_devices_by_compound_filter(db, device_filter, order_by=order_by, after=after, limit=limit and limit + 1,
+                                                               view=DeviceSummary, projection=projection)
+    return {'devices': await read_page(devices, limit, order_by, response)}
   except HTTPException as h:
     raise h
   except Exception as e:
@@ -62,48 +84,120 @@ async def devices(organizationId: str, networkId: str = None, profileId: str = N
 
 # TODO: LIST DEVICES BY PROFILE
 
-@router.post('/adopt', status_code=status.HTTP_201_CREATED)
-async def adopt_device(device_adopt_data: DeviceToAdopt, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+@router.get('/discovered', status_code=status.HTTP_200_OK, response_model=DiscoveredDeviceCollection)
+async def discovered_devices(after: str = None, limit: int = Query(default=constants.DISCOVERED_DEVICES_PAGE_SIZE, ge=1, le=constants.DISCOVERED_DEVICES_MAX_PAGE_SIZE),
+                             current_user: User = Depends(get_current_user)):
+  """
+  Adoption candidates found by ARP discovery, ordered by MAC. Pass nextCursor as `after` for the next page.
+  """
   try:
-    # Only users with guest_admin, admin and master permission can add devices
+    table = arp_discovery.table
+    page, next_cursor = table.page(after=normalize_mac(after) if after else None, limit=limit)
+    return {
+      'devices': [neighbor.to_dict() for neighbor in page],
+      'total': len(table),
+      'seq': table.seq,
+      'nextCursor': next_cursor,
+    }
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
+
+@router.get('/discovered/changes', status_code=status.HTTP_200_OK, response_model=DiscoveredDeviceChanges)
+async def discovered_devices_changes(since: int = Query(default=0, ge=0), current_user: User = Depends(get_current_user)):
+  """
+  Discovered devices added, readdressed or expired after the `since` feed position.
+  """
+  try:
+    table = arp_discovery.table
+    changes, resync = table.changes_since(since)
+    return {'seq': table.seq, 'resync': resync, 'changes': changes}
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
+
+@router.post('/discovered/fingerprint', status_code=status.HTTP_200_OK, response_model=DeviceFingerprintCollection)
+async def fingerprint_discovered_devices(payload: FingerprintRequest, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  Identifies the profile of discovered devices (listed or in network_cidr) from the profiles fingerprints.
+  """
+  try:
+    # Only users with guest_admin, admin and master permission can probe devices
     if current_user.permission not in (constants.USER_PERMISSIONS['guest_admin'],
                                        constants.USER_PERMISSIONS['admin'], constants.USER_PERMISSIONS['master']):
       raise http_exceptions.NO_PERMISSION
 
-    if device_adopt_data.networkId:
-      # Check if network exists
-      device_network = await NetworkRepository.get_network_by(db, field='_id', value=device_adopt_data.networkId)
-      if not device_network:
-        raise http_exceptions.DOCUMENT_INEXISTENT(document='rede do dispositivo')
+    if payload.devices:
+      targets = []
+      for device in payload.devices:
+        neighbor = arp_discovery.lookup(device.mac_address, device.ip_address)
+        targets.append((neighbor.mac_address, neighbor.ip_address) if neighbor else (device.mac_address, device.ip_address))
+    else:
+      targets = list(arp_discovery.neighbors_in(payload.network_cidr).items())
 
-    # Check if device is not already adopted
-    if all([x is None for x in [device_adopt_data.mac_address, device_adopt_data.ip_address]]):
-      raise http_exceptions.INVALID_FIELD(field='Endereco IP ou MAC')
-    field = 'mac_address' if device_adopt_data.mac_address else 'ip_address'
-    value = device_adopt_data.mac_address if field == 'mac_address' else device_adopt_data.ip_address
+    profiles = await ProfileRepository.list_profiles(db)
+    fingerprints = await fingerprint_engine.identify_many(targets, profiles.profiles, refresh=payload.refresh)
+    return {'devices': fingerprints}
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
 
-    device_already_adopted = await DeviceRepository.get_device_by(db, field=field, value=value)
-    if device_already_adopted:
-      raise http_exceptions.DEVICE_ALREADY_ADOPTED
+@router.post('/adopt', status_code=status.HTTP_201_CREATED)
+async def adopt_device(device_adopt_data: DeviceToAdopt, background: bool = False, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  Adopts a device. With background=true it returns 202 and a jobId right away (progress at /jobs/{jobId}/events).
+  """
+  try:
+    # Only users with guest_admin, admin and master permission can add devices
+    if current_user.permission not in (constants.USER_PERMISSIONS['guest_admin'],
+                                       constants.USER_PERMISSIONS['admin'], constants.USER_PERMISSIONS['master']):
+      raise http_exceptions.NO_PERMISSION
 
-    # Search for device and get initial info
-    discovered_device_to_adopt = await adoption_controller.find_device(device=device_adopt_data, db=db)
+    if background:
+      job_id = await job_engine.submit('adoption', payload={'device': device_adopt_data}, created_by=str(current_user.id),
+                                       request_summary=device_adopt_data.model_dump(include={'mac_address', 'ip_address', 'networkId', 'profileId'}))
+      return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={'success': True, 'message': 'Adoção iniciada.', 'jobId': job_id})
 
-    print(f'Discovery: {discovered_device_to_adopt}')
+    await adoption_controller.adopt(device_adopt_data, db)
 
-    # Create the new device record
-    new_device_id = await DeviceRepository.create_device(db, new_device_data=discovered_device_to_adopt)
+    return {'success': True, 'message': f'Dispositivo adotado.'}
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
 
-    # Move device into network
-    device_moved_to_net = await NetworkRepository.move_device_to_network(db,
-                                                                         device_id=new_device_id,
-                                                                         initial_network_id=None,
-                                                                         target_network_id=discovered_device_to_adopt.networkId)
-    if not device_moved_to_net:
-      await DeviceRepository.delete_device(db, device_id=new_device_id)
-      raise http_exceptions.MOVE_DEVICE_TO_NET_FAILED
+@router.post('/adopt/bulk', status_code=status.HTTP_200_OK)
+async def bulk_adopt_devices(payload: BulkAdoptionRequest, background: bool = False, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  Adopts a list of devices (or every discovered device in a CIDR), streaming
+  progress as NDJSON: one JSON object per line, per device and stage.
+  With background=true it runs as a job instead and returns 202 and its jobId.
+  """
+  try:
+    # Only users with guest_admin, admin and master permission can add devices
+    if current_user.permission not in (constants.USER_PERMISSIONS['guest_admin'],
+                                       constants.USER_PERMISSIONS['admin'], constants.USER_PERMISSIONS['master']):
+      raise http_exceptions.NO_PERMISSION
 
-    return {'success': True, 'message': f'Dispositivo adotado.'}
+    if background:
+      request_summary = payload.model_dump(include={'network_cidr', 'profileId', 'networkId'})
+      request_summary['devices'] = len(payload.devices or [])
+      job_id = await job_engine.submit('bulkAdoption', payload={'request': payload}, created_by=str(current_user.id),
+                                       request_summary=request_summary)
+      return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={'success': True, 'message': 'Adoção em lote iniciada.', 'jobId': job_id})
+
+    async def progress():
+      try:
+        async for event in adoption_controller.bulk_adopt(request=payload, db=db):
+          yield orjson.dumps(event) + b'\n'
+      except Exception as e:
+        # Headers are already sent, report the failure in the stream
+        yield orjson.dumps({'event': 'error', 'message': str(e)}) + b'\n'
+
+    return StreamingResponse(progress(), media_type='application/x-ndjson')
   except HTTPException as h:
     raise h
   except Exception as e:
@@ -190,6 +284,9 @@ async def edit_device(device_id: str, payload: DeviceUpdate, current_user: User
         new_device_data=validated_device
       )
 
+    # Connection data or profile may have changed, drop the pooled driver
+    driver_pool.invalidate_device(validated_device_id)
+
     return {
       "success": True,
       "message": "Dispositivo atualizado com sucesso.",
@@ -253,6 +350,7 @@ async def delete_device(device_id: str, current_user: User = Depends(get_current
 
     # Delete device document
     deleted_device = await DeviceRepository.delete_device(db, device_id=device_id)
+    driver_pool.invalidate_device(device_id)
 
     # If device has a network, remove device from it
     if deleted_device.networkId is not None:
@@ -0,0 +1,59 @@
+import orjson
+import src.configs.constants as constants
+import src.shared.http_exceptions as http_exceptions
+from fastapi import APIRouter, Depends, HTTPException, status
+from sse_starlette.sse import EventSourceResponse
+from src.database.db import DB, get_db
+from src.models.Job import Job, JobCollection
+from src.models.User import User
+from src.repositories.job import JobRepository
+from src.services.job_engine import job_engine
+from src.services.oauth import get_current_user
+
+router = APIRouter(prefix='/jobs', tags=['jobs'])
+
+def sees_all_jobs(user: User) -> bool:
+  return user.permission in (constants.USER_PERMISSIONS['admin'], constants.USER_PERMISSIONS['master'])
+
+async def get_visible_job(job_id: str, user: User, db: DB) -> Job:
+  job = await JobRepository.get_job_by_id(db, job_id)
+  if not job or (not sees_all_jobs(user) and job.createdBy != str(user.id)):
+    raise http_exceptions.DOCUMENT_INEXISTENT(document='job')
+  return job
+
+
+@router.get('', status_code=status.HTTP_200_OK, response_model=JobCollection, response_model_by_alias=False)
+async def jobs(current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  try:
+    return await JobRepository.list_jobs(db, created_by=None if sees_all_jobs(current_user) else str(current_user.id))
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
+
+@router.get('/{job_id}', status_code=status.HTTP_200_OK, response_model=Job, response_model_by_alias=False)
+async def get_job(job_id: str, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  try:
+    return await get_visible_job(job_id, current_user, db)
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
+
+@router.get('/{job_id}/events', status_code=status.HTTP_200_OK)
+async def job_events(job_id: str, current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  Server-sent events: the job 'snapshot' first, then step/result/progress events until 'done'.
+  """
+  try:
+    job = await get_visible_job(job_id, current_user, db)
+
+    async def events():
+      async for event in job_engine.subscribe(job):
+        yield {'event': event['event'], 'data': orjson.dumps(event).decode()}
+
+    return EventSourceResponse(events(), ping=constants.JOBS_SSE_PING)
+  except HTTPException as h:
+    raise h
+  except Exception as e:
+    raise http_exceptions.INTERNAL_ERROR(detail=str(e))
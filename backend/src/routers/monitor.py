@@ -1,10 +1,58 @@
+import json
+from typing import Dict, FrozenSet
+
+import src.configs.constants as constants
 from bson import ObjectId
-from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
-from src.services.oauth import verify_token
-from src.services.websocket_conn_manager import websocket_connection_manager
+from fastapi import (APIRouter, Depends, Query, WebSocket, WebSocketDisconnect,
+                     status)
+from src.database.pool_metrics import pool_metrics
+from src.models.Monitor import DatabasePoolStats, ExecutorLaneStats
+from src.models.User import User
+from src.services.device_registry import device_registry
+from src.services.executor import blocking_executor
+from src.services.message_encoding import negotiate_encoding
+from src.services.monitor_state import monitor_state
+from src.services.oauth import get_current_user, verify_token
+from src.services.websocket_conn_manager import (Subscription,
+                                                 websocket_connection_manager)
 
 router = APIRouter(prefix='/monitor', tags=['monitor'])
 
+@router.get('/executor', status_code=status.HTTP_200_OK, response_model=Dict[str, ExecutorLaneStats])
+async def executor_stats(current_user: User = Depends(get_current_user)):
+  return blocking_executor.stats()
+
+@router.get('/database', status_code=status.HTTP_200_OK, response_model=DatabasePoolStats)
+async def database_pool_stats(current_user: User = Depends(get_current_user)):
+  return {'maxPoolSize': constants.MONGODB_MAX_POOL_SIZE, **pool_metrics.stats()}
+
+def allowed_organizations(user_data: dict) -> FrozenSet[str] | None:
+  """
+  Organizations whose monitor data the user may receive (None means all of them).
+  """
+  if user_data.get('permission') in (constants.USER_PERMISSIONS['admin'], constants.USER_PERMISSIONS['master']):
+    return None
+  organization_id = user_data.get('organizationId')
+  return frozenset([str(organization_id)]) if organization_id else frozenset()
+
+def build_subscription(message: dict, allowed_orgs: FrozenSet[str] | None) -> Subscription:
+  """
+  Builds the subscription requested by the client, keeping only ids within the user's membership.
+  """
+  requested_orgs = {str(x) for x in message.get('organizations') or []}
+  requested_networks = {str(x) for x in message.get('networks') or []}
+
+  # Nothing requested: back to everything the user can see
+  if not requested_orgs and not requested_networks:
+    return Subscription(organizations=allowed_orgs)
+
+  network_to_org = device_registry.snapshot.network_to_org
+  if allowed_orgs is not None:
+    requested_orgs &= allowed_orgs
+    requested_networks = {x for x in requested_networks if network_to_org.get(x) in allowed_orgs}
+
+  return Subscription(organizations=frozenset(requested_orgs), networks=frozenset(requested_networks))
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     # Accept to get token
@@ -34,8 +82,36 @@ async def websocket_endpoint(websocket: WebSocket):
       websocket_connection_manager.disconnect(websocket)
       return
 
+    allowed_orgs = allowed_organizations(user_data)
+
+    # Full state is sent first, deltas with a higher seq follow
+    websocket_connection_manager.register(
+        websocket,
+        snapshot_provider=lambda: monitor_state.snapshot_message(device_registry.snapshot),
+        subscription=Subscription(organizations=allowed_orgs),
+        # ?encoding=msgpack switches to binary frames, JSON text frames otherwise
+        encoding=negotiate_encoding(websocket.query_params.get("encoding"))
+    )
+
     try:
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive_text()
+            try:
+                message = json.loads(message)
+            except ValueError:
+                continue
+
+            if not isinstance(message, dict):
+                continue
+
+            # Client missed a delta (seq gap)
+            if message.get('messageType') == 'resync':
+                websocket_connection_manager.request_resync(websocket)
+            # Client only wants some organizations/networks
+            elif message.get('messageType') == 'subscribe':
+                websocket_connection_manager.subscribe(websocket, build_subscription(message, allowed_orgs))
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Also stops the writer task of evicted or uncleanly closed clients
         websocket_connection_manager.disconnect(websocket)
@@ -1,22 +1,31 @@
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from src.database.db import DB, get_db
-from src.models.Network import Network, NetworkUpdate
+from src.models.Network import Network, NetworkCollection, NetworkUpdate
 from src.models.User import User
 from src.repositories.device import DeviceRepository
 from src.repositories.network import NetworkRepository
 from src.repositories.organization import OrganizationRepository
+from src.services.driver_pool import driver_pool
 from src.services.oauth import get_current_user
+from src.shared.pagination import OrderBy, ndjson_response, read_page
 from src.shared.utils import validate_id
 
 router = APIRouter(prefix='/networks', tags=['networks'])
 
 @router.get('', status_code=status.HTTP_200_OK)
-async def networks(current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+async def networks(response: Response, order_by: OrderBy = '_id', after: str = None, limit: int = Query(default=None, ge=1, le=constants.LIST_PAGE_MAX_SIZE), stream: bool = False,
+                   current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  All networks, or one keyset page of them with limit (next page cursor in X-Next-Cursor); NDJSON with stream=true.
+  """
   try:
-    networks = await NetworkRepository.list_networks(db)
-    return networks.model_dump(by_alias=False)
+    if stream:
+      return await ndjson_response(NetworkRepository.iter_networks(db, order_by=order_by, after=after, limit=limit))
+
+    networks = await read_page(NetworkRepository.iter_networks(db, order_by=order_by, after=after, limit=limit and limit + 1), limit, order_by, response)
+    return NetworkCollection(networks=networks).model_dump(by_alias=False)
   except HTTPException as h:
     raise h
   except Exception as error:
@@ -156,6 +165,8 @@ async def delete_network(network_id: str, current_user: User = Depends(get_curre
     removed_adopted_devices, devices_ids_list = await DeviceRepository.remove_all_network_devices(db, network_id=network_id)
     if not removed_adopted_devices:
         raise http_exceptions.REMOVE_DEVICE_FROM_NET_FAILED
+    for removed_device_id in devices_ids_list:
+      driver_pool.invalidate_device(removed_device_id)
 
     return {'success': True, 'message': f'Rede removida.'}
   except HTTPException as h:
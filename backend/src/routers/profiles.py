@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from src.configs import constants
 from src.database.db import DB, get_db
-from src.models.Profile import Profile, ProfileUpdate
+from src.models.Profile import Profile, ProfileCollection, ProfileUpdate
 from src.models.User import User
 from src.repositories.device import DeviceRepository
 from src.repositories.profile import ProfileRepository
+from src.services.driver_pool import driver_pool
 from src.services.oauth import get_current_user
 from src.shared import http_exceptions
+from src.shared.pagination import OrderBy, ndjson_response, read_page
 from src.shared.utils import validate_id
 
 router = APIRouter(prefix='/profiles', tags=['profiles'])
 
 @router.get('', status_code=status.HTTP_200_OK)
-async def profiles(current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+async def profiles(response: Response, order_by: OrderBy = '_id', after: str = None, limit: int = Query(default=None, ge=1, le=constants.LIST_PAGE_MAX_SIZE), stream: bool = False,
+                   current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  All profiles, or one keyset page of them with limit (next page cursor in X-Next-Cursor); NDJSON with stream=true.
+  """
   try:
-    profiles = await ProfileRepository.list_profiles(db)
-    return profiles.model_dump(by_alias=False)
+    if stream:
+      return await ndjson_response(ProfileRepository.iter_profiles(db, order_by=order_by, after=after, limit=limit))
+
+    profiles = await read_page(ProfileRepository.iter_profiles(db, order_by=order_by, after=after, limit=limit and limit + 1), limit, order_by, response)
+    return ProfileCollection(profiles=profiles).model_dump(by_alias=False)
   except HTTPException as h:
     raise h
   except Exception as error:
@@ -74,6 +83,7 @@ async def update_profile(profile_id: str, new_profile_data: ProfileUpdate, curre
 
     updated_profile = await ProfileRepository.update_profile_by_id(db, profile_id=profile_id, existent_profile=existent_profile,
                                                                    profile_update_data=new_profile_data)
+    driver_pool.invalidate_profile(profile_id)
 
     return {'success': True, 'message': 'Profile atualizado.'}
   except HTTPException as h:
@@ -93,6 +103,7 @@ async def delete_profile(profile_id: str, current_user: User = Depends(get_curre
 
     # Delete profile document
     deleted_profile = await ProfileRepository.delete_profile(db, profile_id=profile_id)
+    driver_pool.invalidate_profile(profile_id)
 
     # Remove deleted profile from devices and set device is_active to false
     clear_devices_profile_relationships = await DeviceRepository.remove_devices_profile(db, profileId=profile_id)
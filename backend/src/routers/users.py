@@ -1,43 +1,58 @@
+from typing import List
+
 import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from src.database.db import DB, get_db
 from src.models.Organization import Organization
 from src.models.User import User, UserRow, UserUpdate
 from src.repositories.organization import OrganizationRepository
 from src.repositories.user import UserRepository
 from src.services.oauth import get_current_user
+from src.shared.pagination import OrderBy, batched, ndjson_response, read_page
 from src.shared.utils import validate_id
 
 router = APIRouter(prefix='/users', tags=['users'])
 
-@router.get('', status_code=status.HTTP_200_OK)
-async def users(current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
-  try:
-    users = await UserRepository.list_users(db)
-    users = users["users"]
+async def build_user_rows(db: DB, users: List[dict]) -> List[dict]:
+  # coletar todos organizationIds válidos
+  org_ids = list({u.get("organizationId") for u in users if u.get("organizationId")})
 
-    # coletar todos organizationIds válidos
-    org_ids = list({u.get("organizationId") for u in users if u.get("organizationId")})
+  # consultar todas as orgs em uma unica query
+  org_map = await OrganizationRepository.get_organizations_by_ids(db, [ObjectId(orgId) for orgId in org_ids])
 
-    # consultar todas as orgs em uma unica query
-    org_map = await OrganizationRepository.get_organizations_by_ids(db, [ObjectId(orgId) for orgId in org_ids])
+  # montar resposta
+  result = []
+  for u in users:
+    org_info = None
+    org_id = str(u.get("organizationId"))
 
-    # montar resposta
-    result = []
-    for u in users:
-      org_info = None
-      org_id = str(u.get("organizationId"))
+    if org_id and org_id in org_map:
+      org_info = {
+        "organizationId": org_id,
+        "name": org_map[org_id]["name"]
+      }
+    result.append(UserRow(**u, organizationInfo=org_info).model_dump(by_alias=False))
 
-      if org_id and org_id in org_map:
-        org_info = {
-          "organizationId": org_id,
-          "name": org_map[org_id]["name"]
-        }
-      result.append(UserRow(**u, organizationInfo=org_info).model_dump(by_alias=False))
+  return result
 
-    return result
+@router.get('', status_code=status.HTTP_200_OK)
+async def users(response: Response, order_by: OrderBy = '_id', after: str = None, limit: int = Query(default=None, ge=1, le=constants.LIST_PAGE_MAX_SIZE), stream: bool = False,
+                current_user: User = Depends(get_current_user), db: DB = Depends(get_db)):
+  """
+  All users, or one keyset page of them with limit (next page cursor in X-Next-Cursor); NDJSON with stream=true.
+  """
+  try:
+    if stream:
+      async def user_rows():
+        async for batch in batched(UserRepository.iter_users(db, order_by=order_by, after=after, limit=limit), constants.LIST_CURSOR_BATCH_SIZE):
+          for row in await build_user_rows(db, batch):
+            yield row
+      return await ndjson_response(user_rows())
+
+    users = await read_page(UserRepository.iter_users(db, order_by=order_by, after=after, limit=limit and limit + 1), limit, order_by, response)
+    return await build_user_rows(db, users)
   except HTTPException as h:
     raise h
   except Exception as error:
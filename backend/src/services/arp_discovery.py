@@ -0,0 +1,140 @@
+import asyncio
+import time
+from ipaddress import (IPv4Network, collapse_addresses, ip_address,
+                       ip_network)
+from typing import Dict, List, Optional, Set, Tuple
+
+import src.configs.constants as constants
+from fastapi import FastAPI
+from scapy.all import ARP, Ether, conf, srp
+from src.repositories.network import NetworkRepository
+from src.services.executor import LANE_DISCOVERY, blocking_executor
+from src.services.neighbor_table import Neighbor, NeighborTable
+
+
+def normalize_mac(mac: str) -> str:
+  return mac.upper().replace(':', '').replace('-', '')
+
+def interface_networks(interfaces: List[str]) -> List[Tuple[str, IPv4Network]]:
+  """
+  Directly connected IPv4 networks of each interface, from the kernel routing table.
+  """
+  conf.route.resync()
+  networks = []
+  for net, mask, gateway, iface, _, _ in conf.route.routes:
+    # On-link routes only, skipping the default route, host routes and multicast
+    if iface not in interfaces or gateway != '0.0.0.0' or mask in (0, 0xFFFFFFFF) or net >= 0xE0000000:
+      continue
+    network = ip_network((net, bin(mask).count('1')), strict=False)
+    if network.num_addresses > constants.ARP_DISCOVERY_MAX_LOCALNET_HOSTS:
+      print(f"ARP discovery: skipping {network} on {iface}, larger than {constants.ARP_DISCOVERY_MAX_LOCALNET_HOSTS} addresses")
+      continue
+    networks.append((iface, network))
+  return networks
+
+def route_interface(network: IPv4Network) -> str | None:
+  iface, _, _ = conf.route.route(str(network.network_address + 1))
+  return iface
+
+def arp_sweep(network: IPv4Network, iface: str) -> Dict[str, str]:
+  """
+  Broadcasts ARP requests to every address of network through iface, returns {mac: ip}.
+  """
+  pkt = Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=str(network))
+  ans, _ = srp(pkt, timeout=1, retry=1, iface=iface, verbose=0)
+  return {normalize_mac(received.hwsrc): received.psrc for _, received in ans}
+
+
+class ArpDiscoveryService:
+  """
+  Single owner of ARP scanning for adoption and topology discovery.
+  Every ARP_DISCOVERY_INTERVAL seconds it sweeps the networks attached to each
+  configured interface plus the registered network CIDRs (routed to the
+  interface that reaches them), one sweep per (interface, CIDR) on the discovery
+  executor lane, and merges replies into one neighbor table (indexed by MAC and
+  IP, expiring entries not seen for ARP_NEIGHBOR_EXPIRY seconds).
+  """
+
+  def __init__(self, interfaces: List[str] = constants.ARP_DISCOVERY_INTERFACES, interval: float = constants.ARP_DISCOVERY_INTERVAL):
+    self.interfaces = interfaces
+    self.interval = interval
+    self.table = NeighborTable()
+    self.targets: Set[Tuple[str, IPv4Network]] = set()
+    self.swept_at: float | None = None
+    self._sweep_task: asyncio.Task | None = None
+
+  async def run(self, app: FastAPI):
+    print(f"Running ARP discovery on {', '.join(self.interfaces) or 'no interfaces'}")
+    while True:
+      try:
+        await self.refresh_targets(app.state.db)
+        await self.sweep()
+      except Exception as e:
+        print(f"Erro ao executar descoberta ARP: {e}")
+      await asyncio.sleep(self.interval)
+
+  async def refresh_targets(self, db):
+    targets = set(await blocking_executor.run(LANE_DISCOVERY, interface_networks, self.interfaces))
+
+    networks = await NetworkRepository.list_networks(db)
+    for network in networks.networks:
+      cidr = ip_network(network.network_cidr, strict=False)
+      iface = route_interface(cidr)
+      if iface and iface != 'lo':
+        targets.add((iface, cidr))
+
+    # Registered networks often overlap the attached ones, sweep each address once per interface
+    by_iface: Dict[str, List[IPv4Network]] = {}
+    for iface, network in targets:
+      by_iface.setdefault(iface, []).append(network)
+    self.targets = {(iface, network) for iface, networks in by_iface.items() for network in collapse_addresses(networks)}
+
+  async def sweep(self):
+    """
+    Sweeps every target now. Concurrent callers share the sweep in progress.
+    """
+    if self._sweep_task is None or self._sweep_task.done():
+      self._sweep_task = asyncio.create_task(self._sweep())
+    await asyncio.shield(self._sweep_task)
+
+  async def _sweep(self):
+    targets = list(self.targets)
+    results = await asyncio.gather(
+      *[blocking_executor.run(LANE_DISCOVERY, arp_sweep, network, iface) for iface, network in targets],
+      return_exceptions=True
+    )
+
+    for (iface, network), result in zip(targets, results):
+      if isinstance(result, Exception):
+        print(f"ARP discovery: sweep of {network} on {iface} failed: {result}")
+        continue
+      self.learn(result, iface)
+    self.table.expire()
+    self.swept_at = time.monotonic()
+
+  def learn(self, replies: Dict[str, str], iface: str):
+    now = time.time()
+    for mac, ip in replies.items():
+      self.table.upsert(mac, ip, iface, seen_at=now)
+
+  def get_by_mac(self, mac: str) -> Optional[Neighbor]:
+    return self.table.get_by_mac(normalize_mac(mac))
+
+  def get_by_ip(self, ip: str) -> Optional[Neighbor]:
+    return self.table.get_by_ip(ip)
+
+  def lookup(self, mac: str | None, ip: str | None) -> Optional[Neighbor]:
+    """
+    Neighbor matching mac (preferred) or ip.
+    """
+    return (self.get_by_mac(mac) if mac else None) or (self.get_by_ip(ip) if ip else None)
+
+  def neighbors_in(self, network_cidr: str) -> Dict[str, str]:
+    """
+    {mac: ip} of neighbors whose address belongs to network_cidr, in address order.
+    """
+    network = ip_network(network_cidr, strict=False)
+    neighbors = [(ip_address(n.ip_address), mac, n.ip_address) for mac, n in self.table.by_mac.items()]
+    return {mac: ip for address, mac, ip in sorted(neighbors) if address in network}
+
+arp_discovery = ArpDiscoveryService()
@@ -1,23 +1,29 @@
+import asyncio
 import re
-from typing import Any
+import time
+from typing import Any, Dict, Set
 
+import httpx
 import paramiko
-import requests
 import src.configs.constants as constants
-import urllib3
 from fastapi import HTTPException
 from src.models.Device import Device
 from src.models.Profile import Action, Profile
+from src.services.executor import LANE_MANAGE, LANE_MONITOR, blocking_executor
 from src.shared import http_exceptions
 from src.shared.utils import (get_nested_value, get_value_from_response,
                               hydrate_payload)
 
+# The loop only keeps weak references to tasks, pending client closes are held here until done
+close_tasks: Set[asyncio.Task] = set()
+
 
 class DeviceDriver:
   """
   Generic Device Driver that executes actions based on a device Profile.
   Manages HTTP sessions and SSH connections.
-  This class is SYNCHRONOUS (blocking) and intended to be run in a thread.
+  `execute_action_async` runs HTTP actions natively on the event loop and
+  SSH actions (blocking) on a worker of the blocking executor.
   """
 
   def __init__(self, device: Device, profile: Profile):
@@ -35,68 +41,118 @@ class DeviceDriver:
     # Hydrate baseUrl, e.g., 'http://{{DEVICE_IP}}/api'
     self.base_url = hydrate_payload(self.profile.apiBaseUrl, self.placeholder_values)
 
-    # HTTP State
-    self.http_session = requests.Session()
-    self.http_session.mount('https://', adapter=constants.HTTP_ADAPTER)
-    self.http_session.mount('http://', adapter=constants.HTTP_ADAPTER)
-    self.http_is_authenticated = False
+    # HTTP State (client created on first use, bound to the running loop)
+    self.http_client: httpx.AsyncClient | None = None
+    self.http_client_is_authenticated = False
+    self.http_client_authenticated_at: float | None = None
+    self.http_client_auth_headers = set()
+    self.http_client_auth_lock = asyncio.Lock()
 
     # SSH State
     self.ssh_client = None # Not used for session-based, but could be
 
 
-  def execute_action(self, action_name: str, payload: dict | None = None) -> Any:
+  async def execute_action_async(self, action_name: str, payload: dict | None = None, lane: str | None = None) -> Any:
     """
     Public method to execute a defined action.
+    HTTP actions run on the event loop, SSH actions are sent to a worker of the
+    executor lane (defaults to the 'monitor' lane for monitor actions and to
+    the 'manage' lane otherwise).
     """
-    try:
-      action = self.profile.actions[action_name]
-    except KeyError:
-      raise http_exceptions.DEVICE_API_FAIL(
-        f"Ação '{action_name}' não definida no profile '{self.profile.name}'."
-      )
+    action = self._get_action(action_name)
 
     # Automatically authenticate if this is not an auth action
-    if action.actionType != 'auth' and action.protocol == 'http' and not self.http_is_authenticated:
-      self._authenticate_http()
+    if action.actionType != 'auth' and action.protocol == 'http' \
+      and not self._auth_valid(self.http_client_is_authenticated, self.http_client_authenticated_at):
+      await self._authenticate_http_async()
 
     if action.protocol == 'http':
-      return self._execute_http(action, payload)
+      return await self._execute_http_async(action, payload)
     elif action.protocol == 'ssh':
-      return self._execute_ssh(action)
+      if lane is None:
+        lane = LANE_MONITOR if action.actionType == 'monitor' else LANE_MANAGE
+      return await blocking_executor.run(lane, self._execute_ssh, action)
     else:
       raise NotImplementedError(f"Protocolo '{action.protocol}' não implementado.")
 
-  def _authenticate_http(self):
+  def close(self):
     """
-    Finds and executes the 'auth' action for HTTP.
+    Releases the HTTP client (and its keep-alive connections).
     """
-    if self.http_is_authenticated:
-      return True
+    if self.http_client is not None and not self.http_client.is_closed:
+      try:
+        close_task = asyncio.get_running_loop().create_task(self.http_client.aclose())
+        close_tasks.add(close_task)
+        close_task.add_done_callback(close_tasks.discard)
+      except RuntimeError:
+        # No running loop, connections are dropped along with the client
+        pass
+
+  def _get_action(self, action_name: str) -> Action:
+    try:
+      return self.profile.actions[action_name]
+    except KeyError:
+      raise http_exceptions.DEVICE_API_FAIL(
+        f"Ação '{action_name}' não definida no profile '{self.profile.name}'."
+      )
 
-    auth_action = None
+  def _get_auth_action(self) -> Action | None:
     for action in self.profile.actions.values():
       if action.actionType == 'auth' and action.protocol == 'http':
-        auth_action = action
-        break
-
-    if not auth_action:
-      # No 'auth' action defined, assume no auth is needed.
-      self.http_is_authenticated = True
-      return True
-
-    try:
-      # Auth actions use payloadTemplate, so payload is None
-      self._execute_http(auth_action, payload=None)
-      self.http_is_authenticated = True
+        return action
+    return None
+
+  @staticmethod
+  def _auth_valid(is_authenticated: bool, authenticated_at: float | None) -> bool:
+    if not is_authenticated:
+      return False
+    if authenticated_at is None:
       return True
-    except Exception as e:
-      self.http_is_authenticated = False
-      raise http_exceptions.DEVICE_LOGIN_FAIL
+    # Session tokens of most devices expire, log in again before they do
+    return time.monotonic() - authenticated_at < constants.DEVICE_AUTH_MAX_AGE
 
-  def _execute_http(self, action: Action, payload: dict | None) -> Any:
+  def _reset_http_client_auth(self):
     """
-    Handles execution of a single HTTP action. (SYNCHRONOUS)
+    Drops the session state obtained from the last login (cookies and mapped headers).
+    """
+    self.http_client_is_authenticated = False
+    self.http_client_authenticated_at = None
+    if self.http_client is not None:
+      self.http_client.cookies.clear()
+      for header_key in self.http_client_auth_headers:
+        self.http_client.headers.pop(header_key, None)
+    self.http_client_auth_headers.clear()
+
+  async def _authenticate_http_async(self, force: bool = False):
+    """
+    Finds and executes the 'auth' action for HTTP on the async client.
+    """
+    async with self.http_client_auth_lock:
+      if force:
+        self._reset_http_client_auth()
+      elif self._auth_valid(self.http_client_is_authenticated, self.http_client_authenticated_at):
+        return True
+
+      auth_action = self._get_auth_action()
+
+      if not auth_action:
+        # No 'auth' action defined, assume no auth is needed.
+        self.http_client_is_authenticated = True
+        return True
+
+      try:
+        # Auth actions use payloadTemplate, so payload is None
+        await self._execute_http_async(auth_action, payload=None)
+        self.http_client_is_authenticated = True
+        self.http_client_authenticated_at = time.monotonic()
+        return True
+      except Exception as e:
+        self._reset_http_client_auth()
+        raise http_exceptions.DEVICE_LOGIN_FAIL
+
+  def _build_http_request(self, action: Action, payload: dict | None) -> Dict[str, Any]:
+    """
+    Builds method, url and body of an HTTP action.
     """
     http_details = action.httpDetails
     if not http_details:
@@ -126,75 +182,151 @@ class DeviceDriver:
       # For 'manage' actions, use the provided payload
       data_to_send = payload
 
+    # 3. Prepare Request
+    request_args = {
+      "method": http_details.method,
+      "url": url,
+    }
+    if http_details.payloadType == 'text/json' and data_to_send:
+      request_args["json"] = data_to_send
+    elif http_details.payloadType == 'text/plain' and data_to_send:
+      request_args["data"] = str(data_to_send)
+
+    return request_args
+
+  def _should_reauthenticate(self, action: Action, status_code: int, reauth_on_denied: bool) -> bool:
+    # Session expired or was dropped by the device, log in again once
+    return status_code in (401, 403) and status_code != action.httpDetails.successStatusCode \
+      and action.actionType != 'auth' and reauth_on_denied and self._get_auth_action() is not None
+
+  def _map_auth_headers(self, action: Action, response: Any) -> Dict[str, str]:
+    """
+    Builds the session headers declared in responseHeaderMapping from an auth response.
+    """
+    http_details = action.httpDetails
+    placeholders_to_find = set()
+    regex = r"\{\{(.*?)\}\}" # Find text inside {{...}}
+    for template_string in http_details.responseHeaderMapping.values():
+      found = re.findall(regex, template_string)
+      placeholders_to_find.update(found)
+
+    # Build a dictionary of the actual values from the response
+    extracted_values = {}
+    for placeholder_path in placeholders_to_find:
+      extracted_values[placeholder_path] = get_value_from_response(response, placeholder_path)
+
+    # Hydrate the session headers
+    auth_headers = {}
+    for header_key, header_template in http_details.responseHeaderMapping.items():
+      final_header_value = hydrate_payload(header_template, extracted_values)
+      if final_header_value:
+        auth_headers[header_key] = str(final_header_value)
+    return auth_headers
+
+  def _parse_http_response(self, action: Action, response: Any) -> Any:
+    """
+    Checks the status code and maps the response of an HTTP action.
+    """
+    http_details = action.httpDetails
+    if response.status_code != http_details.successStatusCode:
+      raise http_exceptions.DEVICE_API_FAIL(
+        f"Ação falhou com status {response.status_code}. Resposta: {response.text}"
+      )
+
+    output_data = None
+    # Handle Data Response
+    if http_details.responseType == 'blank' or http_details.responseType == 'boolean':
+      output_data = True
+    elif http_details.responseType == 'text/plain':
+      output_data = response.text
+    elif http_details.responseType == 'text/json':
+      raw_data = response.json()
+
+      output_data = {'mapped': False}
+      if not http_details.responseMapping:
+        output_data.update({'actionResponse': raw_data})
+        return output_data
+
+      # Apply response mapping
+      mapped_data = {}
+      for rfsight_key, device_key_path in http_details.responseMapping.items():
+        mapped_data[rfsight_key] = get_nested_value(raw_data, device_key_path)
+
+      if mapped_data:
+        output_data.update({'mapped': True, 'actionResponse': mapped_data})
+
+    return output_data
+
+  def _get_http_client(self) -> httpx.AsyncClient:
+    if self.http_client is None or self.http_client.is_closed:
+      # One client per device: its pool limits are the per-host connection limits
+      pool_size = constants.DEVICE_HTTP_POOL_MAXSIZE
+      self.http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=constants.DEVICE_HTTP_TIMEOUT
+      )
+      self._reset_http_client_auth()
+    return self.http_client
+
+  async def _send_with_retries_async(self, request_args: Dict[str, Any]) -> httpx.Response:
+    """
+    Sends a request applying the policy of RETRY_STRATEGY:
+    connection errors are always retried, read errors and retryable status codes
+    only for idempotent methods, with exponential backoff.
+    """
+    retry = constants.RETRY_STRATEGY
+    client = self._get_http_client()
+
+    request_args = dict(request_args)
+    if "data" in request_args:
+      request_args["content"] = request_args.pop("data")
+    method_retryable = request_args["method"] in retry.allowed_methods
+
+    for attempt in range(retry.total + 1):
+      is_last_attempt = attempt >= retry.total
+      try:
+        response = await client.request(**request_args)
+      except (httpx.ConnectError, httpx.ConnectTimeout):
+        if is_last_attempt:
+          raise
+      except httpx.TransportError:
+        if is_last_attempt or not method_retryable:
+          raise
+      else:
+        if is_last_attempt or not method_retryable or response.status_code not in retry.status_forcelist:
+          return response
+
+      # Same backoff as urllib3: no wait on first retry, then factor * 2^(n-1)
+      if attempt > 0:
+        await asyncio.sleep(min(retry.backoff_factor * (2 ** attempt), retry.DEFAULT_BACKOFF_MAX))
+
+  async def _execute_http_async(self, action: Action, payload: dict | None, reauth_on_denied: bool = True) -> Any:
+    """
+    Handles execution of a single HTTP action on the async client.
+    A 401/403 answer on a non-auth action triggers one new login and retry.
+    """
+    request_args = self._build_http_request(action, payload)
+
     try:
-      # 3. Prepare Request
-      request_args = {
-        "method": http_details.method,
-        "url": url,
-        "timeout": 10,
-      }
-      if http_details.payloadType == 'text/json' and data_to_send:
-        request_args["json"] = data_to_send
-      elif http_details.payloadType == 'text/plain' and data_to_send:
-        request_args["data"] = str(data_to_send)
-
-      # Execute Request
-      response = self.http_session.request(**request_args)
-
-      if response.status_code != http_details.successStatusCode:
-        raise http_exceptions.DEVICE_API_FAIL(
-          f"Ação falhou com status {response.status_code}. Resposta: {response.text}"
-        )
+      response = await self._send_with_retries_async(request_args)
+
+      if self._should_reauthenticate(action, response.status_code, reauth_on_denied):
+        await self._authenticate_http_async(force=True)
+        return await self._execute_http_async(action, payload, reauth_on_denied=False)
+
+      output_data = self._parse_http_response(action, response)
 
       # If auth -> handle header mapping
-      if action.actionType == 'auth' and http_details.responseHeaderMapping:
-        placeholders_to_find = set()
-        regex = r"\{\{(.*?)\}\}" # Find text inside {{...}}
-        for template_string in http_details.responseHeaderMapping.values():
-          found = re.findall(regex, template_string)
-          placeholders_to_find.update(found)
-
-        # Build a dictionary of the actual values from the response
-        extracted_values = {}
-        for placeholder_path in placeholders_to_find:
-          extracted_values[placeholder_path] = get_value_from_response(response, placeholder_path)
-
-        # Hydrate and set the session headers
-        for header_key, header_template in http_details.responseHeaderMapping.items():
-          final_header_value = hydrate_payload(header_template, extracted_values)
-          if final_header_value:
-            self.http_session.headers.update({header_key: str(final_header_value)})
-
-        self.http_is_authenticated = True
-
-      output_data = None
-      # 7. Handle Data Response
-      if http_details.responseType == 'blank' or http_details.responseType == 'boolean':
-        output_data = True
-      elif http_details.responseType == 'text/plain':
-        output_data = response.text
-      elif http_details.responseType == 'text/json':
-        raw_data = response.json()
-
-        output_data = {'mapped': False}
-        if not http_details.responseMapping:
-          output_data.update({'actionResponse': raw_data})
-          return output_data
-
-        # Apply response mapping
-        mapped_data = {}
-        for rfsight_key, device_key_path in http_details.responseMapping.items():
-          mapped_data[rfsight_key] = get_nested_value(raw_data, device_key_path)
-
-        if mapped_data:
-          output_data.update({'mapped': True, 'actionResponse': mapped_data})
+      if action.actionType == 'auth' and action.httpDetails.responseHeaderMapping:
+        auth_headers = self._map_auth_headers(action, response)
+        self.http_client.headers.update(auth_headers)
+        self.http_client_auth_headers.update(auth_headers.keys())
+        self.http_client_is_authenticated = True
 
       return output_data
-    except urllib3.exceptions.MaxRetryError as max_retries:
-      raise http_exceptions.DEVICE_API_FAIL(f"Erro ao executar HTTP: {max_retries.reason}")
     except HTTPException as httpex:
       raise httpex
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
       raise http_exceptions.DEVICE_API_FAIL(f"Falha na conexão HTTP: {e}")
     except Exception as e:
       raise http_exceptions.DEVICE_API_FAIL(f"Erro ao executar HTTP: {e}")
@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, Tuple
+
+from src.database.db import DB
+from src.models.Device import DeviceMonitorView
+from src.models.Profile import Profile
+from src.repositories.device import DeviceRepository
+from src.repositories.network import NetworkRepository
+from src.repositories.profile import ProfileRepository
+
+
+class RegistrySnapshot:
+  """
+  Immutable view of devices, profiles and network -> organization mapping.
+  Readers keep a reference to a snapshot, writers publish a new one.
+  """
+
+  def __init__(self, version: int, devices: Dict[str, DeviceMonitorView], profiles: Dict[str, Profile], network_to_org: Dict[str, str]):
+    self.version = version
+    self.devices = devices
+    self.profiles = profiles
+    self.network_to_org = network_to_org
+
+
+class DeviceRegistry:
+  """
+  Versioned, copy-on-write device registry shared by monitoring and topology discovery.
+  Monitoring reads snapshots without holding any lock, discovery publishes device
+  changes (e.g. a new IP) that are picked up on the next device poll.
+  """
+
+  def __init__(self):
+    self._snapshot = RegistrySnapshot(0, {}, {}, {})
+    # device_id -> (version, fields) changes published while a refresh may be reading the DB
+    self._overrides: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+    self.refreshed_at: float | None = None
+
+  @property
+  def snapshot(self) -> RegistrySnapshot:
+    return self._snapshot
+
+  @property
+  def version(self) -> int:
+    return self._snapshot.version
+
+  def get_device(self, device_id: str) -> DeviceMonitorView | None:
+    return self._snapshot.devices.get(device_id)
+
+  async def refresh(self, db: DB) -> RegistrySnapshot:
+    """
+    Reloads devices, profiles and networks from DB and publishes a new snapshot.
+    """
+    start_version = self._snapshot.version
+
+    device_list = await DeviceRepository.list_device_views(db, DeviceMonitorView)
+    profiles_map = await ProfileRepository.get_all_profiles_as_map(db)
+    networks = await NetworkRepository.list_networks(db)
+
+    devices = {str(dev.id): dev for dev in device_list}
+
+    # Re-apply changes published after this refresh started, the DB read may predate them
+    for device_id, (version, fields) in list(self._overrides.items()):
+      if version <= start_version:
+        del self._overrides[device_id]
+      elif device_id in devices:
+        devices[device_id] = devices[device_id].model_copy(update=fields)
+
+    self._snapshot = RegistrySnapshot(
+      version=self._snapshot.version + 1,
+      devices=devices,
+      profiles=profiles_map,
+      network_to_org={str(n.id): str(n.organizationId) for n in networks.networks}
+    )
+    self.refreshed_at = time.monotonic()
+    return self._snapshot
+
+  def update_device(self, device_id: str, **fields) -> DeviceMonitorView | None:
+    """
+    Publishes a new snapshot with fields changed on device_id.
+    """
+    device_id = str(device_id)
+    current = self._snapshot
+    version = current.version + 1
+
+    _, pending_fields = self._overrides.get(device_id, (0, {}))
+    self._overrides[device_id] = (version, {**pending_fields, **fields})
+
+    device = current.devices.get(device_id)
+    if device is None:
+      return None
+
+    updated_device = device.model_copy(update=fields)
+    devices = {**current.devices, device_id: updated_device}
+    self._snapshot = RegistrySnapshot(version, devices, current.profiles, current.network_to_org)
+    return updated_device
+
+device_registry = DeviceRegistry()
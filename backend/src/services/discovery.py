@@ -1,75 +1,18 @@
-import asyncio
-from ipaddress import ip_network
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import src.configs.constants as constants
-from pysnmp.hlapi.v3arch.asyncio import *
-from scapy.all import ARP, Ether, srp
 from src.models.StationTable import StationTableModel
+from src.services.snmp_client import snmp_client
 
 
-async def arp_sweep_async(network_cidr: str, iface: str = "eth0") -> dict:
-  def _scan():
-    net = ip_network(network_cidr, strict=False)
-    # Broadcast ARP request
-    pkt = Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=str(net))
-    ans, _ = srp(pkt, timeout=1, retry=1, iface=iface, verbose=0)
-
-    results = {}
-    for sent, received in ans:
-      mac = received.hwsrc.upper().replace(":", "")
-      ip  = received.psrc
-      results[mac] = ip
-    return results
-
-  return await asyncio.to_thread(_scan)
-
 async def snmp_get(ip: str, oid: str) -> Optional[str]:
+  return await snmp_client.get(ip, oid)
+
+async def snmp_get_many(ip: str, oids: Sequence[str]) -> Dict[str, Optional[str]]:
+  return await snmp_client.get_many(ip, oids)
 
-    engine = SnmpEngine()
-    iterator = get_cmd(
-      engine,
-      CommunityData(constants.SNMP_COMMUNITY),
-      await UdpTransportTarget.create((ip, constants.SNMP_PORT)),
-      ContextData(),
-      ObjectType(ObjectIdentity(oid)),
-      lookupMib=False
-    )
-
-    errInd, errStatus, errIndex, varBinds = await iterator
-    engine.close_dispatcher()
-
-    if errInd or errStatus:
-      return None
-
-    for oid_obj, val in varBinds:
-      return val.prettyPrint()
-    return None
-
-
-async def snmp_walk(ip: str, oid: str) -> List[Tuple[str, str]]:
-
-  engine = SnmpEngine()
-  iterator = walk_cmd(
-    engine,
-    CommunityData(constants.SNMP_COMMUNITY),
-    await UdpTransportTarget.create((ip, constants.SNMP_PORT)),
-    ContextData(),
-    ObjectType(ObjectIdentity(oid)),
-    lookupMib=False
-  )
-
-  collected = [item async for item in iterator]
-  engine.close_dispatcher()
-
-  results: List[Tuple[str, str]] = []
-  for errInd, errStatus, errIndex, varBinds in collected:
-    if errInd or errStatus:
-      break
-    for vb in varBinds:
-      if oid in vb[0].prettyPrint():
-        results.append((vb[0].prettyPrint(), vb[1].prettyPrint()))
-  return results
+async def snmp_walk(ip: str, oid: str, max_repetitions: int | None = None) -> List[Tuple[str, str]]:
+  return await snmp_client.walk(ip, oid, max_repetitions=max_repetitions)
 
 def parse_lldp(pairs: List[Tuple[str, str]]):
   sys_map = {}
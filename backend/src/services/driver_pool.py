@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Tuple
+
+import src.configs.constants as constants
+from src.models.Device import Device, DeviceToAdopt
+from src.models.Profile import Profile
+from src.services.device_driver import DeviceDriver
+
+
+class PooledDriver:
+  """
+  Pool entry: the driver plus what it was built from.
+  """
+
+  def __init__(self, driver: DeviceDriver, profile_version: Tuple, device_fingerprint: Tuple):
+    self.driver = driver
+    self.profile_version = profile_version
+    self.device_fingerprint = device_fingerprint
+    self.last_used = time.monotonic()
+
+
+class DriverPool:
+  """
+  Keyed pool of long-lived, authenticated DeviceDriver instances.
+  Drivers are keyed by device id and profile version, so HTTP keep-alive
+  connections and login state (cookies/mapped headers) survive across
+  monitor cycles and manage sequences. Entries are evicted when the device
+  connection data or profile changes and after DEVICE_DRIVER_IDLE_TIMEOUT.
+  """
+
+  def __init__(self, idle_timeout: float = constants.DEVICE_DRIVER_IDLE_TIMEOUT):
+    self.idle_timeout = idle_timeout
+    self._entries: Dict[str, PooledDriver] = {}
+    self._lock = threading.Lock()
+    self._last_sweep = time.monotonic()
+
+  @staticmethod
+  def pool_key(device: Device | DeviceToAdopt) -> str:
+    if device.id:
+      return str(device.id)
+    # Devices being adopted have no id yet
+    return f"adoption:{device.mac_address or device.ip_address}"
+
+  @staticmethod
+  def profile_version(profile: Profile) -> Tuple:
+    updated_at = profile.updatedAt.isoformat() if isinstance(profile.updatedAt, datetime) else None
+    return (str(profile.id), updated_at)
+
+  @staticmethod
+  def device_fingerprint(device: Device | DeviceToAdopt) -> Tuple:
+    # Only fields used to reach and log in to the device
+    return (device.ip_address, device.mac_address, device.user, device.password)
+
+  def get(self, device: Device | DeviceToAdopt, profile: Profile) -> DeviceDriver:
+    """
+    Returns the pooled driver for device/profile, building a new one when
+    missing or outdated.
+    """
+    key = self.pool_key(device)
+    profile_version = self.profile_version(profile)
+    device_fingerprint = self.device_fingerprint(device)
+    stale_drivers = []
+
+    with self._lock:
+      stale_drivers.extend(self._pop_idle())
+
+      entry = self._entries.get(key)
+      if entry and (entry.profile_version != profile_version or entry.device_fingerprint != device_fingerprint):
+        stale_drivers.append(self._entries.pop(key).driver)
+        entry = None
+
+      if entry is None:
+        entry = PooledDriver(DeviceDriver(device=device, profile=profile), profile_version, device_fingerprint)
+        self._entries[key] = entry
+
+      entry.last_used = time.monotonic()
+      driver = entry.driver
+
+    for stale_driver in stale_drivers:
+      stale_driver.close()
+
+    return driver
+
+  def lookup(self, device_id: str, ip_address: str, profile: Profile) -> DeviceDriver | None:
+    """
+    Pooled driver of device_id if it's still built for ip_address and profile,
+    None when the full device is needed to build one (see get).
+    Edits of the device credentials drop its entry (invalidate_device).
+    """
+    with self._lock:
+      entry = self._entries.get(str(device_id))
+      if entry is None or entry.profile_version != self.profile_version(profile) or entry.device_fingerprint[0] != ip_address:
+        return None
+      entry.last_used = time.monotonic()
+      return entry.driver
+
+  def invalidate_device(self, device_id: str):
+    with self._lock:
+      entry = self._entries.pop(str(device_id), None)
+    if entry:
+      entry.driver.close()
+
+  def invalidate_profile(self, profile_id: str):
+    with self._lock:
+      keys = [key for key, entry in self._entries.items() if entry.profile_version[0] == str(profile_id)]
+      entries = [self._entries.pop(key) for key in keys]
+    for entry in entries:
+      entry.driver.close()
+
+  def _pop_idle(self):
+    now = time.monotonic()
+    if now - self._last_sweep < constants.DEVICE_DRIVER_POOL_SWEEP_RATE:
+      return []
+    self._last_sweep = now
+
+    idle_keys = [key for key, entry in self._entries.items() if now - entry.last_used > self.idle_timeout]
+    return [self._entries.pop(key).driver for key in idle_keys]
+
+  def __len__(self):
+    return len(self._entries)
+
+driver_pool = DriverPool()
@@ -0,0 +1,144 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import src.configs.constants as constants
+
+LANE_MANAGE = 'manage'
+LANE_MONITOR = 'monitor'
+LANE_DISCOVERY = 'discovery'
+
+
+class ExecutorLane:
+  """
+  Bounded thread pool for one class of blocking work, with queue/saturation metrics.
+  """
+
+  def __init__(self, name: str, max_workers: int):
+    self.name = name
+    self.max_workers = max_workers
+    self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f'rfsight-{name}')
+
+    self.queued = 0
+    self.running = 0
+    self.submitted = 0
+    self.completed = 0
+    self.failed = 0
+    self.cancelled = 0
+    self.max_queue_depth = 0
+    self.total_wait = 0.0
+    self.max_wait = 0.0
+    # Counters are updated from both the event loop and worker threads
+    self.lock = threading.Lock()
+
+  async def run(self, func: Callable, *args, **kwargs) -> Any:
+    submitted_at = time.monotonic()
+    with self.lock:
+      self.submitted += 1
+      self.queued += 1
+      self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+    def _job():
+      waited = time.monotonic() - submitted_at
+      with self.lock:
+        self.queued -= 1
+        self.running += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+      try:
+        result = func(*args, **kwargs)
+      except BaseException:
+        with self.lock:
+          self.running -= 1
+          self.failed += 1
+        raise
+      with self.lock:
+        self.running -= 1
+        self.completed += 1
+      return result
+
+    future = self.executor.submit(_job)
+    future.add_done_callback(self._on_done)
+    # Cancelling the awaiting task cancels the job too, unless it already started
+    return await asyncio.wrap_future(future)
+
+  def _on_done(self, future: Future):
+    # A cancelled job never ran, so it's still counted as queued
+    if future.cancelled():
+      with self.lock:
+        self.queued -= 1
+        self.cancelled += 1
+
+  @property
+  def saturation(self) -> float:
+    return self.running / self.max_workers
+
+  def stats(self) -> Dict[str, Any]:
+    with self.lock:
+      return self._stats()
+
+  def _stats(self) -> Dict[str, Any]:
+    started = self.submitted - self.queued - self.cancelled
+    return {
+      'lane': self.name,
+      'maxWorkers': self.max_workers,
+      'running': self.running,
+      'queued': self.queued,
+      'saturation': round(self.saturation, 3),
+      'saturated': self.running >= self.max_workers and self.queued > 0,
+      'maxQueueDepth': self.max_queue_depth,
+      'submitted': self.submitted,
+      'completed': self.completed,
+      'failed': self.failed,
+      'cancelled': self.cancelled,
+      'avgWaitMs': round(self.total_wait / started * 1000, 3) if started else 0.0,
+      'maxWaitMs': round(self.max_wait * 1000, 3),
+    }
+
+  def shutdown(self):
+    self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BlockingExecutor:
+  """
+  Dedicated executor for blocking device work, split into priority lanes:
+  - manage: interactive work (manage sequences, adoption), sized to never wait
+    behind background polling.
+  - monitor: background monitor actions that cannot run on the event loop (SSH).
+  - discovery: ARP sweeps and other scapy work.
+  Each lane has its own workers, so a flooded monitor cycle cannot delay a
+  user's reboot or adoption. The asyncio default executor is left untouched.
+  """
+
+  def __init__(self, lane_sizes: Dict[str, int]):
+    self.lanes: Dict[str, ExecutorLane] = {
+      name: ExecutorLane(name, max_workers) for name, max_workers in lane_sizes.items()
+    }
+
+  def lane(self, name: str) -> ExecutorLane:
+    try:
+      return self.lanes[name]
+    except KeyError:
+      raise ValueError(f"Executor lane '{name}' does not exist.")
+
+  async def run(self, lane: str, func: Callable, *args, **kwargs) -> Any:
+    """
+    Runs func(*args, **kwargs) in a worker thread of lane and awaits its result.
+    """
+    return await self.lane(lane).run(functools.partial(func, *args, **kwargs))
+
+  def stats(self) -> Dict[str, Dict[str, Any]]:
+    return {name: lane.stats() for name, lane in self.lanes.items()}
+
+  def shutdown(self):
+    for lane in self.lanes.values():
+      lane.shutdown()
+
+blocking_executor = BlockingExecutor({
+  LANE_MANAGE: constants.EXECUTOR_MANAGE_WORKERS,
+  LANE_MONITOR: constants.EXECUTOR_MONITOR_WORKERS,
+  LANE_DISCOVERY: constants.EXECUTOR_DISCOVERY_WORKERS,
+})
@@ -0,0 +1,210 @@
+import asyncio
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+import src.configs.constants as constants
+from src.models.Device import DeviceFingerprint
+from src.models.Profile import Fingerprint, Profile
+from src.services.discovery import snmp_get_many
+from src.services.snmp_client import SnmpClient
+
+# Weight of each matched signature, the more specific the higher
+WEIGHT_SYS_OBJECT_ID = 4
+WEIGHT_SYS_DESCR = 2
+WEIGHT_HTTP_BODY = 2
+WEIGHT_HTTP_SERVER = 1
+
+# (scheme, port, path) of a probed page
+HttpTarget = Tuple[str, int, str]
+
+
+class Observation:
+  """
+  What a device showed when probed: SNMP system identity and, per (scheme, port, path),
+  its HTTP identity headers and the start of the page.
+  """
+
+  __slots__ = ('ip_address', 'sys_object_id', 'sys_descr', 'snmp_probed', 'http', 'observed_at')
+
+  def __init__(self, ip_address: str):
+    self.ip_address = ip_address
+    self.sys_object_id: Optional[str] = None
+    self.sys_descr: Optional[str] = None
+    self.snmp_probed = False
+    # (scheme, port, path) -> (headers, body), None when nothing answered
+    self.http: Dict[HttpTarget, Optional[Tuple[str, str]]] = {}
+    self.observed_at = time.monotonic()
+
+
+def search_any(patterns: List[str], text: str) -> bool:
+  return any(re.search(pattern, text, re.IGNORECASE) for pattern in patterns)
+
+def score_fingerprint(fingerprint: Fingerprint, observation: Observation) -> int | None:
+  """
+  Sum of the weights of the matched signatures, None if any observed value contradicts one.
+  Signatures that couldn't be observed (no SNMP, no web page) neither add nor exclude.
+  """
+  score = 0
+  if fingerprint.sysObjectId and observation.sys_object_id is not None:
+    if not any(SnmpClient.in_subtree(observation.sys_object_id, prefix) for prefix in fingerprint.sysObjectId):
+      return None
+    score += WEIGHT_SYS_OBJECT_ID
+
+  if fingerprint.sysDescr and observation.sys_descr is not None:
+    if not search_any(fingerprint.sysDescr, observation.sys_descr):
+      return None
+    score += WEIGHT_SYS_DESCR
+
+  http = observation.http.get(fingerprint.http_target())
+  if http is not None:
+    headers, body = http
+    if fingerprint.httpServer:
+      if not search_any(fingerprint.httpServer, headers):
+        return None
+      score += WEIGHT_HTTP_SERVER
+    if fingerprint.httpBody:
+      if not search_any(fingerprint.httpBody, body):
+        return None
+      score += WEIGHT_HTTP_BODY
+
+  return score
+
+
+class FingerprintEngine:
+  """
+  Identifies the profile of discovered devices from the signatures declared in
+  each profile's fingerprint. Devices are probed concurrently (at most
+  FINGERPRINT_MAX_CONCURRENT at a time): one SNMP GET for sysObjectID/sysDescr
+  and one HTTP GET per distinct (scheme, port, path) the profiles look at. Observations
+  are cached by MAC for FINGERPRINT_CACHE_TTL seconds, so matching against
+  edited profiles doesn't probe the devices again.
+  """
+
+  def __init__(self, max_concurrent: int = constants.FINGERPRINT_MAX_CONCURRENT, ttl: float = constants.FINGERPRINT_CACHE_TTL):
+    self.max_concurrent = max_concurrent
+    self.ttl = ttl
+    self.cache: Dict[str, Observation] = {}
+
+    self.loop: asyncio.AbstractEventLoop | None = None
+    self.semaphore: asyncio.Semaphore | None = None
+    self.http_client: httpx.AsyncClient | None = None
+
+  def _bind_loop(self):
+    loop = asyncio.get_running_loop()
+    if self.semaphore is None or self.loop is not loop:
+      self.loop = loop
+      self.semaphore = asyncio.Semaphore(self.max_concurrent)
+      self.http_client = None
+
+  def _get_http_client(self) -> httpx.AsyncClient:
+    if self.http_client is None or self.http_client.is_closed:
+      # Device web pages are commonly served with self-signed certificates
+      self.http_client = httpx.AsyncClient(timeout=constants.FINGERPRINT_HTTP_TIMEOUT, follow_redirects=True, verify=False,
+                                           limits=httpx.Limits(max_connections=self.max_concurrent, max_keepalive_connections=0))
+    return self.http_client
+
+  async def identify(self, mac: str | None, ip: str, profiles: Iterable[Profile], refresh: bool = False) -> DeviceFingerprint:
+    """
+    Probes the device (unless cached) and matches it against profiles.
+    """
+    profiles = [p for p in profiles if p.fingerprint]
+    observation = await self.observe(mac, ip, profiles, refresh=refresh)
+    return self.match(mac, observation, profiles)
+
+  async def identify_many(self, devices: Iterable[Tuple[str | None, str]], profiles: Iterable[Profile],
+                          refresh: bool = False) -> List[DeviceFingerprint]:
+    profiles = [p for p in profiles if p.fingerprint]
+    return await asyncio.gather(*[self.identify(mac, ip, profiles, refresh=refresh) for mac, ip in devices])
+
+  async def observe(self, mac: str | None, ip: str, profiles: List[Profile], refresh: bool = False) -> Observation:
+    key = mac or ip
+    wants_snmp = any(p.fingerprint.sysObjectId or p.fingerprint.sysDescr for p in profiles)
+    http_targets: Set[HttpTarget] = {p.fingerprint.http_target() for p in profiles if p.fingerprint.probes_http()}
+
+    observation = self.cache.get(key)
+    if refresh or observation is None or observation.ip_address != ip or time.monotonic() - observation.observed_at >= self.ttl:
+      observation = Observation(ip)
+
+    # Only what no earlier probe of this device covered yet
+    probe_snmp = wants_snmp and not observation.snmp_probed
+    missing_targets = [target for target in http_targets if target not in observation.http]
+    if probe_snmp or missing_targets:
+      self._bind_loop()
+      async with self.semaphore:
+        await asyncio.gather(
+          *([self._probe_snmp(observation)] if probe_snmp else []),
+          *[self._probe_http(observation, target) for target in missing_targets]
+        )
+
+    if key not in self.cache and len(self.cache) >= constants.FINGERPRINT_CACHE_SIZE:
+      self.prune()
+    self.cache[key] = observation
+    return observation
+
+  async def _probe_snmp(self, observation: Observation):
+    try:
+      values = await snmp_get_many(observation.ip_address, [constants.OID_SYSOBJECTID, constants.OID_SYSDESCR])
+    except Exception as e:
+      # A device that can't be queried only loses its SNMP signatures, not the whole batch
+      print(f"Fingerprint: SNMP probe of {observation.ip_address} failed: {e}")
+      values = {}
+    observation.sys_object_id = values.get(constants.OID_SYSOBJECTID)
+    observation.sys_descr = values.get(constants.OID_SYSDESCR)
+    observation.snmp_probed = True
+
+  async def _probe_http(self, observation: Observation, target: HttpTarget):
+    scheme, port, path = target
+    url = f"{scheme}://{observation.ip_address}:{port}/{path.lstrip('/')}"
+    try:
+      async with self._get_http_client().stream('GET', url) as response:
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+          body += chunk
+          if len(body) >= constants.FINGERPRINT_HTTP_MAX_BODY:
+            break
+        headers = ' '.join(response.headers.get_list('server') + response.headers.get_list('www-authenticate'))
+        observation.http[target] = (headers, body[:constants.FINGERPRINT_HTTP_MAX_BODY].decode(errors='replace'))
+    except httpx.HTTPError:
+      observation.http[target] = None
+
+  def match(self, mac: str | None, observation: Observation, profiles: List[Profile]) -> DeviceFingerprint:
+    best_score, best = 0, []
+    for profile in profiles:
+      score = score_fingerprint(profile.fingerprint, observation)
+      if score is None or score < best_score or score == 0:
+        continue
+      if score > best_score:
+        best_score, best = score, []
+      best.append(profile)
+
+    server = next((http[0] for http in observation.http.values() if http and http[0]), None)
+    matched = best[0] if len(best) == 1 else None
+    return DeviceFingerprint(
+      mac_address=mac,
+      ip_address=observation.ip_address,
+      profileId=matched.id if matched else None,
+      profileName=matched.name if matched else None,
+      score=best_score,
+      candidates=[p.id for p in best],
+      sysObjectId=observation.sys_object_id,
+      sysDescr=observation.sys_descr,
+      httpServer=server
+    )
+
+  def invalidate(self, key: str):
+    self.cache.pop(key, None)
+
+  def prune(self):
+    """
+    Drops expired observations (or all of them when none expired yet).
+    """
+    now = time.monotonic()
+    for key, observation in list(self.cache.items()):
+      if now - observation.observed_at >= self.ttl:
+        del self.cache[key]
+    if len(self.cache) >= constants.FINGERPRINT_CACHE_SIZE:
+      self.cache.clear()
+
+fingerprint_engine = FingerprintEngine()
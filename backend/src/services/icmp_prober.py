@@ -0,0 +1,184 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import struct
+import time
+from typing import Dict, List, Tuple
+
+import src.configs.constants as constants
+from src.shared.utils import async_ping
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+ICMP_PAYLOAD = b'rfsight-icmp-probe'.ljust(32, b'\x00')
+
+
+def icmp_checksum(data: bytes) -> int:
+  if len(data) % 2:
+    data += b'\x00'
+  total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+  total = (total >> 16) + (total & 0xFFFF)
+  total += total >> 16
+  return ~total & 0xFFFF
+
+def build_echo_request(identifier: int, sequence: int) -> bytes:
+  header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+  checksum = icmp_checksum(header + ICMP_PAYLOAD)
+  return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, identifier, sequence) + ICMP_PAYLOAD
+
+
+class IcmpProber:
+  """
+  Asyncio ICMP echo engine.
+  Keeps many echo requests in flight on a single raw (or unprivileged datagram)
+  socket and matches replies by identifier/sequence, so a whole device list is
+  probed without spawning one `ping` process per host.
+  """
+
+  def __init__(self, timeout: float = constants.ICMP_PING_TIMEOUT, max_in_flight: int = constants.ICMP_MAX_IN_FLIGHT):
+    self.timeout = timeout
+    self.max_in_flight = max_in_flight
+    self.identifier = os.getpid() & 0xFFFF
+
+    self.sock: socket.socket | None = None
+    self.is_raw = False
+    # Set once neither socket type can be opened, every ping then uses the subprocess
+    self.use_subprocess = False
+    self.loop: asyncio.AbstractEventLoop | None = None
+    self.semaphore: asyncio.Semaphore | None = None
+
+    # sequence -> (host, sent_at, future)
+    self.pending: Dict[int, Tuple[str, float, asyncio.Future]] = {}
+    self.next_sequence = 0
+
+  def _open_socket(self) -> bool:
+    """
+    Opens the shared ICMP socket bound to the running loop.
+    Returns False when neither a raw nor a datagram ICMP socket is allowed
+    (remembered, so the fallback is only decided and logged once).
+    """
+    if self.use_subprocess:
+      return False
+
+    loop = asyncio.get_running_loop()
+    if self.sock is not None and self.loop is loop:
+      return True
+
+    self.close()
+
+    try:
+      sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+      self.is_raw = True
+    except OSError:
+      # No privileges, or raw sockets unsupported (e.g. sandboxed runtimes)
+      try:
+        # Unprivileged ping socket (net.ipv4.ping_group_range)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        self.is_raw = False
+      except OSError as e:
+        print(f"ICMP prober: could not open ICMP socket, falling back to ping subprocess: {e}")
+        self.use_subprocess = True
+        return False
+
+    sock.setblocking(False)
+    loop.add_reader(sock.fileno(), self._on_readable)
+
+    self.sock = sock
+    self.loop = loop
+    self.semaphore = asyncio.Semaphore(self.max_in_flight)
+    return True
+
+  def close(self):
+    if self.sock is None:
+      return
+    try:
+      if self.loop and not self.loop.is_closed():
+        self.loop.remove_reader(self.sock.fileno())
+    finally:
+      self.sock.close()
+      self.sock = None
+      self.loop = None
+      for _, _, future in self.pending.values():
+        if not future.done():
+          future.cancel()
+      self.pending.clear()
+
+  def _allocate_sequence(self) -> int:
+    for _ in range(0x10000):
+      sequence = self.next_sequence
+      self.next_sequence = (self.next_sequence + 1) & 0xFFFF
+      if sequence not in self.pending:
+        return sequence
+    raise RuntimeError('ICMP prober: no free sequence numbers.')
+
+  def _on_readable(self):
+    while True:
+      try:
+        packet, address = self.sock.recvfrom(65535)
+      except (BlockingIOError, InterruptedError):
+        return
+      except OSError as e:
+        print(f"ICMP prober: receive error: {e}")
+        return
+
+      received_at = time.perf_counter()
+
+      # Raw sockets deliver the IP header, datagram sockets only the ICMP message
+      icmp = packet[(packet[0] & 0x0F) * 4:] if self.is_raw else packet
+      if len(icmp) < 8:
+        continue
+
+      icmp_type, _, _, identifier, sequence = struct.unpack('!BBHHH', icmp[:8])
+      if icmp_type != ICMP_ECHO_REPLY:
+        continue
+      # Datagram sockets have the identifier rewritten (and filtered) by the kernel
+      if self.is_raw and identifier != self.identifier:
+        continue
+
+      entry = self.pending.get(sequence)
+      if not entry:
+        continue
+
+      host, sent_at, future = entry
+      if address[0] != host or future.done():
+        continue
+      future.set_result(round((received_at - sent_at) * 1000, 3))
+
+  async def ping(self, host: str) -> Tuple[bool, float | None]:
+    """
+    Sends one echo request to host and waits for its reply.
+    Returns (is_online, latency_ms), the same contract as `async_ping`.
+    """
+    try:
+      is_ipv4 = ipaddress.ip_address(host).version == 4
+    except ValueError:
+      is_ipv4 = False
+
+    if not is_ipv4 or not self._open_socket():
+      return await async_ping(host)
+
+    async with self.semaphore:
+      sequence = self._allocate_sequence()
+      future = self.loop.create_future()
+      self.pending[sequence] = (host, time.perf_counter(), future)
+      try:
+        await self.loop.sock_sendto(self.sock, build_echo_request(self.identifier, sequence), (host, 0))
+        latency = await asyncio.wait_for(future, timeout=self.timeout)
+        return True, latency
+      except asyncio.TimeoutError:
+        return False, None
+      except OSError as e:
+        print(f"Ping error for {host}: {e}")
+        return False, None
+      finally:
+        self.pending.pop(sequence, None)
+
+  async def ping_many(self, hosts: List[str]) -> List[Tuple[bool, float | None]]:
+    """
+    Probes every host concurrently over the shared socket.
+    Results are returned in the same order as hosts.
+    """
+    return await asyncio.gather(*[self.ping(host) for host in hosts])
+
+icmp_prober = IcmpProber()
@@ -0,0 +1,188 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Set
+
+import src.configs.constants as constants
+from bson import ObjectId
+from fastapi import FastAPI, HTTPException
+from src.models.Job import Job, JobStep
+from src.repositories.job import JobRepository, now
+
+FINAL_STATUSES = ('success', 'failed')
+
+
+def error_message(error: Exception) -> str:
+  if isinstance(error, HTTPException) and isinstance(error.detail, dict):
+    return error.detail.get('message', str(error.detail))
+  return str(error)
+
+
+class JobContext:
+  """
+  Handle a running job uses to record steps (with timings), results and live progress.
+  UNTRACKED (no job id) turns every call into a no-op, so the same code runs inline too.
+  """
+
+  def __init__(self, engine: 'JobEngine | None', job_id: ObjectId | None):
+    self.engine = engine
+    self.job_id = job_id
+    self.progress: Dict[str, int] = {}
+    self._pending_results: List[Dict[str, Any]] = []
+    self._flushed_at = time.monotonic()
+
+  @asynccontextmanager
+  async def step(self, name: str):
+    if self.job_id is None:
+      yield
+      return
+
+    db = self.engine.db
+    step = JobStep(name=name, status='running', startedAt=now())
+    await JobRepository.push_step(db, self.job_id, step)
+    self.engine.publish(self.job_id, {'event': 'step', **step.model_dump(mode='json')})
+
+    start = time.perf_counter()
+    try:
+      yield
+      step.status = 'success'
+    except Exception as e:
+      step.status = 'failed'
+      step.message = error_message(e)
+      raise
+    finally:
+      step.finishedAt = now()
+      step.durationMs = round((time.perf_counter() - start) * 1000, 3)
+      await JobRepository.set_last_step(db, self.job_id, step)
+      self.engine.publish(self.job_id, {'event': 'step', **step.model_dump(mode='json')})
+
+  def emit(self, event: Dict[str, Any]):
+    """
+    Live progress only, not stored.
+    """
+    if self.job_id is not None:
+      self.engine.publish(self.job_id, event)
+
+  async def add_result(self, result: Dict[str, Any], outcome: str | None = None):
+    """
+    Stores a result (batched, flushed every JOBS_RESULTS_FLUSH_INTERVAL) and publishes it.
+    """
+    if self.job_id is None:
+      return
+    if outcome:
+      self.progress[outcome] = self.progress.get(outcome, 0) + 1
+    self._pending_results.append(result)
+    self.engine.publish(self.job_id, {'event': 'result', 'result': result, 'progress': dict(self.progress)})
+    if time.monotonic() - self._flushed_at >= constants.JOBS_RESULTS_FLUSH_INTERVAL:
+      await self.flush()
+
+  async def set_total(self, total: int):
+    if self.job_id is None:
+      return
+    self.progress['total'] = total
+    await JobRepository.update_job(self.engine.db, self.job_id, {'progress': self.progress})
+    self.engine.publish(self.job_id, {'event': 'progress', 'progress': dict(self.progress)})
+
+  async def flush(self):
+    if self.job_id is None:
+      return
+    self._flushed_at = time.monotonic()
+    if self._pending_results:
+      results, self._pending_results = self._pending_results, []
+      await JobRepository.push_results(self.engine.db, self.job_id, results, self.progress)
+
+UNTRACKED = JobContext(None, None)
+
+JobHandler = Callable[[JobContext, Dict[str, Any]], Awaitable[None]]
+
+
+class JobEngine:
+  """
+  Runs long device operations (e.g. adoptions) as background jobs persisted in
+  the jobs collection. The API returns the job id right away; at most
+  JOBS_MAX_RUNNING jobs run at once, the rest wait queued. Status, step timings
+  and results are stored on the job document, and subscribers get every
+  change live (served over SSE).
+  """
+
+  def __init__(self, max_running: int = constants.JOBS_MAX_RUNNING):
+    self.max_running = max_running
+    self.db = None
+    self.handlers: Dict[str, JobHandler] = {}
+    self.tasks: Dict[str, asyncio.Task] = {}
+    self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+    self.semaphore: asyncio.Semaphore | None = None
+
+  def register(self, job_type: str, handler: JobHandler):
+    self.handlers[job_type] = handler
+
+  async def start(self, app: FastAPI):
+    self.db = app.state.db
+    self.semaphore = asyncio.Semaphore(self.max_running)
+    interrupted = await JobRepository.fail_interrupted_jobs(self.db)
+    if interrupted:
+      print(f"Jobs: {interrupted} job(s) interrupted by the last shutdown marked as failed")
+
+  async def submit(self, job_type: str, payload: Dict[str, Any], request_summary: Dict[str, Any], created_by: str | None = None) -> str:
+    """
+    Stores a queued job and schedules it. payload (may hold credentials) stays in memory only.
+    """
+    handler = self.handlers[job_type]
+    job_id = await JobRepository.create_job(self.db, Job(jobType=job_type, createdBy=created_by, request=request_summary))
+    self.tasks[str(job_id)] = asyncio.create_task(self._run(job_id, handler, payload))
+    return str(job_id)
+
+  async def _run(self, job_id: ObjectId, handler: JobHandler, payload: Dict[str, Any]):
+    job = JobContext(self, job_id)
+    try:
+      async with self.semaphore:
+        await JobRepository.update_job(self.db, job_id, {'status': 'running', 'startedAt': now()})
+        self.publish(job_id, {'event': 'status', 'status': 'running'})
+
+        status, error = 'success', None
+        try:
+          await handler(job, payload)
+        except Exception as e:
+          status, error = 'failed', error_message(e)
+          print(f"Job {job_id} failed: {error}")
+
+        await job.flush()
+        await JobRepository.update_job(self.db, job_id, {'status': status, 'error': error, 'finishedAt': now(), 'progress': job.progress})
+        self.publish(job_id, {'event': 'done', 'status': status, 'error': error, 'progress': job.progress})
+    finally:
+      self.tasks.pop(str(job_id), None)
+      # Ends every subscription of this job
+      for queue in self.subscribers.get(str(job_id), ()):
+        queue.put_nowait(None)
+
+  def publish(self, job_id: ObjectId | str, event: Dict[str, Any]):
+    for queue in self.subscribers.get(str(job_id), ()):
+      queue.put_nowait(event)
+
+  async def subscribe(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Current state of job followed by its live events, until it finishes.
+    """
+    job_id = str(job.id)
+    queue: asyncio.Queue = asyncio.Queue()
+    self.subscribers.setdefault(job_id, set()).add(queue)
+    try:
+      # Re-read after subscribing so no event falls between the snapshot and the queue
+      snapshot = await JobRepository.get_job_by_id(self.db, job_id) or job
+      yield {'event': 'snapshot', 'job': snapshot.model_dump(mode='json')}
+      if snapshot.status in FINAL_STATUSES or job_id not in self.tasks:
+        return
+
+      while True:
+        event = await queue.get()
+        if event is None:
+          return
+        yield event
+    finally:
+      queues = self.subscribers.get(job_id)
+      if queues is not None:
+        queues.discard(queue)
+        if not queues:
+          del self.subscribers[job_id]
+
+job_engine = JobEngine()
@@ -0,0 +1,52 @@
+from typing import Any, Dict
+
+import orjson
+
+try:
+  import msgpack
+except ImportError:
+  msgpack = None
+
+ENCODING_JSON = 'json'
+ENCODING_MSGPACK = 'msgpack'
+
+
+def available_encodings():
+  return (ENCODING_JSON, ENCODING_MSGPACK) if msgpack is not None else (ENCODING_JSON,)
+
+def negotiate_encoding(requested: str | None) -> str:
+  """
+  Encoding used for a client: the requested one when supported, JSON otherwise.
+  """
+  return requested if requested in available_encodings() else ENCODING_JSON
+
+def _default(value: Any) -> Any:
+  # Values orjson/msgpack can't encode natively (e.g. ObjectId)
+  return str(value)
+
+
+class EncodedMessage:
+  """
+  A websocket message encoded at most once per wire format.
+  Shared by every client of a subscription group: each one picks its
+  negotiated format and reuses the cached encoding.
+  """
+
+  __slots__ = ('data', '_encoded')
+
+  def __init__(self, data: Dict[str, Any]):
+    self.data = data
+    self._encoded: Dict[str, str | bytes] = {}
+
+  def encode(self, encoding: str = ENCODING_JSON) -> str | bytes:
+    """
+    JSON is returned as text (text frames), MessagePack as bytes (binary frames).
+    """
+    encoded = self._encoded.get(encoding)
+    if encoded is None:
+      if encoding == ENCODING_MSGPACK:
+        encoded = msgpack.packb(self.data, default=_default, datetime=False)
+      else:
+        encoded = orjson.dumps(self.data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+      self._encoded[encoding] = encoded
+    return encoded
@@ -0,0 +1,125 @@
+from typing import Any, Dict, Iterable, List
+
+from src.services.device_registry import RegistrySnapshot
+
+# Nested fields diffed key by key instead of being resent whole
+NESTED_FIELDS = ('stats', 'actionsStatuses')
+# Fields that change on every poll, sent with every delta (heartbeats included)
+VOLATILE_FIELDS = ('timestamp',)
+
+
+def aggregate_by_organization(entries: Iterable[Dict], snapshot: RegistrySnapshot) -> Dict:
+  """
+  Groups device entries (dicts holding deviceId) into organization -> network -> devices.
+  """
+  aggregated = {}
+
+  for d in entries:
+    dev_id = d["deviceId"]
+    device = snapshot.devices.get(dev_id)
+    network_id = str(device.networkId) if device and device.networkId else "unassigned"
+    organization_id = snapshot.network_to_org.get(network_id, "unassigned")
+
+    org_entry = aggregated.setdefault(organization_id, {"networks": {}})
+    net_entry = org_entry["networks"].setdefault(network_id, {"devices": {}})
+
+    net_entry["devices"][dev_id] = d
+
+  return aggregated
+
+def diff_device_state(previous: Dict[str, Any] | None, current: Dict[str, Any]) -> Dict[str, Any]:
+  """
+  Returns the fields of current that differ from previous, plus the volatile ones.
+  Nested fields only carry changed keys, keys that disappeared are listed in `removed`.
+  When nothing changed it's a heartbeat (deviceId and volatile fields only), so clients
+  still record one point per poll from the state they hold.
+  """
+  if previous is None:
+    return dict(current)
+
+  delta = {}
+  removed = {}
+  for field, value in current.items():
+    if field == 'deviceId' or field in VOLATILE_FIELDS:
+      continue
+    old_value = previous.get(field)
+    if field in NESTED_FIELDS and isinstance(value, dict) and isinstance(old_value, dict):
+      changed = {key: item for key, item in value.items() if key not in old_value or old_value[key] != item}
+      gone = [key for key in old_value if key not in value]
+      if changed:
+        delta[field] = changed
+      if gone:
+        removed[field] = gone
+    elif old_value != value:
+      delta[field] = value
+
+  delta['deviceId'] = current['deviceId']
+  for field in VOLATILE_FIELDS:
+    if field in current:
+      delta[field] = current[field]
+  if removed:
+    delta['removed'] = removed
+  return delta
+
+
+class MonitorStateStore:
+  """
+  Last state sent to websocket clients for every device.
+  Each broadcast only carries the fields that changed since the previous one and
+  a sequence number; clients apply deltas in order and ask for a full snapshot
+  (sent on connect and on 'resync') when they detect a gap.
+  """
+
+  def __init__(self):
+    self.seq = 0
+    self.states: Dict[str, Dict[str, Any]] = {}
+    self.removed_devices: List[str] = []
+
+  def prune(self, device_ids: Iterable[str]):
+    """
+    Drops state of devices that are no longer registered, they are announced on the next delta.
+    """
+    device_ids = set(device_ids)
+    for dev_id in list(self.states.keys()):
+      if dev_id not in device_ids:
+        del self.states[dev_id]
+        self.removed_devices.append(dev_id)
+
+  def apply(self, updates: List[Dict[str, Any]], snapshot: RegistrySnapshot) -> Dict[str, Any] | None:
+    """
+    Records updates (DeviceMonitorUpdate dumped in json mode) and returns the
+    delta message to broadcast (a heartbeat for devices that didn't change),
+    or None when there are no updates nor removed devices.
+    """
+    deltas = []
+    for update in updates:
+      dev_id = update['deviceId']
+      deltas.append(diff_device_state(self.states.get(dev_id), update))
+      self.states[dev_id] = update
+
+    if not deltas and not self.removed_devices:
+      return None
+
+    self.seq += 1
+    data = {
+      'seq': self.seq,
+      'organizations': aggregate_by_organization(deltas, snapshot),
+    }
+    if self.removed_devices:
+      data['removedDevices'] = self.removed_devices
+      self.removed_devices = []
+
+    # Plain dict: encoded once by the websocket layer, no pydantic round trip
+    return {'messageType': 'deviceMonitorDelta', 'data': data}
+
+  def snapshot_message(self, snapshot: RegistrySnapshot) -> Dict[str, Any]:
+    """
+    Full state of every device, tagged with the sequence number it corresponds to.
+    """
+    return {'messageType': 'deviceMonitor', 'data': {
+      'seq': self.seq,
+      'snapshot': True,
+      'organizations': aggregate_by_organization(self.states.values(), snapshot),
+    }}
+
+monitor_state = MonitorStateStore()
@@ -0,0 +1,128 @@
+import time
+from bisect import bisect_right
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import src.configs.constants as constants
+
+CHANGE_ADDED = 'added'
+CHANGE_UPDATED = 'updated'
+CHANGE_EXPIRED = 'expired'
+
+
+class Neighbor:
+  """
+  A MAC <-> IP binding learned from ARP replies.
+  """
+
+  __slots__ = ('mac_address', 'ip_address', 'iface', 'first_seen', 'last_seen')
+
+  def __init__(self, mac_address: str, ip_address: str, iface: str, seen_at: float):
+    self.mac_address = mac_address
+    self.ip_address = ip_address
+    self.iface = iface
+    self.first_seen = seen_at
+    self.last_seen = seen_at
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {
+      'mac_address': self.mac_address,
+      'ip_address': self.ip_address,
+      'iface': self.iface,
+      'firstSeen': self.first_seen,
+      'lastSeen': self.last_seen,
+    }
+
+
+class NeighborTable:
+  """
+  Discovered devices indexed by MAC and by IP.
+  Entries not seen for `expiry` seconds are dropped. Every addition, address/interface
+  change and expiry is appended to a bounded, sequenced change feed that
+  consumers read incrementally with changes_since.
+  """
+
+  def __init__(self, expiry: float = constants.ARP_NEIGHBOR_EXPIRY, feed_size: int = constants.ARP_NEIGHBOR_FEED_SIZE):
+    self.expiry = expiry
+    self.by_mac: Dict[str, Neighbor] = {}
+    self.by_ip: Dict[str, Neighbor] = {}
+    self.seq = 0
+    self.feed: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=feed_size)
+    # MACs in order for keyset pagination, rebuilt lazily after additions/removals
+    self._sorted_macs: List[str] | None = None
+
+  def __len__(self) -> int:
+    return len(self.by_mac)
+
+  def _record(self, change: str, neighbor: Neighbor):
+    self.seq += 1
+    self.feed.append((self.seq, change, neighbor.to_dict()))
+
+  def upsert(self, mac: str, ip: str, iface: str, seen_at: float | None = None):
+    seen_at = seen_at or time.time()
+    neighbor = self.by_mac.get(mac)
+
+    if neighbor is None:
+      neighbor = Neighbor(mac, ip, iface, seen_at)
+      self.by_mac[mac] = neighbor
+      self._sorted_macs = None
+      change = CHANGE_ADDED
+    else:
+      neighbor.last_seen = seen_at
+      if neighbor.ip_address == ip and neighbor.iface == iface:
+        # Refreshed only, not a change
+        self.by_ip[ip] = neighbor
+        return
+      if self.by_ip.get(neighbor.ip_address) is neighbor:
+        del self.by_ip[neighbor.ip_address]
+      neighbor.ip_address = ip
+      neighbor.iface = iface
+      change = CHANGE_UPDATED
+
+    # The IP now belongs to this MAC, a previous holder is only reachable by MAC
+    self.by_ip[ip] = neighbor
+    self._record(change, neighbor)
+
+  def expire(self, now: float | None = None) -> List[Neighbor]:
+    deadline = (now or time.time()) - self.expiry
+    expired = [n for n in self.by_mac.values() if n.last_seen < deadline]
+    for neighbor in expired:
+      del self.by_mac[neighbor.mac_address]
+      if self.by_ip.get(neighbor.ip_address) is neighbor:
+        del self.by_ip[neighbor.ip_address]
+      self._record(CHANGE_EXPIRED, neighbor)
+    if expired:
+      self._sorted_macs = None
+    return expired
+
+  def get_by_mac(self, mac: str) -> Optional[Neighbor]:
+    return self.by_mac.get(mac)
+
+  def get_by_ip(self, ip: str) -> Optional[Neighbor]:
+    return self.by_ip.get(ip)
+
+  def page(self, after: str | None = None, limit: int = constants.DISCOVERED_DEVICES_PAGE_SIZE) -> Tuple[List[Neighbor], str | None]:
+    """
+    Up to limit neighbors ordered by MAC, starting after the `after` MAC.
+    Returns them with the cursor of the next page (None on the last one).
+    """
+    if self._sorted_macs is None:
+      self._sorted_macs = sorted(self.by_mac)
+    macs = self._sorted_macs
+
+    start = bisect_right(macs, after) if after else 0
+    page_macs = macs[start:start + limit]
+    next_cursor = page_macs[-1] if start + limit < len(macs) else None
+    return [self.by_mac[mac] for mac in page_macs], next_cursor
+
+  def changes_since(self, seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Changes recorded after seq, and whether the caller must resync (seq
+    is older than the feed keeps, so changes were lost).
+    """
+    if seq == self.seq:
+      return [], False
+    # A cursor from the future belongs to a previous process
+    if seq > self.seq or not self.feed or self.feed[0][0] > seq + 1:
+      return [], True
+    return [{'seq': s, 'change': change, **data} for s, change, data in self.feed if s > seq], False
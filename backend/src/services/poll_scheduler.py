@@ -0,0 +1,133 @@
+import heapq
+import itertools
+import time
+import zlib
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import src.configs.constants as constants
+
+
+class DevicePollState:
+  """
+  Scheduling state kept for a single device.
+  """
+
+  def __init__(self, device_id: str, base_interval: float, next_due: float):
+    self.device_id = device_id
+    self.base_interval = base_interval
+    self.interval = base_interval
+    self.next_due = next_due
+    self.failures = 0
+    self.online: bool | None = None
+    self.transitions: Deque[float] = deque()
+
+
+class PollScheduler:
+  """
+  Heap based scheduler that gives every device its own next-due time.
+  - Offline devices back off exponentially up to MONITOR_OFFLINE_MAX_POLL_INTERVAL.
+  - Flapping devices (many online/offline transitions in MONITOR_FLAP_WINDOW)
+    are polled at MONITOR_FLAPPING_POLL_INTERVAL.
+  - New devices get a stable phase offset inside their interval, so due work
+    is spread across the period instead of bursting at the same instant.
+  A device popped as due is only put back in the heap by `reschedule`, so it
+  never gets polled twice concurrently.
+  """
+
+  def __init__(self):
+    self.states: Dict[str, DevicePollState] = {}
+    self.heap: List[Tuple[float, int, str]] = []
+    self.counter = itertools.count()
+
+  def __len__(self):
+    return len(self.states)
+
+  def _push(self, state: DevicePollState):
+    heapq.heappush(self.heap, (state.next_due, next(self.counter), state.device_id))
+
+  @staticmethod
+  def phase_offset(device_id: str, interval: float) -> float:
+    return (zlib.crc32(device_id.encode()) % 1000) / 1000 * interval
+
+  def sync(self, device_intervals: Dict[str, float], now: float | None = None):
+    """
+    Aligns the scheduler with the current device list.
+    device_intervals maps device id -> base poll interval (seconds).
+    """
+    now = time.monotonic() if now is None else now
+
+    for device_id in list(self.states.keys()):
+      if device_id not in device_intervals:
+        # Stale heap entries are skipped lazily on pop
+        del self.states[device_id]
+
+    for device_id, interval in device_intervals.items():
+      interval = max(float(interval), constants.MONITOR_MIN_POLL_INTERVAL)
+      state = self.states.get(device_id)
+      if state is None:
+        state = DevicePollState(device_id, interval, now + self.phase_offset(device_id, interval))
+        self.states[device_id] = state
+        self._push(state)
+      elif state.base_interval != interval:
+        state.base_interval = interval
+        state.interval = self._compute_interval(state, now)
+        # A shorter interval applies right away. Devices already due (maybe being
+        # polled) are left alone, reschedule puts them back with the new interval
+        if now < state.next_due and now + state.interval < state.next_due:
+          state.next_due = now + state.interval
+          self._push(state)
+
+  def pop_due(self, now: float | None = None) -> List[str]:
+    now = time.monotonic() if now is None else now
+    due = []
+    while self.heap and self.heap[0][0] <= now:
+      next_due, _, device_id = heapq.heappop(self.heap)
+      state = self.states.get(device_id)
+      if state is None or state.next_due != next_due:
+        continue
+      due.append(device_id)
+    return due
+
+  def next_due_in(self, now: float | None = None) -> float | None:
+    now = time.monotonic() if now is None else now
+    while self.heap:
+      next_due, _, device_id = self.heap[0]
+      state = self.states.get(device_id)
+      if state is None or state.next_due != next_due:
+        heapq.heappop(self.heap)
+        continue
+      return max(next_due - now, 0)
+    return None
+
+  def reschedule(self, device_id: str, online: bool, now: float | None = None):
+    """
+    Records the poll outcome for device_id and schedules its next poll.
+    """
+    now = time.monotonic() if now is None else now
+    state = self.states.get(device_id)
+    if state is None:
+      return
+
+    if state.online is not None and state.online != online:
+      state.transitions.append(now)
+    state.online = online
+    state.failures = 0 if online else state.failures + 1
+
+    state.interval = self._compute_interval(state, now)
+    # Keep the device phase (previous due + interval) unless the poll overran it
+    state.next_due = max(state.next_due + state.interval, now)
+    self._push(state)
+
+  def _compute_interval(self, state: DevicePollState, now: float) -> float:
+    while state.transitions and now - state.transitions[0] > constants.MONITOR_FLAP_WINDOW:
+      state.transitions.popleft()
+
+    if len(state.transitions) >= constants.MONITOR_FLAP_THRESHOLD:
+      return min(state.base_interval, constants.MONITOR_FLAPPING_POLL_INTERVAL)
+
+    if state.failures > 1:
+      backoff = state.base_interval * (2 ** (state.failures - 1))
+      return min(backoff, max(constants.MONITOR_OFFLINE_MAX_POLL_INTERVAL, state.base_interval))
+
+    return state.base_interval
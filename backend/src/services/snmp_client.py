@@ -0,0 +1,139 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import src.configs.constants as constants
+from pysnmp.hlapi.v3arch.asyncio import *
+from pysnmp.proto.rfc1905 import EndOfMibView, NoSuchInstance, NoSuchObject
+
+
+class SnmpClient:
+  """
+  Long-lived SNMP client shared by topology discovery.
+  A single SnmpEngine (and its UDP socket, opened once by the dispatcher) is
+  reused for every request; pysnmp matches responses by request id. Resolved
+  transport targets are cached per device and the number of PDUs in flight is
+  bounded by SNMP_MAX_IN_FLIGHT.
+  """
+
+  def __init__(self, max_in_flight: int = constants.SNMP_MAX_IN_FLIGHT, max_targets: int = constants.SNMP_TARGET_CACHE_SIZE):
+    self.max_in_flight = max_in_flight
+    self.max_targets = max_targets
+
+    self.engine: SnmpEngine | None = None
+    self.loop: asyncio.AbstractEventLoop | None = None
+    self.semaphore: asyncio.Semaphore | None = None
+
+    self.auth_data = CommunityData(constants.SNMP_COMMUNITY)
+    self.context_data = ContextData()
+    self.targets: OrderedDict[Tuple[str, int], UdpTransportTarget] = OrderedDict()
+
+  def _get_engine(self) -> SnmpEngine:
+    # The engine dispatcher is bound to the loop it was first used on
+    loop = asyncio.get_running_loop()
+    if self.engine is None or self.loop is not loop:
+      self.close()
+      self.engine = SnmpEngine()
+      self.loop = loop
+      self.semaphore = asyncio.Semaphore(self.max_in_flight)
+    return self.engine
+
+  def close(self):
+    if self.engine is not None:
+      try:
+        self.engine.close_dispatcher()
+      except Exception as e:
+        print(f"SNMP client: failed to close dispatcher: {e}")
+    self.engine = None
+    self.loop = None
+    self.targets.clear()
+
+  async def _get_target(self, ip: str, port: int | None = None) -> UdpTransportTarget:
+    key = (ip, port or constants.SNMP_PORT)
+    target = self.targets.get(key)
+    if target is None:
+      target = await UdpTransportTarget.create(key, timeout=constants.SNMP_TIMEOUT, retries=constants.SNMP_RETRIES)
+      self.targets[key] = target
+      if len(self.targets) > self.max_targets:
+        self.targets.popitem(last=False)
+    else:
+      self.targets.move_to_end(key)
+    return target
+
+  async def get(self, ip: str, oid: str) -> Optional[str]:
+    return (await self.get_many(ip, [oid])).get(oid)
+
+  async def get_many(self, ip: str, oids: Sequence[str]) -> Dict[str, Optional[str]]:
+    """
+    Fetches several scalar OIDs in a single GET PDU.
+    Returns a value per requested oid, None for missing objects or on error.
+    """
+    results: Dict[str, Optional[str]] = {oid: None for oid in oids}
+    if not oids:
+      return results
+
+    engine = self._get_engine()
+    target = await self._get_target(ip)
+
+    async with self.semaphore:
+      errInd, errStatus, errIndex, varBinds = await get_cmd(
+        engine,
+        self.auth_data,
+        target,
+        self.context_data,
+        *[ObjectType(ObjectIdentity(oid)) for oid in oids],
+        lookupMib=False
+      )
+
+    if errInd or errStatus:
+      return results
+
+    # Response varbinds come back in request order
+    for oid, (_, val) in zip(oids, varBinds):
+      if isinstance(val, (NoSuchObject, NoSuchInstance, EndOfMibView)):
+        continue
+      results[oid] = val.prettyPrint()
+    return results
+
+  @staticmethod
+  def in_subtree(oid: str, root_oid: str) -> bool:
+    # Exact boundary: 1.3.6.1.2.1.2.2.1.6 contains .6.1 but not .60.1
+    return oid == root_oid or oid.startswith(root_oid + '.')
+
+  async def walk(self, ip: str, oid: str, max_repetitions: int | None = None) -> List[Tuple[str, str]]:
+    """
+    Walks the subtree under oid with GETBULK, max_repetitions varbinds per response.
+    """
+    engine = self._get_engine()
+    target = await self._get_target(ip)
+    oid = oid.strip('.')
+
+    results: List[Tuple[str, str]] = []
+    # A walk keeps a single PDU in flight at a time
+    async with self.semaphore:
+      iterator = bulk_walk_cmd(
+        engine,
+        self.auth_data,
+        target,
+        self.context_data,
+        0,
+        max_repetitions or constants.SNMP_BULK_MAX_REPETITIONS,
+        ObjectType(ObjectIdentity(oid)),
+        lookupMib=False,
+        lexicographicMode=False
+      )
+      try:
+        async for errInd, errStatus, errIndex, varBinds in iterator:
+          if errInd or errStatus:
+            break
+          for vb in varBinds:
+            vb_oid = vb[0].prettyPrint()
+            if not self.in_subtree(vb_oid, oid):
+              break
+            results.append((vb_oid, vb[1].prettyPrint()))
+      finally:
+        await iterator.aclose()
+
+    return results
+
+snmp_client = SnmpClient()
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional
+
+import src.configs.constants as constants
+from src.services.discovery import (parse_if_phys_address, snmp_get,
+                                    snmp_get_many, snmp_walk)
+
+
+def parse_uptime(value: Optional[str]) -> Optional[int]:
+  try:
+    return int(value) if value is not None else None
+  except ValueError:
+    return None
+
+
+class DeviceFacts:
+  """
+  SNMP facts of a device that only change on reconfiguration or reboot.
+  """
+
+  def __init__(self, name: Optional[str], descr: Optional[str], interface_macs: List[str], uptime: Optional[int]):
+    self.name = name
+    self.descr = descr
+    self.interface_macs = interface_macs
+    self.uptime = uptime
+    self.fetched_at = time.monotonic()
+
+
+class SnmpFactsCache:
+  """
+  Static facts (sysName, sysDescr, interface MACs) of topology devices, by IP.
+  Cached facts are reused for SNMP_STATIC_FACTS_TTL seconds; in the meantime each
+  lookup only reads sysUpTime, and a counter that went backwards (device reboot)
+  refreshes them right away.
+  """
+
+  def __init__(self, ttl: float = constants.SNMP_STATIC_FACTS_TTL):
+    self.ttl = ttl
+    self.facts: Dict[str, DeviceFacts] = {}
+
+  async def get(self, ip: str) -> DeviceFacts:
+    cached = self.facts.get(ip)
+    if cached and time.monotonic() - cached.fetched_at < self.ttl:
+      uptime = parse_uptime(await snmp_get(ip, constants.OID_SYSUPTIME))
+      # Unreachable devices keep their cached facts until the TTL expires
+      if uptime is None or cached.uptime is None or uptime >= cached.uptime:
+        if uptime is not None:
+          cached.uptime = uptime
+        return cached
+      print(f"SNMP facts: {ip} uptime went backwards, refreshing static facts")
+
+    return await self.refresh(ip)
+
+  async def refresh(self, ip: str) -> DeviceFacts:
+    scalars, if_mac_rows = await asyncio.gather(
+      snmp_get_many(ip, [constants.OID_SYSNAME, constants.OID_SYSDESCR, constants.OID_SYSUPTIME]),
+      snmp_walk(ip, constants.OID_IF_PHYS_ADDRESS)
+    )
+
+    facts = DeviceFacts(
+      name=scalars[constants.OID_SYSNAME],
+      descr=scalars[constants.OID_SYSDESCR],
+      interface_macs=parse_if_phys_address(if_mac_rows) if if_mac_rows else [],
+      uptime=parse_uptime(scalars[constants.OID_SYSUPTIME])
+    )
+    # Don't cache an unreachable device, it's retried on the next lookup
+    if facts.uptime is not None:
+      self.facts[ip] = facts
+    return facts
+
+  def invalidate(self, ip: str):
+    self.facts.pop(ip, None)
+
+  def prune(self, ips: Iterable[str]):
+    """
+    Drops facts of IPs that no longer belong to any device.
+    """
+    ips = set(ips)
+    for ip in list(self.facts.keys()):
+      if ip not in ips:
+        del self.facts[ip]
+
+snmp_facts = SnmpFactsCache()
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Dict, Iterable, Tuple
+
+import src.configs.constants as constants
+
+
+class TcpProber:
+  """
+  Asyncio TCP connectivity prober.
+  A host:port is considered reachable after `successes` consecutive successful
+  connects (one every `interval` seconds), so a device that is still booting
+  isn't reported up on its first answer. Final results are cached for
+  TCP_PROBE_CACHE_TTL seconds and concurrent waits on the same target share
+  a single probe loop.
+  """
+
+  def __init__(self, connect_timeout: float = constants.TCP_PROBE_CONNECT_TIMEOUT, max_in_flight: int = constants.TCP_PROBE_MAX_IN_FLIGHT,
+               cache_ttl: float = constants.TCP_PROBE_CACHE_TTL):
+    self.connect_timeout = connect_timeout
+    self.max_in_flight = max_in_flight
+    self.cache_ttl = cache_ttl
+
+    self.loop: asyncio.AbstractEventLoop | None = None
+    self.semaphore: asyncio.Semaphore | None = None
+    # (host, port, successes) -> (reachable, checked_at)
+    self.cache: Dict[Tuple[str, int, int], Tuple[bool, float]] = {}
+    self.waiting: Dict[Tuple[str, int, int], asyncio.Task] = {}
+
+  def _get_semaphore(self) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if self.semaphore is None or self.loop is not loop:
+      self.loop = loop
+      self.semaphore = asyncio.Semaphore(self.max_in_flight)
+      self.waiting.clear()
+    return self.semaphore
+
+  async def connect(self, host: str, port: int) -> float | None:
+    """
+    One connect attempt, returns its latency in ms or None if it failed.
+    """
+    async with self._get_semaphore():
+      start = time.perf_counter()
+      try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=self.connect_timeout)
+      except (OSError, asyncio.TimeoutError):
+        return None
+      latency = (time.perf_counter() - start) * 1000
+      writer.close()
+      try:
+        await writer.wait_closed()
+      except OSError:
+        pass
+      return latency
+
+  async def wait_reachable(self, host: str, port: int = 80, successes: int = constants.TCP_PROBE_REQUIRED_SUCCESSES,
+                           timeout: float = constants.DEVICE_CONN_TIMEOUT) -> bool:
+    """
+    Probes host:port until it answers `successes` times in a row (True) or timeout expires (False).
+    """
+    key = (host, port, successes)
+    cached = self.cache.get(key)
+    if cached and time.monotonic() - cached[1] < self.cache_ttl:
+      return cached[0]
+
+    self._get_semaphore()
+    task = self.waiting.get(key)
+    if task is None:
+      task = asyncio.create_task(self._wait_reachable(host, port, successes, timeout))
+      self.waiting[key] = task
+      task.add_done_callback(lambda _: self.waiting.pop(key, None))
+
+    reachable = await asyncio.shield(task)
+    if len(self.cache) >= constants.TCP_PROBE_CACHE_SIZE:
+      self.prune()
+    self.cache[key] = (reachable, time.monotonic())
+    return reachable
+
+  async def _wait_reachable(self, host: str, port: int, successes: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    while True:
+      if await self.connect(host, port) is not None:
+        consecutive += 1
+        if consecutive >= successes:
+          return True
+      else:
+        consecutive = 0
+
+      if time.monotonic() + constants.TCP_PROBE_INTERVAL > deadline:
+        return False
+      await asyncio.sleep(constants.TCP_PROBE_INTERVAL)
+
+  async def wait_many(self, targets: Iterable[Tuple[str, int]], successes: int = constants.TCP_PROBE_REQUIRED_SUCCESSES,
+                      timeout: float = constants.DEVICE_CONN_TIMEOUT) -> Dict[Tuple[str, int], bool]:
+    """
+    wait_reachable on every (host, port) concurrently.
+    """
+    targets = list(dict.fromkeys(targets))
+    results = await asyncio.gather(*[self.wait_reachable(host, port, successes, timeout) for host, port in targets])
+    return dict(zip(targets, results))
+
+  def prune(self):
+    """
+    Drops expired cache entries (or all of them when none expired yet).
+    """
+    now = time.monotonic()
+    for key, (_, checked_at) in list(self.cache.items()):
+      if now - checked_at >= self.cache_ttl:
+        del self.cache[key]
+    if len(self.cache) >= constants.TCP_PROBE_CACHE_SIZE:
+      self.cache.clear()
+
+tcp_prober = TcpProber()
@@ -1,33 +1,226 @@
-import json
-from typing import Any, List
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, FrozenSet, List, Set, Tuple
 
+import src.configs.constants as constants
 from fastapi import WebSocket
+from src.services.message_encoding import ENCODING_JSON, EncodedMessage
+
+# Closes of evicted clients, held until done (the loop only keeps weak references to tasks)
+close_tasks: Set[asyncio.Task] = set()
+
+
+class Subscription:
+    """
+    Organizations/networks a client receives. organizations=None means every organization.
+    A subscribed organization includes all of its networks, subscribed networks
+    are added on top of it.
+    """
+    def __init__(self, organizations: FrozenSet[str] | None = None, networks: FrozenSet[str] = frozenset()):
+        self.organizations = organizations
+        self.networks = networks
+
+    @property
+    def key(self) -> Tuple:
+        # Clients with equal keys share one serialized message
+        return (self.organizations, self.networks)
+
+    def filter_message(self, data: Dict[str, Any]) -> Dict[str, Any] | None:
+        """
+        Returns data with its organizations tree restricted to this subscription,
+        or None when nothing is left for the client. Sequenced messages are always
+        kept, so clients can still detect gaps.
+        """
+        message_data = data.get('data')
+        if self.organizations is None or not isinstance(message_data, dict) or 'organizations' not in message_data:
+            return data
+
+        filtered = {}
+        for org_id, org_data in message_data['organizations'].items():
+            if org_id in self.organizations:
+                filtered[org_id] = org_data
+                continue
+            networks = {
+                net_id: net_data for net_id, net_data in org_data.get('networks', {}).items() if net_id in self.networks
+            }
+            if networks:
+                filtered[org_id] = {**org_data, 'networks': networks}
+
+        if not filtered and 'seq' not in message_data:
+            return None
+        return {**data, 'data': {**message_data, 'organizations': filtered}}
+
+
+class ClientConnection:
+    """
+    One websocket client with its own bounded outgoing queue and writer task.
+    When the queue overflows the backlog is dropped and the client is resynced
+    with the latest full state instead (coalescing), clients that stay stuck are evicted.
+    """
+    def __init__(self, websocket: WebSocket, snapshot_provider: Callable[[], Dict[str, Any]] | None,
+                 on_evict: Callable[['ClientConnection'], None], subscription: Subscription, encoding: str = ENCODING_JSON):
+        self.websocket = websocket
+        self.snapshot_provider = snapshot_provider
+        self.subscription = subscription
+        self.encoding = encoding
+        self.on_evict = on_evict
+
+        self.queue: Deque[EncodedMessage] = deque()
+        self.wakeup = asyncio.Event()
+        self.needs_resync = False
+        self.overflows = 0
+        self.writer_task: asyncio.Task | None = None
+
+    def start(self):
+        self.writer_task = asyncio.create_task(self._writer())
+
+    def stop(self):
+        if self.writer_task and not self.writer_task.done():
+            self.writer_task.cancel()
+
+    def enqueue(self, message: EncodedMessage) -> bool:
+        """
+        Queues message without blocking. Returns False when the client was evicted.
+        """
+        if len(self.queue) >= constants.WEBSOCKET_CLIENT_QUEUE_SIZE:
+            self.queue.clear()
+            self.overflows += 1
+
+            if self.overflows > constants.WEBSOCKET_CLIENT_MAX_OVERFLOWS or self.snapshot_provider is None:
+                print(f"Websocket client evicted: send queue kept overflowing ({self.overflows}x)")
+                self.evict()
+                return False
+
+            # Latest state only: the backlog is replaced by a fresh snapshot
+            self.needs_resync = True
+        else:
+            self.queue.append(message)
+
+        self.wakeup.set()
+        return True
+
+    def request_resync(self):
+        self.needs_resync = True
+        self.wakeup.set()
+
+    def evict(self):
+        self.stop()
+        self.on_evict(self)
+        close_task = asyncio.create_task(self._close())
+        close_tasks.add(close_task)
+        close_task.add_done_callback(close_tasks.discard)
+
+    async def _close(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(1008), timeout=constants.WEBSOCKET_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _send(self, message: EncodedMessage):
+        payload = message.encode(self.encoding)
+        if isinstance(payload, bytes):
+            send = self.websocket.send_bytes(payload)
+        else:
+            send = self.websocket.send_text(payload)
+        await asyncio.wait_for(send, timeout=constants.WEBSOCKET_SEND_TIMEOUT)
+
+    def _serialize_snapshot(self) -> EncodedMessage:
+        return EncodedMessage(self.subscription.filter_message(self.snapshot_provider()))
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+
+                while True:
+                    if self.needs_resync and self.snapshot_provider is not None:
+                        self.needs_resync = False
+                        # Anything queued before the snapshot is already part of it
+                        self.queue.clear()
+                        await self._send(self._serialize_snapshot())
+                        continue
+                    if not self.queue:
+                        break
+                    await self._send(self.queue.popleft())
+
+                # Fully drained: the client is keeping up again
+                self.overflows = 0
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            print("Websocket client evicted: send timed out")
+            self.on_evict(self)
+            await self._close()
+        except Exception:
+            # Client disconnected uncleanly
+            self.on_evict(self)
 
 
 class WebSocketConnectionManager:
     """
     Manages active WebSocket connections.
+    Broadcasts never wait on clients: the message is filtered and serialized once
+    per subscription group and put on each client's queue, a writer task per
+    client does the actual sending.
     """
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+
+    def register(self, websocket: WebSocket, snapshot_provider: Callable[[], Dict[str, Any]] | None = None,
+                 subscription: Subscription | None = None, encoding: str = ENCODING_JSON):
+        """
+        Starts delivering broadcasts to an authenticated websocket.
+        snapshot_provider returns the full state message sent on connect and on resync.
+        """
+        client = ClientConnection(websocket, snapshot_provider, on_evict=self._remove,
+                                  subscription=subscription or Subscription(), encoding=encoding)
+        self.active_connections[websocket] = client
+        client.start()
+        if snapshot_provider is not None:
+            client.request_resync()
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        """
+        Changes what the client receives and resyncs it with a snapshot in the new scope.
+        """
+        client = self.active_connections.get(websocket)
+        if client:
+            client.subscription = subscription
+            client.request_resync()
+
+    def request_resync(self, websocket: WebSocket):
+        client = self.active_connections.get(websocket)
+        if client:
+            client.request_resync()
+
+    def _remove(self, client: ClientConnection):
+        if self.active_connections.get(client.websocket) is client:
+            del self.active_connections[client.websocket]
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client:
+            client.stop()
 
-    async def broadcast(self, data: Any):
+    def broadcast(self, data: Any):
         """
-        Broadcasts a JSON message to all connected clients.
+        Queues a message (dict) to all connected clients.
         """
-        message_json = json.dumps(data)
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_json)
-            except Exception:
-                # Client disconnected uncleanly
-                self.active_connections.remove(connection)
+        groups: Dict[Tuple, List[ClientConnection]] = {}
+        for client in list(self.active_connections.values()):
+            groups.setdefault(client.subscription.key, []).append(client)
+
+        for clients in groups.values():
+            filtered = clients[0].subscription.filter_message(data)
+            if filtered is None:
+                continue
+            # Encoded once per wire format used in the group
+            message = EncodedMessage(filtered)
+            for client in clients:
+                client.enqueue(message)
 
 websocket_connection_manager = WebSocketConnectionManager()
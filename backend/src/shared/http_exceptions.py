@@ -45,4 +45,7 @@ DEVICE_TO_ADOPT_NOT_FOUND = custom_HTTPException_factory(status_code=status.HTTP
 
 DEVICE_ALREADY_ADOPTED = custom_HTTPException_factory(status_code=status.HTTP_400_BAD_REQUEST, message='Dispositivo já está adotado.')
 
+PROFILE_NOT_IDENTIFIED = custom_HTTPException_factory(status_code=status.HTTP_400_BAD_REQUEST,
+                                                      message='Não foi possível identificar o profile do dispositivo, informe o profileId.')
+
 PASSWD_UPDATE_FAILED = custom_HTTPException_factory(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, message='Falha ao atualizar senha.')
@@ -0,0 +1,103 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Literal, Tuple
+
+import orjson
+import src.configs.constants as constants
+import src.shared.http_exceptions as http_exceptions
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pydantic import BaseModel
+
+OrderBy = Literal['_id', 'updatedAt']
+
+# Cursor of the next page on paginated list responses, absent on the last page
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def keyset_sort(order_by: OrderBy) -> List[Tuple[str, int]]:
+  # _id breaks updatedAt ties, so the order (and the cursor) is total
+  return [('_id', 1)] if order_by == '_id' else [('updatedAt', 1), ('_id', 1)]
+
+def keyset_sort_fields(order_by: OrderBy) -> List[str]:
+  return [field for field, _ in keyset_sort(order_by)]
+
+def encode_cursor(item: BaseModel | Dict[str, Any], order_by: OrderBy) -> str:
+  if isinstance(item, BaseModel):
+    item_id, updated_at = item.id, getattr(item, 'updatedAt', None)
+  else:
+    item_id, updated_at = item['_id'], item.get('updatedAt')
+  if order_by == '_id':
+    return str(item_id)
+  return f'{updated_at.isoformat()}_{item_id}'
+
+def keyset_filter(after: str, order_by: OrderBy) -> Dict[str, Any]:
+  """
+  Filter selecting what comes after the `after` cursor in order_by order.
+  """
+  try:
+    if order_by == '_id':
+      return {'_id': {'$gt': ObjectId(after)}}
+    updated_at, item_id = after.rsplit('_', 1)
+    updated_at, item_id = datetime.fromisoformat(updated_at), ObjectId(item_id)
+  except Exception:
+    raise http_exceptions.INVALID_FIELD(field='Cursor')
+  return {'$or': [{'updatedAt': {'$gt': updated_at}}, {'updatedAt': updated_at, '_id': {'$gt': item_id}}]}
+
+def find_keyset(collection: AsyncIOMotorCollection, query_filter: Dict[str, Any] | None = None, projection: Dict[str, Any] | None = None,
+                order_by: OrderBy = '_id', after: str | None = None, limit: int | None = None):
+  """
+  Motor cursor over query_filter in keyset order, starting after the `after` cursor.
+  """
+  query_filter = query_filter or {}
+  if after:
+    query_filter = {'$and': [query_filter, keyset_filter(after, order_by)]} if query_filter else keyset_filter(after, order_by)
+  cursor = collection.find(query_filter, projection).sort(keyset_sort(order_by)).batch_size(constants.LIST_CURSOR_BATCH_SIZE)
+  if limit:
+    cursor = cursor.limit(limit)
+  return cursor
+
+async def read_page(items: AsyncIterator[Any], limit: int | None, order_by: OrderBy, response: Response | None = None) -> List[Any]:
+  """
+  Reads items fetched with limit + 1: returns up to limit of them and, when
+  there's more, sets the next page cursor header on response.
+  """
+  page = [item async for item in items]
+  if limit and len(page) > limit:
+    page = page[:limit]
+    if response is not None:
+      response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1], order_by)
+  return page
+
+async def batched(items: AsyncIterator[Any], size: int) -> AsyncIterator[List[Any]]:
+  batch = []
+  async for item in items:
+    batch.append(item)
+    if len(batch) >= size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+async def ndjson_response(items: AsyncIterator[BaseModel | Dict[str, Any]], exclude_unset: bool = False) -> StreamingResponse:
+  """
+  Streams items as NDJSON, one JSON document per line, as they come from the DB cursor.
+  The first item is read before answering, so a bad cursor or query still fails with a proper status.
+  exclude_unset leaves out model fields that weren't read (e.g. projected away).
+  """
+  try:
+    first = await anext(items)
+  except StopAsyncIteration:
+    first = None
+
+  def dump(item: BaseModel | Dict[str, Any]) -> bytes:
+    return orjson.dumps(item.model_dump(mode='json', exclude_unset=exclude_unset) if isinstance(item, BaseModel) else item) + b'\n'
+
+  async def lines():
+    if first is None:
+      return
+    yield dump(first)
+    async for item in items:
+      yield dump(item)
+  return StreamingResponse(lines(), media_type='application/x-ndjson')
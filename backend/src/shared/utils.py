@@ -1,14 +1,12 @@
 import asyncio
 import functools
 import re
-import socket
-import time
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, Tuple
 
 import bcrypt
-import src.configs.constants as constants
 import src.shared.http_exceptions as http_exceptions
 from bson import ObjectId
+from pydantic import BaseModel
 
 
 def hash_passwd(password: str):
@@ -29,31 +27,19 @@ def validate_id(target_id: str, id_field_name: str):
   target_id = ObjectId(target_id)
   return target_id
 
-def wait_device_connectivity(host: str, port=80, timeout: int = constants.DEVICE_CONN_TIMEOUT) -> bool:
-  start_time = time.time()
-  recheck = 0
-  while True:
-    try:
-      time.sleep(1)
-      if check_port(host, port):
-        recheck +=1
-        if recheck >= 5: return True
-      else:
-        if time.time() - start_time >= timeout:
-          return False
-        continue
-    except (ConnectionError, ConnectionAbortedError, ConnectionRefusedError, ConnectionResetError) as e:
-      continue
-
-def check_port(host: str, port: int) -> bool:
-  s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-  try:
-    s.settimeout(5)
-    s.connect((host, 80))
-    s.shutdown(2)
-    return True
-  except socket.error as e:
-    return False
+def model_projection(model: type[BaseModel], fields: str | None = None, required: Iterable[str] = ()) -> Dict[str, int]:
+  """
+  Mongo projection of the fields of model, or of the comma separated `fields`
+  of it plus `required`, so the DB only sends what the caller reads.
+  """
+  stored_names = {name: field.alias or name for name, field in model.model_fields.items()}
+  names = [name.strip() for name in fields.split(',') if name.strip()] if fields else list(stored_names)
+  for name in names:
+    if name not in stored_names:
+      raise http_exceptions.INVALID_FIELD(field=f'campo {name}')
+  projection = {stored_names[name]: 1 for name in names}
+  projection.update({field: 1 for field in required})
+  return projection
 
 def get_nested_value(data_dict: dict, key_path: str):
     """
@@ -45,6 +45,7 @@ import {
   FieldMapKeySchema,
   FieldMapValueSchema,
   IndexFromSchema,
+  MaxRepetitionsSchema,
   ProfileNameSchema,
   ProfileSchema,
   ProfileUpdateSchema,
@@ -63,6 +64,7 @@ export const ProfileDialog = ({
     root_oid: "",
     field_map: {},
     index_from: "",
+    max_repetitions: "",
   }
 
   const defaultApiBaseUrl = "http://{{DEVICE_IP_ADDRESS}}"
@@ -91,6 +93,7 @@ export const ProfileDialog = ({
   const [submitErrMsg, setSubmitErrMsg] = useState('');
   const [rootOidErr, setRootOidErr] = useState('');
   const [indexFromErr, setIndexFromErr] = useState('');
+  const [maxRepetitionsErr, setMaxRepetitionsErr] = useState('');
   const [fieldMapKeyErr, setFieldMapKeyErr] = useState("");
   const [fieldMapValueErr, setFieldMapValueErr] = useState("");
 
@@ -123,6 +126,7 @@ export const ProfileDialog = ({
     setApiBaseUrlErr('');
     setRootOidErr('')
     setIndexFromErr('');
+    setMaxRepetitionsErr('');
     setFieldMapKeyErr('');
     setFieldMapValueErr('');
     setSubmitErrMsg('');
@@ -151,6 +155,13 @@ export const ProfileDialog = ({
     return value;
   };
 
+  // Empty form fields are sent as null, max_repetitions as a number
+  const buildStationTablePayload = () => ({
+    ...stationTable,
+    index_from: stationTable.index_from === '' ? null : stationTable.index_from,
+    max_repetitions: stationTable.max_repetitions === '' || stationTable.max_repetitions === undefined ? null : Number(stationTable.max_repetitions),
+  });
+
   const handleSubmit = async (
     e: React.FormEvent<HTMLFormElement | HTMLDivElement>
   ) => {
@@ -160,7 +171,7 @@ export const ProfileDialog = ({
       const profilePayload: INewProfilePayload = {
         name,
         apiBaseUrl,
-        stationTable: {...stationTable, index_from: stationTable.index_from === '' ? null : stationTable.index_from },
+        stationTable: buildStationTablePayload(),
         actions,
       };
 
@@ -191,7 +202,7 @@ export const ProfileDialog = ({
         newProfileData: {
           name,
           apiBaseUrl,
-          stationTable: {...stationTable, index_from: stationTable.index_from === '' ? null : stationTable.index_from },
+          stationTable: buildStationTablePayload(),
           actions,
         },
       };
@@ -378,6 +389,28 @@ export const ProfileDialog = ({
             {indexFromErr}
           </Typography>
         </Box>
+        <Box display="flex" flexDirection="column" mt={2}>
+          <TextField
+            label="Max-repetitions GETBULK (opcional)"
+            size='small'
+            type='number'
+            fullWidth
+            sx={{ mt: 1 }}
+            value={stationTable.max_repetitions ?? ""}
+            onChange={(e) => setStationField("max_repetitions", e.target.value, MaxRepetitionsSchema, setMaxRepetitionsErr)}
+            placeholder="padrão: 25"
+          />
+          <Typography
+            variant="caption"
+            color={theme.palette.error.main}
+            m={0}
+            fontSize="small"
+            width="100%"
+            align="left"
+          >
+            {maxRepetitionsErr}
+          </Typography>
+        </Box>
         <Box>
         <Box mt={2}>
           <Typography variant="body2" gutterBottom>
@@ -1,6 +1,12 @@
 import { Dispatch, Middleware, MiddlewareAPI } from '@reduxjs/toolkit';
-import { WebsocketMessage, WebsocketMonitorMessage, WebsocketTopologyMessage } from '../../ts/types';
-import { DeviceMonitorEntity, monitorActions } from '../slices/monitor/monitorSlice';
+import {
+  WebsocketMessage,
+  WebsocketMonitorDeltaMessage,
+  WebsocketMonitorMessage,
+  WebsocketTopologyMessage
+} from '../../ts/types';
+import { DeviceMonitorDelta, DeviceMonitorEntity, monitorActions } from '../slices/monitor/monitorSlice';
+import { setOrganizationInfo } from '../slices/organization/organizationSlice';
 import { timeseriesActions } from '../slices/timeseries/timeseriesSlice';
 import { topologyActions } from '../slices/topology/topologySlice';
 import { RootState } from '../store';
@@ -11,10 +17,64 @@ const WS_BASE = (url: string, token: string | null) => {
   return `${url}${sep}token=${token}`;
 };
 
+type MonitorTree<T> = Record<string, { networks?: Record<string, { devices?: Record<string, T> }> }>;
+
+// Walks organization -> network -> devices, yielding [deviceId, device]
+function* iterateDevices<T>(orgs: MonitorTree<T>): Generator<[string, T]> {
+  for (const orgData of Object.values(orgs)) {
+    if (!orgData || !orgData.networks) continue;
+
+    for (const netData of Object.values(orgData.networks)) {
+      if (!netData || !netData.devices) continue;
+
+      for (const [deviceId, dev] of Object.entries(netData.devices)) {
+        if (dev) yield [deviceId, dev];
+      }
+    }
+  }
+}
+
+const pushTimeseries = (
+  store: MiddlewareAPI<Dispatch, RootState>,
+  deviceId: string,
+  dev: { stats?: Record<string, any>; latency?: number; timestamp?: string }
+) => {
+  const ts = dev.timestamp ?? new Date().toISOString();
+
+  if (dev.stats) {
+    Object.entries(dev.stats).forEach(([metric, v]) => {
+      if (typeof v === 'number') {
+        store.dispatch(timeseriesActions.pushPoint({
+          deviceId,
+          metric,
+          point: { ts, value: v }
+        }));
+      }
+    });
+  }
+
+  if (typeof dev.latency === 'number') {
+    store.dispatch(timeseriesActions.pushPoint({
+      deviceId,
+      metric: 'latency',
+      point: { ts, value: dev.latency }
+    }));
+  }
+};
+
 export const createWebsocketMiddleware = (wsUrl: string): Middleware => {
   let socket: WebSocket | null = null;
   let reconnectTimer: number | null = null;
   let heartbeatTimer: number | null = null;
+  // Sequence number of the last monitor state applied (null until the first snapshot)
+  let lastSeq: number | null = null;
+  let resyncRequested = false;
+
+  const requestResync = (ws: WebSocket | null) => {
+    if (resyncRequested || !ws || ws.readyState !== WebSocket.OPEN) return;
+    resyncRequested = true;
+    try { ws.send(JSON.stringify({ messageType: 'resync' })); } catch { resyncRequested = false; }
+  };
 
   const startHeartbeat = (ws: WebSocket) => {
     if (heartbeatTimer) window.clearInterval(heartbeatTimer);
@@ -25,6 +85,12 @@ export const createWebsocketMiddleware = (wsUrl: string): Middleware => {
     }, 25000);
   };
 
+  // Only receive monitor/topology data of the organization being viewed
+  const sendSubscription = (ws: WebSocket | null, organizationId?: string) => {
+    if (!ws || ws.readyState !== WebSocket.OPEN || !organizationId) return;
+    try { ws.send(JSON.stringify({ messageType: 'subscribe', organizations: [organizationId] })); } catch {}
+  };
+
   return (store: MiddlewareAPI<Dispatch, RootState>) => (next) => (action) => {
     const state = store.getState();
 
@@ -38,8 +104,12 @@ export const createWebsocketMiddleware = (wsUrl: string): Middleware => {
       console.log(url)
 
       socket.onopen = () => {
+        // Server sends a full snapshot right after connecting
+        lastSeq = null;
+        resyncRequested = false;
         store.dispatch({ type: 'websocket/open' });
         startHeartbeat(socket as WebSocket);
+        sendSubscription(socket, store.getState().organization.organization?.id);
       };
 
       socket.onmessage = (ev) => {
@@ -52,53 +122,63 @@ export const createWebsocketMiddleware = (wsUrl: string): Middleware => {
 
         switch (msg.messageType) {
           case 'deviceMonitor': {
-            const orgs = (msg as WebsocketMonitorMessage).data.organizations ?? {};
+            // Full snapshot (on connect or after a resync request)
+            const data = (msg as WebsocketMonitorMessage).data;
+            const orgs = data.organizations ?? {};
 
             const flattened: DeviceMonitorEntity[] = [];
 
-            for (const [orgId, orgData] of Object.entries(orgs)) {
-              if (!orgData || !orgData.networks) continue;
-
-              for (const [networkId, netData] of Object.entries(orgData.networks)) {
-                if (!netData || !netData.devices) continue;
-
-                for (const [deviceId, dev] of Object.entries(netData.devices)) {
-                  if (!dev) continue;
-
-                  flattened.push({
-                    id: deviceId,
-                    online: dev.online,
-                    latency: dev.latency,
-                    actionsStatuses: dev.actionsStatuses,
-                    stats: dev.stats,
-                    timestamp: dev.timestamp
-                  });
-
-                  if (dev.stats) {
-                    const ts = dev.timestamp ?? new Date().toISOString();
-                    Object.entries(dev.stats).forEach(([metric, v]) => {
-                      if (typeof v === 'number') {
-                        store.dispatch(timeseriesActions.pushPoint({
-                          deviceId,
-                          metric,
-                          point: { ts, value: v }
-                        }));
-                      }
-                    });
-
-                    if (typeof dev.latency === 'number') {
-                      store.dispatch(timeseriesActions.pushPoint({
-                        deviceId,
-                        metric: 'latency',
-                        point: { ts: dev.timestamp ?? new Date().toISOString(), value: dev.latency }
-                      }));
-                    }
-                  }
-                }
-              }
+            for (const [deviceId, dev] of iterateDevices(orgs)) {
+              flattened.push({
+                id: deviceId,
+                online: dev.online,
+                latency: dev.latency,
+                actionsStatuses: dev.actionsStatuses,
+                stats: dev.stats,
+                timestamp: dev.timestamp
+              });
+              pushTimeseries(store, deviceId, dev);
             }
 
-            store.dispatch(monitorActions.bulkUpsertDevices(flattened));
+            if (data.snapshot) {
+              lastSeq = data.seq ?? null;
+              resyncRequested = false;
+              store.dispatch(monitorActions.setAllDevices(flattened));
+            } else {
+              store.dispatch(monitorActions.bulkUpsertDevices(flattened));
+            }
+            break;
+          }
+          case 'deviceMonitorDelta': {
+            const data = (msg as WebsocketMonitorDeltaMessage).data;
+
+            // Waiting for the snapshot, or already covered by it
+            if (lastSeq === null || data.seq <= lastSeq) break;
+
+            if (data.seq !== lastSeq + 1) {
+              // Missed a delta: state can't be patched, ask for a full snapshot
+              requestResync(socket);
+              break;
+            }
+            lastSeq = data.seq;
+
+            const deltas: DeviceMonitorDelta[] = [];
+            for (const [deviceId, dev] of iterateDevices(data.organizations ?? {})) {
+              deltas.push({ ...dev, deviceId });
+            }
+
+            if (deltas.length) {
+              store.dispatch(monitorActions.applyDeviceDeltas(deltas));
+
+              // Deltas only carry what changed (a heartbeat when nothing did), so every
+              // poll's points come from the merged device state
+              const entities = store.getState().monitor.entities;
+              for (const delta of deltas) {
+                const merged = entities[delta.deviceId];
+                if (merged?.online) pushTimeseries(store, delta.deviceId, { ...merged, timestamp: delta.timestamp });
+              }
+            }
+            if (data.removedDevices?.length) store.dispatch(monitorActions.removeDevices(data.removedDevices));
             break;
           }
           case 'topology': {
@@ -141,6 +221,12 @@ export const createWebsocketMiddleware = (wsUrl: string): Middleware => {
       return next(action);
     }
 
+    if (setOrganizationInfo.match(action)) {
+      const result = next(action);
+      sendSubscription(socket, action.payload.id);
+      return result;
+    }
+
     if (action.type === 'websocket/disconnect') {
       if (socket) {
         try { socket.close(); } catch {}
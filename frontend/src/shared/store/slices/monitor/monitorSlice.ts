@@ -15,6 +15,11 @@ export type DeviceMonitorEntity = {
   timestamp?: string;
 };
 
+export type DeviceMonitorDelta = Partial<Omit<DeviceMonitorEntity, 'id'>> & {
+  deviceId: string;
+  removed?: Partial<Record<'stats' | 'actionsStatuses', string[]>>;
+};
+
 const devicesAdapter = createEntityAdapter({
   selectId: (d: DeviceMonitorEntity) => d.id,
 });
@@ -31,9 +36,41 @@ const slice = createSlice({
       devicesAdapter.upsertMany(state, action.payload);
       state.lastUpdated = new Date().toISOString();
     },
+    // Full snapshot: replaces every device
+    setAllDevices(state, action: PayloadAction<DeviceMonitorEntity[]>) {
+      devicesAdapter.setAll(state, action.payload);
+      state.lastUpdated = new Date().toISOString();
+    },
+    // Deltas: top-level fields replace, stats/actionsStatuses are merged key by key
+    applyDeviceDeltas(state, action: PayloadAction<DeviceMonitorDelta[]>) {
+      for (const { deviceId, removed, stats, actionsStatuses, ...fields } of action.payload) {
+        const current = state.entities[deviceId];
+        if (!current) {
+          devicesAdapter.addOne(state, { id: deviceId, online: false, stats, actionsStatuses, ...fields });
+          continue;
+        }
+
+        Object.assign(current, fields);
+
+        if (stats || removed?.stats) {
+          const merged = { ...(current.stats ?? {}), ...(stats ?? {}) };
+          for (const key of removed?.stats ?? []) delete merged[key];
+          current.stats = merged;
+        }
+        if (actionsStatuses || removed?.actionsStatuses) {
+          const merged = { ...(current.actionsStatuses ?? {}), ...(actionsStatuses ?? {}) };
+          for (const key of removed?.actionsStatuses ?? []) delete merged[key];
+          current.actionsStatuses = merged;
+        }
+      }
+      state.lastUpdated = new Date().toISOString();
+    },
     removeDevice(state, action: PayloadAction<string>) {
       devicesAdapter.removeOne(state, action.payload);
     },
+    removeDevices(state, action: PayloadAction<string[]>) {
+      devicesAdapter.removeMany(state, action.payload);
+    },
     clearAll(state) {
       devicesAdapter.removeAll(state);
       state.lastUpdated = undefined;
@@ -34,6 +34,7 @@ export type StationTable = {
   root_oid: string;
   field_map: { [key: string]: string };
   index_from: null | string | number;
+  max_repetitions?: null | string | number;
 }
 
 export type ProfileData = {
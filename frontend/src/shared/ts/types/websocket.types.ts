@@ -18,9 +18,23 @@ export type WsMonitorOrganization = {
 };
 
 export type WsMonitorHierarchy = {
+  seq?: number;
+  snapshot?: boolean;
   organizations: Record<string, WsMonitorOrganization>;
 };
 
+// Only changed fields; nested keys that disappeared are listed in `removed`
+export type WsDeviceMonitorDelta = Partial<WsDeviceMonitorPayload> & {
+  deviceId: string;
+  removed?: Partial<Record<'stats' | 'actionsStatuses', string[]>>;
+};
+
+export type WsMonitorDeltaHierarchy = {
+  seq: number;
+  organizations: Record<string, { networks: Record<string, { devices: Record<string, WsDeviceMonitorDelta> }> }>;
+  removedDevices?: string[];
+};
+
 export type WsTopologyNetworkGraph = {
   nodes: any[];
   links: any[];
@@ -42,6 +56,11 @@ export type WebsocketMonitorMessage = {
   data: WsMonitorHierarchy;
 };
 
+export type WebsocketMonitorDeltaMessage = {
+  messageType: 'deviceMonitorDelta';
+  data: WsMonitorDeltaHierarchy;
+};
+
 export type WebsocketTopologyMessage = {
   messageType: 'topology';
   data: WsTopologyHierarchy;
@@ -55,6 +74,7 @@ export type WebsocketDefaultMessage = {
 
 export type WebsocketMessage =
   | WebsocketMonitorMessage
+  | WebsocketMonitorDeltaMessage
   | WebsocketTopologyMessage
   | WebsocketDefaultMessage
 
@@ -235,6 +235,21 @@ export const IndexFromSchema = Joi.alternatives()
     'number.base': '{{#label}} deve ser um número.',
   });
 
+export const MaxRepetitionsSchema = Joi.number()
+  .integer()
+  .min(1)
+  .max(200)
+  .allow(null)
+  .empty('')
+  .default(null)
+  .label('Max-repetitions (GETBULK)')
+  .messages({
+    'number.base': '{{#label}} deve ser um número.',
+    'number.integer': '{{#label}} deve ser um número inteiro.',
+    'number.min': '{{#label}} deve ser no mínimo {#limit}.',
+    'number.max': '{{#label}} deve ser no máximo {#limit}.',
+  });
+
 export const FieldMapKeySchema = Joi.string()
   .min(1)
   .required()
@@ -256,6 +271,7 @@ export const FieldMapValueSchema = Joi.string()
 export const StationTableSchema = Joi.object({
     root_oid: RootOIDSchema,
     index_from: IndexFromSchema,
+    max_repetitions: MaxRepetitionsSchema,
     field_map: Joi.object()
       .pattern(Joi.string(), Joi.string())
       .required()
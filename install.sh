@@ -63,9 +63,15 @@ MONGODB_LOGIN=dbAdmin
 MONGODB_PASSWD=.Lock.DBMgAdmin
 MONGODB_PORT=27017
 MONGODB_DATABASE=rfsight
+# Shared connection pool of the API (optional)
+# MONGODB_MAX_POOL_SIZE=100
+# MONGODB_MIN_POOL_SIZE=10
+# MONGODB_COMPRESSORS=zlib
 
 # Network Interface for ARP Scan (Inside container)
 API_CONTAINER_INTERFACE=eth0
+# Extra interfaces to sweep, comma separated (defaults to API_CONTAINER_INTERFACE)
+# ARP_DISCOVERY_INTERFACES=eth0,eth1
 EOF
 
 # Create mongo-init.js